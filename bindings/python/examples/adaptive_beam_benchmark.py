@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Speed and accuracy of the lexicon decoder scaling its token beam and beam
+# threshold with the entropy of each frame (DecoderOptions.adaptive_beam_*)
+# against a fixed beam using the same average beam
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+from wav2letter.decoder.metrics import word_error_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_utterances", type=int, default=10)
+    parser.add_argument("--beam_size", type=int, default=500)
+    parser.add_argument("--beam_size_token", type=int, default=25)
+    parser.add_argument("--beam_threshold", type=float, default=25.0)
+    parser.add_argument(
+        "--entropy",
+        type=float,
+        default=2.5,
+        help="entropy (nats) from which the full beam is used; the frames of "
+        "the test emissions are flat, between 1.2 and 2.7 nats",
+    )
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    lexicon = load_words(lexicon_path)
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+
+    def make_options(beam_size_token, beam_threshold, min_ratio=1.0):
+        opts = DecoderOptions(
+            args.beam_size,
+            beam_size_token,
+            beam_threshold,
+            2.0,
+            2.0,
+            -math.inf,
+            -1,
+            0,
+            False,
+            CriterionType.ASG,
+        )
+        opts.adaptive_beam_min_ratio = min_ratio
+        opts.adaptive_beam_entropy = args.entropy
+        return opts
+
+    def run(opts):
+        """Average beam, RTF and transcriptions of the dev set"""
+        decoder = LexiconDecoder(
+            opts, trie, lm, sil_idx, -1, unk_idx, transitions, False
+        )
+        decoder.enable_stats()
+        beam_size_token = beam_threshold = elapsed = 0
+        transcriptions = []
+        for utterance in dev_emissions:
+            start = time.perf_counter()
+            result = decoder.decode(utterance)[0]
+            elapsed += time.perf_counter() - start
+            stats = decoder.stats()
+            beam_size_token += stats["avg_beam_size_token"] / len(dev_emissions)
+            beam_threshold += stats["avg_beam_threshold"] / len(dev_emissions)
+            transcriptions.append(
+                [word_dict.get_entry(w) for w in result.words if w >= 0]
+            )
+        return beam_size_token, beam_threshold, elapsed / audio_duration, transcriptions
+
+    def wer(transcriptions):
+        return word_error_rate(
+            [w for words in transcriptions for w in words + ["</s>"]],
+            [w for words in references for w in words + ["</s>"]],
+        )
+
+    # the test data holds one utterance: the dev set is made of noisy copies
+    # of it, with the transcription of the full beam as reference
+    rng = np.random.RandomState(0)
+    dev_emissions = [
+        emissions + rng.normal(scale=0.5, size=emissions.shape).astype(np.float32)
+        for _ in range(args.n_utterances)
+    ]
+    audio_duration = sum(len(e) for e in dev_emissions) * args.frame_stride_ms / 1000
+
+    _, _, full_rtf, references = run(
+        make_options(args.beam_size_token, args.beam_threshold)
+    )
+    print(
+        f"fixed beam_size_token={args.beam_size_token} "
+        f"beam_threshold={args.beam_threshold}: RTF={full_rtf:.4f}"
+    )
+    for min_ratio in [0.5, 0.25, 0.1]:
+        beam_size_token, beam_threshold, rtf, transcriptions = run(
+            make_options(args.beam_size_token, args.beam_threshold, min_ratio)
+        )
+        print(
+            f"adaptive min_ratio={min_ratio}: average beam_size_token="
+            f"{beam_size_token:.1f} beam_threshold={beam_threshold:.1f}, "
+            f"RTF={rtf:.4f} (x{full_rtf / rtf:.2f}), "
+            f"WER delta={wer(transcriptions):.2f}%"
+        )
+        # same average beam on every frame
+        _, _, rtf, transcriptions = run(
+            make_options(max(1, round(beam_size_token)), beam_threshold)
+        )
+        print(
+            f"  fixed with the same average beam: RTF={rtf:.4f} "
+            f"(x{full_rtf / rtf:.2f}), WER delta={wer(transcriptions):.2f}%"
+        )
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# Featurization of a ragged batch of signals with BatchFeatures.extract_batch
+# (native threads, one extractor and FFT buffers each, all sharing the FFTW plan)
+# for several numbers of threads, against a Python loop over Mfcc.apply
+
+import argparse
+import os
+import time
+
+import numpy as np
+from wav2letter.feature import BatchFeatures, FeatureParams, Mfcc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_signals", type=int, default=128)
+    parser.add_argument(
+        "--max_duration", type=float, default=15.0, help="seconds, 1 s minimum"
+    )
+    parser.add_argument(
+        "--num_threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()]
+    )
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    signals = [
+        rng.uniform(-0.5, 0.5, rng.randint(16000, int(16000 * args.max_duration)))
+        .astype(np.float32)
+        for _ in range(args.n_signals)
+    ]
+    duration = sum(len(signal) for signal in signals) / 16000
+
+    mfcc = Mfcc(FeatureParams())
+    start = time.perf_counter()
+    for signal in signals:
+        mfcc.apply(signal)
+    elapsed = time.perf_counter() - start
+    print(f"Mfcc.apply loop: {elapsed:.2f} s, {duration / elapsed:.0f}x real time")
+
+    batch_features = BatchFeatures(mfcc)
+    for num_threads in args.num_threads:
+        batch_features.extract_batch(signals[:num_threads], num_threads)  # plans
+        start = time.perf_counter()
+        features, offsets = batch_features.extract_batch(signals, num_threads)
+        elapsed = time.perf_counter() - start
+        print(
+            f"extract_batch, {num_threads} threads: {elapsed:.2f} s, "
+            f"{duration / elapsed:.0f}x real time, {len(features)} frames"
+        )
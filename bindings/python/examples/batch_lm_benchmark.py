@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Compare a Python LM queried once per (state, token) pair (LM) with the same
+# LM scoring all the queries of a frame at once with NumPy (BatchLM)
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    LM,
+    BatchLM,
+    CriterionType,
+    DecoderOptions,
+    LexiconDecoder,
+    LMState,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+
+
+class BigramModel:
+    """
+    Toy bigram "neural" LM: the score of a word given the previous one is a
+    dot product of their embeddings, the end of sentence is the word -1
+    """
+
+    def __init__(self, n_words, dim=64, seed=0):
+        rng = np.random.RandomState(seed)
+        self.input = rng.randn(n_words + 1, dim).astype(np.float32) / dim
+        self.output = rng.randn(n_words + 1, dim).astype(np.float32)
+        self.offset = np.float32(-math.log(n_words))
+
+    def score(self, prev_words, words):
+        # (prev_words, words) can be ints or arrays, -1 is the sentence boundary
+        return self.offset + np.tanh(
+            (self.input[prev_words] * self.output[words]).sum(-1)
+        )
+
+
+class PyBigramLM(LM):
+    def __init__(self, model):
+        LM.__init__(self)
+        self.model = model
+        self.last_word = {}
+
+    def start(self, start_with_nothing):
+        state = LMState()
+        self.last_word[state] = -1
+        return state
+
+    def score(self, state, usr_token_idx):
+        out_state = state.child(usr_token_idx)
+        self.last_word[out_state] = usr_token_idx
+        return out_state, float(self.model.score(self.last_word[state], usr_token_idx))
+
+    def finish(self, state):
+        return self.score(state, -1)
+
+
+class BatchBigramLM(BatchLM):
+    def __init__(self, model):
+        BatchLM.__init__(self)
+        self.model = model
+        # state ids are consecutive integers: index the state info with them
+        self.last_word = np.full(1024, -1, dtype=np.int32)
+
+    def start_state(self, state_id, start_with_nothing):
+        self.reserve(state_id)
+        self.last_word[state_id] = -1
+
+    def score_batch(self, state_ids, tokens, new_state_ids):
+        self.reserve(new_state_ids.max())
+        self.last_word[new_state_ids] = tokens
+        return self.model.score(self.last_word[state_ids], tokens)
+
+    def reserve(self, state_id):
+        if state_id >= len(self.last_word):
+            size = max(2 * len(self.last_word), state_id + 1)
+            self.last_word = np.resize(self.last_word, size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_runs", type=int, default=3)
+    parser.add_argument("--beam_size", type=int, default=500)
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    lexicon = load_words(lexicon_path)
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    model = BigramModel(word_dict.index_size())
+    opts = DecoderOptions(
+        args.beam_size, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    audio_duration = emissions.shape[0] * args.frame_stride_ms / 1000
+    best_scores = []
+    for name, lm in [
+        ("LM", PyBigramLM(model)),
+        ("BatchLM", BatchBigramLM(model)),
+    ]:
+        start = time.perf_counter()
+        trie = Trie.from_lexicon(
+            lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+        )
+        trie_time = time.perf_counter() - start
+
+        decoder = LexiconDecoder(
+            opts, trie, lm, sil_idx, -1, unk_idx, transitions, False
+        )
+        start = time.perf_counter()
+        for _ in range(args.n_runs):
+            result = decoder.decode(emissions)
+        elapsed = (time.perf_counter() - start) / args.n_runs
+        best_scores.append(result[0].score)
+        print(
+            f"{name}: trie {trie_time:.2f} s, decoding {elapsed * 1000:.2f} "
+            f"ms/utterance RTF={elapsed / audio_duration:.4f}"
+        )
+
+    # the same scores are computed one by one or in batches
+    assert abs(best_scores[0] - best_scores[1]) < 1e-3, best_scores
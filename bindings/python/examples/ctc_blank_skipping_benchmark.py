@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Speed and accuracy of the CTC lexicon decoder skipping the frames where
+# blank is confident (DecoderOptions.blank_skip_threshold) against the full
+# beam expansion on every frame
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+from wav2letter.decoder.metrics import word_error_rate
+
+
+def make_ctc_emissions(emissions, n_blank_frames, blank_prob, rng):
+    """
+    CTC-like emissions [Time', Ntokens + 1] from the ASG test emissions: frames
+    are normalized, a blank column is appended and `n_blank_frames` frames
+    dominated by blank are inserted where the best token changes, as peaky
+    CTC models do
+    """
+    log_probs = emissions - np.log(np.exp(emissions).sum(1, keepdims=True))
+    best = log_probs.argmax(1)
+    frames = []
+    for t in range(len(emissions)):
+        frames.append(np.append(log_probs[t] + math.log(0.99), math.log(0.01)))
+        if t + 1 < len(emissions) and best[t + 1] != best[t]:
+            for _ in range(n_blank_frames):
+                prob = rng.uniform(blank_prob, 1.0)
+                frames.append(
+                    np.append(log_probs[t] + math.log(1 - prob), math.log(prob))
+                )
+    return np.array(frames, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_runs", type=int, default=3)
+    parser.add_argument("--beam_size", type=int, default=500)
+    parser.add_argument("--n_blank_frames", type=int, default=2)
+    parser.add_argument(
+        "--blank_prob",
+        type=float,
+        default=0.95,
+        help="blank posterior of the inserted frames is drawn in [blank_prob, 1]",
+    )
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    args = parser.parse_args()
+
+    asg_emissions, _ = load_dump_dir(args.data_path)
+    emissions = make_ctc_emissions(
+        asg_emissions, args.n_blank_frames, args.blank_prob, np.random.RandomState(0)
+    )
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    lexicon = load_words(lexicon_path)
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    blank_idx = token_dict.index_size()
+    assert blank_idx == emissions.shape[1] - 1
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+
+    audio_duration = emissions.shape[0] * args.frame_stride_ms / 1000
+    print(f"{emissions.shape[0]} frames ({asg_emissions.shape[0]} before blanks)")
+    reference = None
+    for threshold in [1.0, 0.999, 0.99, 0.9, 0.5]:
+        opts = DecoderOptions(
+            args.beam_size,
+            25,
+            100.0,
+            2.0,
+            2.0,
+            -math.inf,
+            -1,
+            0,
+            False,
+            CriterionType.CTC,
+        )
+        opts.blank_skip_threshold = threshold
+        decoder = LexiconDecoder(
+            opts, trie, lm, sil_idx, blank_idx, unk_idx, [], False
+        )
+        decoder.enable_stats()
+        start = time.perf_counter()
+        for _ in range(args.n_runs):
+            result = decoder.decode(emissions)[0]
+        elapsed = (time.perf_counter() - start) / args.n_runs
+
+        words = [word_dict.get_entry(w) for w in result.words if w >= 0]
+        if reference is None:
+            # no skipping is the reference
+            reference, reference_score, reference_time = words, result.score, elapsed
+        skipped = decoder.stats()["skipped_frames"] / emissions.shape[0]
+        print(
+            f"threshold={threshold}: skipped {100 * skipped:.1f}% frames, "
+            f"RTF={elapsed / audio_duration:.4f} "
+            f"(x{reference_time / elapsed:.2f}), "
+            f"WER delta={word_error_rate(words, reference):.2f}%, "
+            f"score delta={result.score - reference_score:.3f}"
+        )
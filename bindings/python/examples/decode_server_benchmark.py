@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Load test of the local decoding server (wav2letter.decoder.server) on
+# localhost: latency percentiles and throughput for several micro-batch sizes,
+# at a given rate of requests
+
+import argparse
+import asyncio
+import math
+import os
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    BatchLexiconDecoder,
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+from wav2letter.decoder.server import DecodeServer, generate_load
+
+
+def format_ms(values):
+    return ", ".join(f"{name} {value:.1f}" for name, value in values.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_requests", type=int, default=200)
+    parser.add_argument(
+        "--rate", type=float, default=50.0, help="requests per second (0: all at once)"
+    )
+    parser.add_argument("--n_connections", type=int, default=32)
+    parser.add_argument("--max_batch_sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--max_delay_ms", type=float, default=5.0)
+    parser.add_argument("--num_threads", type=int, default=os.cpu_count())
+    parser.add_argument("--beam_size", type=int, default=100)
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    word_dict = create_word_dict(load_words(lexicon_path))
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+    opts = DecoderOptions(
+        args.beam_size, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    batch_decoder = BatchLexiconDecoder(
+        opts, trie, lm, sil_idx, -1, unk_idx, transitions, False
+    )
+
+    # requests of various lengths, cut from the test utterance
+    rng = np.random.RandomState(0)
+    requests = [
+        emissions[: rng.randint(len(emissions) // 4, len(emissions) + 1)]
+        for _ in range(16)
+    ]
+
+    async def benchmark(max_batch_size):
+        server = DecodeServer(
+            batch_decoder,
+            word_dict,
+            emissions.shape[1],
+            max_batch_size=max_batch_size,
+            max_delay_ms=args.max_delay_ms,
+            num_threads=args.num_threads,
+        )
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        client_stats = await generate_load(
+            requests,
+            args.n_requests,
+            args.rate,
+            n_connections=args.n_connections,
+            port=port,
+        )
+        server_stats = server.stats()
+        await server.close()
+        return client_stats, server_stats
+
+    loop = asyncio.get_event_loop()
+    for max_batch_size in args.max_batch_sizes:
+        client_stats, server_stats = loop.run_until_complete(benchmark(max_batch_size))
+        print(
+            f"max_batch_size={max_batch_size}: "
+            f"{client_stats['throughput']:.1f} requests/s, "
+            f"{client_stats['errors']} errors, "
+            f"average batch {server_stats['avg_batch_size']:.1f}, "
+            f"max queue depth {server_stats['max_queue_depth']}"
+        )
+        print(f"  client latency (ms): {format_ms(client_stats['latency_ms'])}")
+        print(f"  server queue (ms): {format_ms(server_stats['queue_ms'])}")
+        print(f"  server decode (ms): {format_ms(server_stats['decode_ms'])}")
@@ -6,15 +6,19 @@ import math
 import os
 import struct
 import sys
+import tempfile
 
 import numpy as np
 from wav2letter.common import Dictionary, create_word_dict, load_words, tkn_to_idx
 from wav2letter.decoder import (
+    BatchLexiconDecoder,
+    CachedLM,
     CriterionType,
     DecoderOptions,
     KenLM,
     LexiconDecoder,
     SmearingMode,
+    StreamingDecodeSession,
     Trie,
 )
 
@@ -55,10 +59,10 @@ def load_emissions(path):
 
     Returns:
     --------
-    numpy.array of shape [Batch=1, Time, Ntokens]
+    numpy.array of shape [Time, Ntokens]
     """
     with open(path, "rb") as file:
-        return np.frombuffer(file.read(T * N * 4), dtype=np.float32)
+        return np.frombuffer(file.read(T * N * 4), dtype=np.float32).reshape(T, N)
 
 
 def load_transitions(path):
@@ -167,6 +171,31 @@ if __name__ == "__main__":
         node = trie.search(word_tensor)
         assert_near(node.max_score, trie_score_target[i], 1e-5)
 
+    # the same trie can be built natively in one call, the lexicon file is
+    # parsed and the words are scored with several threads
+    trie = Trie.from_lexicon(
+        os.path.join(data_path, "words.lst"),
+        token_dict,
+        word_dict,
+        lm,
+        0,  # max_reps, see above
+        SmearingMode.MAX,
+        num_threads=4,
+        root_idx=sil_idx,
+    )
+    for i in range(len(sentence)):
+        word_tensor = tkn_to_idx([c for c in sentence[i]], token_dict, 0)
+        assert_near(trie.search(word_tensor).max_score, trie_score_target[i], 1e-5)
+
+    # the smeared trie can be saved and loaded back (memory-mapped) later,
+    # avoiding to rebuild it from the lexicon and the LM
+    trie_path = os.path.join(tempfile.mkdtemp(), "lexicon.trie")
+    trie.save(trie_path)
+    trie = Trie.load(trie_path, mmap=True)
+    for i in range(len(sentence)):
+        word_tensor = tkn_to_idx([c for c in sentence[i]], token_dict, 0)
+        assert_near(trie.search(word_tensor).max_score, trie_score_target[i], 1e-5)
+
     # Define decoder options:
     # DecoderOptions (beam_size, token_beam_size, beam_threshold, lm_weight,
     #                 word_score, unk_score, sil_score,
@@ -181,11 +210,13 @@ if __name__ == "__main__":
     #                transitiona matrix, is token-level lm)
     decoder = LexiconDecoder(opts, trie, lm, sil_idx, -1, unk_idx, transitions, False)
     # run decoding
-    # decoder.decode(emissions, Time, Ntokens)
+    # decoder.decode(emissions) takes any float32 array (or buffer) of shape
+    # [Time, Ntokens] without copying it, the raw pointer form
+    # decoder.decode(emissions.ctypes.data, Time, Ntokens) is also supported
     # result is a list of sorted hypothesis, 0-index is the best hypothesis
     # each hypothesis is a struct with "score" and "words" representation
     # in the hypothesis and the "tokens" representation
-    results = decoder.decode(emissions.ctypes.data, T, N)
+    results = decoder.decode(emissions)
 
     print(f"Decoding complete, obtained {len(results)} results")
     print("Showing top 5 results:")
@@ -202,3 +233,76 @@ if __name__ == "__main__":
     hyp_score_target = [-284.0998, -284.108, -284.119, -284.127, -284.296]
     for i in range(min(5, len(results))):
         assert_near(results[i].score, hyp_score_target[i], 1e-3)
+
+    # the same hypotheses as flat numpy arrays, without one list per
+    # hypothesis: tokens and words of hypothesis i are
+    # tokens[offsets[i]:offsets[i + 1]], scores are float64 arrays
+    nbest = decoder.get_all_final_hypothesis_nbest()
+    assert len(nbest) == len(results)
+    best_tokens = nbest.tokens[nbest.offsets[0] : nbest.offsets[1]]
+    assert list(best_tokens) == list(results[0].tokens)
+    assert_near(nbest.score[0], results[0].score, 1e-5)
+
+    # optional counters of the work done by the decoder, to tune the beam
+    # options from data; with sample_rate > 0 the beam of one frame every
+    # sample_rate is recorded. Disabled counters are compiled out of the
+    # decoding loop
+    decoder.enable_stats(True, sample_rate=10)
+    decoder.decode(emissions)
+    stats = decoder.stats()
+    print(
+        f"{stats['hypotheses'] / stats['frames']:.1f} hypotheses/frame, "
+        f"{stats['pruned_candidates'] / stats['candidates']:.1%} candidates pruned, "
+        f"{stats['lm_queries']} LM queries, peak beam {stats['peak_hypotheses']}, "
+        f"expand {stats['expand_time'] * 1000:.1f} ms, "
+        f"store {stats['store_time'] * 1000:.1f} ms"
+    )
+    assert stats["frames"] == T
+    decoder.enable_stats(False)
+
+    # decode a batch of utterances with native threads: each thread gets its
+    # own decoder, the trie and the lm are shared;
+    # emissions are a list of [Time_i, Ntokens] arrays or a padded
+    # [Batch, Time, Ntokens] array with `lengths`,
+    # results are returned in the input order
+    batch_decoder = BatchLexiconDecoder(
+        opts, trie, lm, sil_idx, -1, unk_idx, transitions, False
+    )
+    batch_results = batch_decoder.decode_batch(
+        [emissions, emissions[: T // 2]], num_threads=2
+    )
+    assert len(batch_results) == 2
+    assert_near(batch_results[0][0].score, results[0].score, 1e-5)
+
+    # wrap the lm with a bounded LRU cache of its scores: the (state, word)
+    # queries repeated across beams and frames only reach KenLM once, and the
+    # states evicted from the cache are released; counters help to size it
+    cached_lm = CachedLM(lm, capacity=100000)
+    cached_decoder = LexiconDecoder(
+        opts, trie, cached_lm, sil_idx, -1, unk_idx, transitions, False
+    )
+    cached_results = cached_decoder.decode(emissions)
+    assert_near(cached_results[0].score, results[0].score, 1e-5)
+    print(
+        f"LM cache: {cached_lm.hits()} hits, {cached_lm.misses()} misses, "
+        f"{cached_lm.size()} entries"
+    )
+
+    # decode the emissions as a stream of chunks: the session prunes the
+    # decoder after each chunk, so memory stays bounded on long streams;
+    # `stable` frames of the best path won't change anymore, `partial` ones
+    # can still change with the next chunks
+    session = StreamingDecodeSession(decoder, N, look_back=50)
+    stable_words = []
+    for start in range(0, T, 50):
+        chunk_result = session.decode_chunk(emissions[start : start + 50])
+        stable_words += [w for w in chunk_result.stable.words if w >= 0]
+        partial_words = [w for w in chunk_result.partial.words if w >= 0]
+        print(
+            f"[{chunk_result.latency * 1000:.1f} ms] "
+            f"{' '.join(word_dict.get_entry(w) for w in stable_words)} | "
+            f"{' '.join(word_dict.get_entry(w) for w in partial_words)}"
+        )
+    chunk_result = session.finish()
+    stable_words += [w for w in chunk_result.stable.words if w >= 0]
+    assert session.n_stable_frames() == len(results[0].tokens)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Sweep lm_weight, word_score and beam_threshold of the lexicon decoder with
+# successive halving, sharing the emissions, the trie and the KenLM between all
+# the decoders, and print WER against real-time factor for each config
+
+import argparse
+import math
+import os
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+from wav2letter.decoder.sweep import Sweep, format_report, grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_utterances", type=int, default=27)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--num_threads", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    lexicon = load_words(lexicon_path)
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    # loaded once, shared by all the decoders of the sweep
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+    base_options = DecoderOptions(
+        500, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+
+    def decoder_factory(options):
+        return LexiconDecoder(
+            options, trie, lm, sil_idx, -1, unk_idx, transitions, False
+        )
+
+    # the test data holds one utterance: the dev set is made of noisy copies
+    # of it, with the transcription of a wide beam as reference
+    rng = np.random.RandomState(0)
+    reference = [
+        word_dict.get_entry(w)
+        for w in decoder_factory(base_options).decode(emissions)[0].words
+        if w >= 0
+    ]
+    dev_emissions = [
+        emissions + rng.normal(scale=0.5, size=emissions.shape).astype(np.float32)
+        for _ in range(args.n_utterances)
+    ]
+
+    sweep = Sweep(
+        dev_emissions,
+        [reference] * args.n_utterances,
+        word_dict,
+        decoder_factory,
+        num_threads=args.num_threads,
+    )
+    configs = grid(
+        lm_weight=[1.0, 2.0, 3.0],
+        word_score=[0.0, 2.0, 4.0],
+        beam_threshold=[10.0, 25.0, 100.0],
+    )
+    results = sweep.run(base_options, configs, eta=args.eta)
+    print(format_report(results))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Run several lexicon decoders from a pool of Python threads sharing one trie
+# and one KenLM, and check that throughput scales with the number of threads
+# (the decoder releases the GIL while decoding)
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from wav2letter.common import Dictionary, create_word_dict, load_words, tkn_to_idx
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+
+
+def build_trie(lm, lexicon, word_dict, token_dict, sil_idx):
+    trie = Trie(token_dict.index_size(), sil_idx)
+    start_state = lm.start(False)
+    for word, spellings in lexicon.items():
+        usr_idx = word_dict.get_index(word)
+        _, score = lm.score(start_state, usr_idx)
+        for spelling in spellings:
+            trie.insert(tkn_to_idx(spelling, token_dict, 0), usr_idx, score)
+    trie.smear(SmearingMode.MAX)
+    return trie
+
+
+def run(decoders, emissions, n_jobs, n_threads):
+    """
+    Decode `n_jobs` times the same emissions with `n_threads` decoders,
+    return the wall time
+    """
+
+    def worker(thread_id):
+        decoder = decoders[thread_id]
+        for _ in range(thread_id, n_jobs, n_threads):
+            decoder.decode(emissions)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        list(pool.map(worker, range(n_threads)))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--max_threads", type=int, default=os.cpu_count())
+    parser.add_argument("--jobs_per_thread", type=int, default=20)
+    parser.add_argument(
+        "--min_efficiency",
+        type=float,
+        default=0.7,
+        help="minimal accepted speedup / number of threads",
+    )
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon = load_words(os.path.join(args.data_path, "words.lst"))
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    # trie and LM are loaded once and shared by all the decoders
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = build_trie(lm, lexicon, word_dict, token_dict, sil_idx)
+    opts = DecoderOptions(
+        2500, 25000, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    decoders = [
+        LexiconDecoder(opts, trie, lm, sil_idx, -1, unk_idx, transitions, False)
+        for _ in range(args.max_threads)
+    ]
+
+    # warm up
+    run(decoders, emissions, 1, 1)
+
+    n_threads = 1
+    base_throughput = None
+    while n_threads <= args.max_threads:
+        n_jobs = args.jobs_per_thread * n_threads
+        elapsed = run(decoders, emissions, n_jobs, n_threads)
+        throughput = n_jobs / elapsed
+        if base_throughput is None:
+            base_throughput = throughput
+        speedup = throughput / base_throughput
+        print(
+            f"threads={n_threads} utterances/sec={throughput:.2f} "
+            f"speedup={speedup:.2f} efficiency={speedup / n_threads:.2f}"
+        )
+        assert (
+            speedup / n_threads >= args.min_efficiency
+        ), f"decoding doesn't scale with {n_threads} threads"
+        n_threads *= 2
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# Epochs over a list of audio files with the features computed by Mfsc at each
+# epoch, against FeatureCache: the first epoch computes and writes the features,
+# the next ones read them from the cache (float32 and float16)
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from wav2letter.feature import FeatureParams, Mfsc
+from wav2letter.feature.cache import FeatureCache
+
+
+def epoch(get_features, paths):
+    start = time.perf_counter()
+    n_frames = 0
+    for path in paths:
+        features = get_features(path)
+        n_frames += len(features)
+        np.array(features, dtype=np.float32)  # read the features
+    return time.perf_counter() - start, n_frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_files", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--n_epochs", type=int, default=3)
+    parser.add_argument("--dir", help="directory of the files (default: temporary)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(dir=args.dir)
+    try:
+        # the signals are stored as .npy files, standing for decoded audio
+        rng = np.random.RandomState(0)
+        paths = []
+        for i in range(args.n_files):
+            path = os.path.join(root, f"{i}.npy")
+            signal = rng.uniform(-0.5, 0.5, int(16000 * args.duration))
+            np.save(path, signal.astype(np.float32))
+            paths.append(path)
+
+        mfsc = Mfsc(FeatureParams(num_filterbank_chans=40))
+        elapsed, n_frames = epoch(lambda path: mfsc.apply(np.load(path)), paths)
+        print(f"no cache: {elapsed:.2f} s per epoch, {n_frames} frames")
+
+        for dtype in ["float32", "float16"]:
+            cache = FeatureCache(os.path.join(root, "cache_" + dtype), dtype=dtype)
+            for i in range(args.n_epochs):
+                elapsed, _ = epoch(lambda path: cache.get(path, mfsc, np.load), paths)
+                print(f"cache, {dtype}, epoch {i + 1}: {elapsed:.2f} s")
+            stats = cache.stats()
+            print(
+                f"cache, {dtype}: {stats['entries']} entries, "
+                f"{stats['nbytes'] / 2 ** 20:.1f} MB"
+            )
+            cache.close()
+    finally:
+        shutil.rmtree(root)
@@ -2,10 +2,10 @@
 
 # adapted from wav2letter/src/feature/test/MfccTest.cpp
 
-import itertools as it
 import os
 import sys
 
+import numpy as np
 from wav2letter.feature import FeatureParams, Mfcc
 
 
@@ -13,7 +13,7 @@ def load_data(filename):
     path = os.path.join(data_path, filename)
     path = os.path.abspath(path)
     with open(path) as f:
-        return [float(x) for x in it.chain.from_iterable(line.split() for line in f)]
+        return np.array(f.read().split(), dtype=np.float32)
 
 
 if __name__ == "__main__":
@@ -42,22 +42,16 @@ if __name__ == "__main__":
     params.zero_mean_frame = False
     params.use_power = False
 
-    # apply MFCC featurization
+    # apply MFCC featurization: features [frames, 39] from a float32 array
     mfcc = Mfcc(params)
     features = mfcc.apply(wavinput)
 
     # check that obtained features are the same as golden one
-    assert len(features) == len(htkfeatures)
-    assert len(features) % 39 == 0
-    numframes = len(features) // 39
-    featurescopy = features.copy()
-    for f in range(numframes):
-        for i in range(1, 39):
-            features[f * 39 + i - 1] = features[f * 39 + i]
-        features[f * 39 + 12] = featurescopy[f * 39 + 0]
-        features[f * 39 + 25] = featurescopy[f * 39 + 13]
-        features[f * 39 + 38] = featurescopy[f * 39 + 26]
-    differences = [abs(x[0] - x[1]) for x in zip(features, htkfeatures)]
-
-    print(f"max_diff={max(differences)}")
-    print(f"avg_diff={sum(differences)/len(differences)}")
+    assert features.size == len(htkfeatures)
+    assert features.shape[1] == 39
+    # HTK puts C0 after C1..C12 in the static, delta and acceleration parts
+    features = np.roll(features.reshape(-1, 3, 13), -1, axis=2).reshape(-1)
+    differences = np.abs(features - htkfeatures)
+
+    print(f"max_diff={differences.max()}")
+    print(f"avg_diff={differences.mean()}")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Featurization time of float32 numpy signals, read in place and returned as
+# [frames, feat_dim] arrays, against the Python lists of floats of the former
+# std::vector interface (list in, list out)
+
+import argparse
+import time
+
+import numpy as np
+from wav2letter.feature import FeatureParams, Mfcc, Mfsc, PowerSpectrum
+
+
+def benchmark(func, n_runs):
+    start = time.perf_counter()
+    for _ in range(n_runs):
+        func()
+    return (time.perf_counter() - start) / n_runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--n_runs", type=int, default=20)
+    args = parser.parse_args()
+
+    params = FeatureParams()
+    rng = np.random.RandomState(0)
+    signals = rng.uniform(-0.5, 0.5, (args.batch_size, int(16000 * args.duration)))
+    signals = signals.astype(np.float32)
+
+    for extractor_class in [PowerSpectrum, Mfsc, Mfcc]:
+        extractor = extractor_class(params)
+        signal, signal_list = signals[0], signals[0].tolist()
+        batch, batch_list = signals, signals.ravel().tolist()
+        times = {
+            "apply, numpy": benchmark(lambda: extractor.apply(signal), args.n_runs),
+            "apply, lists": benchmark(
+                lambda: extractor.apply(signal_list).ravel().tolist(), args.n_runs
+            ),
+            "batch_apply, numpy": benchmark(
+                lambda: extractor.batch_apply(batch), args.n_runs
+            ),
+            "batch_apply, lists": benchmark(
+                lambda: extractor.batch_apply(batch_list, args.batch_size)
+                .ravel()
+                .tolist(),
+                args.n_runs,
+            ),
+        }
+        print(
+            f"{extractor_class.__name__}: "
+            + ", ".join(f"{name} {t * 1000:.1f} ms" for name, t in times.items())
+        )
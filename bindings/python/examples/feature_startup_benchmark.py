@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Startup latency of the feature extractors: time to the first features of a
+# new process, measuring its FFTW plan, against a process importing the FFTW
+# wisdom exported by a previous run (import_fft_wisdom), and the construction
+# of more extractors in the same process (plans and tables are shared)
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from wav2letter.feature import (
+    FeatureParams,
+    Mfcc,
+    Mfsc,
+    PowerSpectrum,
+    import_fft_wisdom,
+)
+
+
+def first_features(wisdom_path):
+    """Run in a new process, return the wisdom import and first features times"""
+    start = time.perf_counter()
+    if wisdom_path:
+        import_fft_wisdom(wisdom_path)
+    wisdom_time = time.perf_counter() - start
+    start = time.perf_counter()
+    Mfcc(FeatureParams()).apply(np.zeros(16000, dtype=np.float32))
+    return wisdom_time, time.perf_counter() - start
+
+
+def new_process(wisdom_path=""):
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", wisdom_path], universal_newlines=True
+    )
+    return [float(t) for t in output.split()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_runs", type=int, default=5)
+    parser.add_argument("--n_extractors", type=int, default=100)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        print(*first_features(args.child))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wisdom_path = os.path.join(tmp, "fftw.wisdom")
+        subprocess.check_call(
+            [
+                sys.executable,
+                "-c",
+                "from wav2letter.feature import *; Mfcc(FeatureParams()); "
+                f"assert export_fft_wisdom({wisdom_path!r})",
+            ]
+        )
+        for name, path in [("no wisdom", ""), ("wisdom imported", wisdom_path)]:
+            times = np.median([new_process(path) for _ in range(args.n_runs)], 0)
+            print(
+                f"new process, {name}: wisdom import {times[0] * 1000:.2f} ms, "
+                f"first Mfcc features {times[1] * 1000:.2f} ms"
+            )
+
+    params = FeatureParams()
+    for extractor_class in [PowerSpectrum, Mfsc, Mfcc]:
+        extractor_class(params)
+        start = time.perf_counter()
+        for _ in range(args.n_extractors):
+            extractor_class(params)
+        elapsed = (time.perf_counter() - start) / args.n_extractors
+        print(
+            f"{extractor_class.__name__}, next extractors of the process: "
+            f"{elapsed * 1e6:.0f} us each"
+        )
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Compare the pointer-based Trie and the array-backed FlatTrie:
+# memory footprint of the lexicon trie and real-time factor of the decoding
+
+import argparse
+import gc
+import math
+import os
+import time
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words, tkn_to_idx
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    FlatLexiconDecoder,
+    FlatTrie,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+
+
+def rss_bytes():
+    """
+    Resident set size of the current process (Linux only)
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def lexicon_arrays(lm, lexicon, word_dict, token_dict):
+    """
+    Flatten all the spellings of the lexicon into (indices, offsets, labels,
+    scores) arrays, spelling i is indices[offsets[i]:offsets[i + 1]]
+    """
+    indices, offsets, labels, scores = [], [0], [], []
+    start_state = lm.start(False)
+    for word, spellings in lexicon.items():
+        usr_idx = word_dict.get_index(word)
+        _, score = lm.score(start_state, usr_idx)
+        for spelling in spellings:
+            indices += tkn_to_idx(spelling, token_dict, 0)
+            offsets.append(len(indices))
+            labels.append(usr_idx)
+            scores.append(score)
+    return (
+        np.array(indices, dtype=np.int32),
+        np.array(offsets, dtype=np.int64),
+        np.array(labels, dtype=np.int32),
+        np.array(scores, dtype=np.float32),
+    )
+
+
+def build_trie(n_tokens, sil_idx, indices, offsets, labels, scores):
+    trie = Trie(n_tokens, sil_idx)
+    for i in range(len(labels)):
+        spelling = indices[offsets[i] : offsets[i + 1]].tolist()
+        trie.insert(spelling, int(labels[i]), float(scores[i]))
+    trie.smear(SmearingMode.MAX)
+    return trie
+
+
+def decode_time(decoder, emissions, n_runs):
+    decoder.decode(emissions)  # warm up
+    start = time.perf_counter()
+    for _ in range(n_runs):
+        result = decoder.decode(emissions)
+    return (time.perf_counter() - start) / n_runs, result[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_runs", type=int, default=10)
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon = load_words(os.path.join(args.data_path, "words.lst"))
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    arrays = lexicon_arrays(lm, lexicon, word_dict, token_dict)
+
+    gc.collect()
+    rss = rss_bytes()
+    trie = build_trie(token_dict.index_size(), sil_idx, *arrays)
+    gc.collect()
+    trie_bytes = rss_bytes() - rss
+
+    # NB: the RSS is not used for the FlatTrie, as it is built from a
+    # temporary Trie whose memory is not necessarily returned to the system
+    flat_trie = FlatTrie.from_arrays(token_dict.index_size(), sil_idx, *arrays)
+    print(
+        f"nodes={flat_trie.n_nodes()} labels={flat_trie.n_labels()}\n"
+        f"Trie: {trie_bytes / 2 ** 20:.2f} MB (RSS increase)\n"
+        f"FlatTrie: {flat_trie.memory_size() / 2 ** 20:.2f} MB"
+    )
+
+    opts = DecoderOptions(
+        2500, 25000, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    audio_duration = emissions.shape[0] * args.frame_stride_ms / 1000
+    best_scores = []
+    for name, decoder in [
+        (
+            "Trie",
+            LexiconDecoder(
+                opts, trie, lm, sil_idx, -1, unk_idx, transitions, False
+            ),
+        ),
+        (
+            "FlatTrie",
+            FlatLexiconDecoder(
+                opts, flat_trie, lm, sil_idx, -1, unk_idx, transitions, False
+            ),
+        ),
+    ]:
+        elapsed, best = decode_time(decoder, emissions, args.n_runs)
+        best_scores.append(best.score)
+        print(
+            f"{name}: {elapsed * 1000:.2f} ms/utterance "
+            f"RTF={elapsed / audio_duration:.4f}"
+        )
+
+    # both tries encode the same lexicon
+    assert best_scores[0] == best_scores[1], best_scores
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Size and cost of an n-best dump for rescoring: binary NBestDump against the
+# text layout of the Decoder beam dump (`id | decoder score | am score |
+# lm score | wer | transcription`)
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    LM,
+    CriterionType,
+    DecoderOptions,
+    LexiconDecoder,
+    LMState,
+    NBestDump,
+    SmearingMode,
+    Trie,
+    save_nbest_text,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+
+
+class UnigramLM(LM):
+    def __init__(self):
+        LM.__init__(self)
+
+    def start(self, start_with_nothing):
+        return LMState()
+
+    def score(self, state, usr_token_idx):
+        return state.child(usr_token_idx), -1.0 * (usr_token_idx % 3)
+
+    def finish(self, state):
+        return state.child(-1), 0.0
+
+
+def read_text_dump(path):
+    """Parse the text dump the way rescore.py does"""
+    hyps = {}
+    with open(path) as f:
+        for line in f:
+            data = line.strip().split("|")
+            hyps.setdefault(data[0].strip(), []).append(
+                (
+                    float(data[1]),
+                    float(data[2]),
+                    float(data[3]),
+                    float(data[4]),
+                    data[5].strip().split(" "),
+                )
+            )
+    return hyps
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument(
+        "--n_utterances",
+        type=int,
+        default=200,
+        help="the test utterance is dumped this many times",
+    )
+    parser.add_argument("--beam_size", type=int, default=500)
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon = load_words(os.path.join(args.data_path, "words.lst"))
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = UnigramLM()
+    trie = Trie.from_lexicon(
+        os.path.join(args.data_path, "words.lst"),
+        token_dict,
+        word_dict,
+        lm,
+        0,
+        SmearingMode.MAX,
+        root_idx=sil_idx,
+    )
+    opts = DecoderOptions(
+        args.beam_size, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    decoder = LexiconDecoder(opts, trie, lm, sil_idx, -1, unk_idx, transitions, False)
+    nbest = decoder.decode_nbest(emissions)
+    ids = ["utterance-{}".format(i) for i in range(args.n_utterances)]
+
+    tmp_dir = tempfile.mkdtemp()
+    for unique in [False, True]:
+        dump = NBestDump()
+        _, add_time = timed(lambda: [dump.add(id, nbest, unique) for id in ids])
+        print(
+            f"unique={unique}: {dump.n_hypotheses()} hypotheses "
+            f"({len(nbest)} per utterance before deduplication), "
+            f"add {add_time * 1000:.1f} ms"
+        )
+
+        binary_path = os.path.join(tmp_dir, "dump.nbest")
+        _, save_time = timed(dump.save, binary_path)
+        loaded, load_time = timed(NBestDump.load, binary_path)
+        assert loaded.ids == dump.ids
+        assert np.array_equal(loaded.words, dump.words)
+        print(
+            f"  binary: {os.path.getsize(binary_path) / 1e6:.2f} MB, "
+            f"write {save_time * 1000:.1f} ms, load {load_time * 1000:.1f} ms"
+        )
+
+        text_path = os.path.join(tmp_dir, "dump.hyp")
+        _, save_time = timed(save_nbest_text, dump, text_path, word_dict)
+        hyps, load_time = timed(read_text_dump, text_path)
+        assert sum(len(h) for h in hyps.values()) == dump.n_hypotheses()
+        print(
+            f"  text:   {os.path.getsize(text_path) / 1e6:.2f} MB, "
+            f"write {save_time * 1000:.1f} ms, load {load_time * 1000:.1f} ms"
+        )
+        os.remove(binary_path)
+        os.remove(text_path)
+    os.rmdir(tmp_dir)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Size, load time, decoding speed and accuracy of emission dumps in float16 and
+# int8 (see wav2letter.decoder.emissions) against float32
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir, load_emissions, save_emissions
+from wav2letter.decoder.metrics import word_error_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument("--n_runs", type=int, default=3)
+    parser.add_argument("--beam_size", type=int, default=500)
+    parser.add_argument(
+        "--clip",
+        type=float,
+        default=20.0,
+        help="int8 emissions are also clipped this far below the best score",
+    )
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    lexicon = load_words(lexicon_path)
+    word_dict = create_word_dict(lexicon)
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+    opts = DecoderOptions(
+        args.beam_size, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+    decoder = LexiconDecoder(opts, trie, lm, sil_idx, -1, unk_idx, transitions, False)
+
+    audio_duration = emissions.shape[0] * args.frame_stride_ms / 1000
+    path = os.path.join(tempfile.mkdtemp(), "emissions.bin")
+    reference = None
+    for dtype, clip in [
+        ("float32", None),
+        ("float16", None),
+        ("int8", None),
+        ("int8", args.clip),
+    ]:
+        save_emissions(path, emissions, dtype, clip)
+        start = time.perf_counter()
+        dump = load_emissions(path, mmap=False)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.n_runs):
+            result = decoder.decode(
+                dump.emissions, scales=dump.scales, offsets=dump.offsets
+            )[0]
+        elapsed = (time.perf_counter() - start) / args.n_runs
+
+        words = [word_dict.get_entry(w) for w in result.words if w >= 0]
+        if reference is None:
+            # float32 is the reference
+            reference, reference_score, reference_time = words, result.score, elapsed
+        name = dtype if clip is None else f"{dtype} (clip={clip})"
+        print(
+            f"{name}: {os.path.getsize(path) / 1e3:.1f} KB, "
+            f"load {load_time * 1000:.2f} ms, "
+            f"RTF={elapsed / audio_duration:.4f} "
+            f"(x{reference_time / elapsed:.2f}), "
+            f"WER delta={word_error_rate(words, reference):.2f}%, "
+            f"score delta={result.score - reference_score:.3f}"
+        )
+        os.remove(path)
+    os.rmdir(os.path.dirname(path))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Memory of forked decoding workers (proportional set size, PSS) with the
+# pointer-based Trie against the FlatTrie in a shared memory segment
+# (FlatTrie.share()) with the Python objects frozen before forking
+
+import argparse
+import gc
+import math
+import multiprocessing
+import os
+
+import numpy as np
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder import (
+    CriterionType,
+    DecoderOptions,
+    FlatLexiconDecoder,
+    FlatTrie,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.decoder.emissions import load_dump_dir
+
+
+def memory(pid="self"):
+    """Rss and Pss of a process in MB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] in ["Rss:", "Pss:"]:
+                values[fields[0][:-1]] = int(fields[1]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def worker(decoder_factory, emissions, n_decodes, barrier, results):
+    decoder = decoder_factory()
+    for _ in range(n_decodes):
+        decoder.decode(emissions)
+    barrier.wait()  # all the workers are alive while measuring
+    results.put(memory())
+    barrier.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path", help="decoder test data, usually <wav2letter_root>/src/decoder/test"
+    )
+    parser.add_argument(
+        "--lm", help="KenLM, binary to be shared too (default: lm.arpa of data_path)"
+    )
+    parser.add_argument("--n_workers", type=int, default=4)
+    parser.add_argument("--n_decodes", type=int, default=2)
+    parser.add_argument("--shared", action="store_true", help="share the model")
+    args = parser.parse_args()
+
+    emissions, transitions = load_dump_dir(args.data_path)
+    lexicon_path = os.path.join(args.data_path, "words.lst")
+    word_dict = create_word_dict(load_words(lexicon_path))
+    token_dict = Dictionary(os.path.join(args.data_path, "letters.lst"))
+    token_dict.add_entry("1")
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+    opts = DecoderOptions(
+        100, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, CriterionType.ASG
+    )
+
+    rss_before, _ = memory()
+    lm = KenLM(args.lm or os.path.join(args.data_path, "lm.arpa"), word_dict)
+    trie = Trie.from_lexicon(
+        lexicon_path, token_dict, word_dict, lm, 0, SmearingMode.MAX, root_idx=sil_idx
+    )
+    if args.shared:
+        trie = FlatTrie(trie).share()
+        decoder_class = FlatLexiconDecoder
+        if hasattr(gc, "freeze"):  # Python 3.7+
+            gc.collect()
+            gc.freeze()
+    else:
+        decoder_class = LexiconDecoder
+    rss_model, _ = memory()
+    print(
+        f"{'shared' if args.shared else 'private'} model: "
+        f"{rss_model - rss_before:.1f} MB in the parent"
+    )
+
+    def decoder_factory():
+        return decoder_class(opts, trie, lm, sil_idx, -1, unk_idx, transitions, False)
+
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(args.n_workers + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=worker,
+            args=(decoder_factory, emissions, args.n_decodes, barrier, results),
+        )
+        for _ in range(args.n_workers)
+    ]
+    for process in workers:
+        process.start()
+    barrier.wait()
+    worker_memory = [results.get() for _ in workers]
+    _, parent_pss = memory()
+    barrier.wait()
+    for process in workers:
+        process.join()
+
+    total_pss = parent_pss + sum(pss for _, pss in worker_memory)
+    print(
+        f"{args.n_workers} workers: RSS {np.mean([r for r, _ in worker_memory]):.1f} "
+        f"MB each, PSS of the parent and the workers {total_pss:.1f} MB in total, "
+        f"{(total_pss - rss_model) / args.n_workers:.1f} MB per worker on top of "
+        f"the parent"
+    )
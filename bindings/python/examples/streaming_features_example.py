@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# MFCC of a signal received in chunks with StreamingMfcc: the features are the
+# same as the ones of Mfcc(frame_independent=True) on the whole signal, and each
+# chunk only costs its own frames, unlike recomputing the features of a sliding
+# window. The fixed order products of frame_independent cost some offline time,
+# also measured
+
+import argparse
+import os
+import time
+
+import numpy as np
+from wav2letter.feature import FeatureParams, Mfcc, StreamingMfcc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "data_path",
+        help="feature test data, <wav2letter_root>/src/libraries/feature/test/data",
+    )
+    parser.add_argument("--chunk_ms", type=int, nargs="+", default=[10, 30, 100])
+    parser.add_argument("--n_runs", type=int, default=100)
+    parser.add_argument(
+        "--window_ms", type=int, default=1000, help="sliding window to compare with"
+    )
+    args = parser.parse_args()
+
+    with open(os.path.join(args.data_path, "sa1.dat")) as f:
+        signal = np.array(f.read().split(), dtype=np.float32)
+    params = FeatureParams()
+    offline = Mfcc(params, frame_independent=True).apply(signal)
+
+    streaming_mfcc = StreamingMfcc(params)
+    mfcc = Mfcc(params)
+    window = 16 * args.window_ms
+    for chunk_ms in args.chunk_ms:
+        chunk_size = 16 * chunk_ms
+        chunks = [
+            signal[start : start + chunk_size]
+            for start in range(0, len(signal), chunk_size)
+        ]
+
+        start = time.perf_counter()
+        features = [streaming_mfcc.apply_chunk(chunk) for chunk in chunks]
+        features.append(streaming_mfcc.finish())
+        streaming_time = time.perf_counter() - start
+        features = np.concatenate(features)
+
+        start = time.perf_counter()
+        for end in range(chunk_size, len(signal) + chunk_size, chunk_size):
+            mfcc.apply(signal[max(0, end - window) : end])
+        window_time = time.perf_counter() - start
+
+        print(
+            f"{chunk_ms} ms chunks: {len(features)} frames, identical to offline: "
+            f"{np.array_equal(features, offline)}, "
+            f"{streaming_time / len(chunks) * 1e6:.0f} us per chunk "
+            f"({window_time / len(chunks) * 1e6:.0f} us with a "
+            f"{args.window_ms} ms sliding window)"
+        )
+
+    # offline features with the default products (within a few ulps)
+    for frame_independent in [False, True]:
+        mfcc = Mfcc(params, frame_independent=frame_independent)
+        start = time.perf_counter()
+        for _ in range(args.n_runs):
+            features = mfcc.apply(signal)
+        elapsed = (time.perf_counter() - start) / args.n_runs
+        print(
+            f"offline Mfcc, frame_independent={frame_independent}: "
+            f"{elapsed * 1e3:.2f} ms, max difference to the streaming features "
+            f"{np.abs(features - offline).max():.2g}"
+        )
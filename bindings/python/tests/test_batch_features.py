@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from wav2letter.feature import BatchFeatures, FeatureParams, Mfsc
+
+
+class BatchFeaturesTestCase(unittest.TestCase):
+    def test_concurrent_calls(self):
+        rng = np.random.RandomState(0)
+        signals = [rng.uniform(-1, 1, 1000 * i).astype(np.float32) for i in range(20)]
+        batch_features = BatchFeatures(Mfsc(FeatureParams()))
+        expected, expected_offsets = batch_features.extract_batch(signals, 1)
+
+        # the GIL is released: the calls grow the pool during the other ones
+        def extract(num_threads):
+            return batch_features.extract_batch(signals, num_threads)
+
+        with ThreadPoolExecutor(4) as executor:
+            for features, offsets in executor.map(extract, [1, 2, 3, 4] * 4):
+                np.testing.assert_array_equal(features, expected)
+                np.testing.assert_array_equal(offsets, expected_offsets)
+        self.assertEqual(batch_features.n_extractors(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from wav2letter.feature import FeatureParams, Mfcc
+from wav2letter.feature.cache import FeatureCache
+
+
+def cache_files(path):
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(path)
+        for name in names
+        if name.endswith(".npy")
+    ]
+
+
+class FeatureCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.mfcc = Mfcc(FeatureParams())
+        rng = np.random.RandomState(0)
+        self.paths = []
+        for i in range(20):
+            path = os.path.join(self.dir, "{}.npy".format(i))
+            np.save(path, rng.uniform(-0.5, 0.5, 16000).astype(np.float32))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_get(self):
+        cache = FeatureCache(os.path.join(self.dir, "cache"))
+        features = cache.get(self.paths[0], self.mfcc, np.load)
+        cached = cache.get(self.paths[0], self.mfcc, np.load)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, features)
+        np.testing.assert_array_equal(
+            features, self.mfcc.apply(np.load(self.paths[0]))
+        )
+
+    def test_file_without_entry_is_a_miss(self):
+        cache = FeatureCache(os.path.join(self.dir, "cache"))
+        cache.get(self.paths[0], self.mfcc, np.load)
+        key = cache.key(self.paths[0], self.mfcc)
+        cache._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.assertIsNone(cache.lookup(self.paths[0], self.mfcc))
+        cache.get(self.paths[0], self.mfcc, np.load)
+        self.assertIsNotNone(cache.lookup(self.paths[0], self.mfcc))
+
+    def test_eviction(self):
+        cache = FeatureCache(
+            os.path.join(self.dir, "cache"), max_bytes=100000, access_resolution=0
+        )
+        for path in self.paths:
+            cache.get(path, self.mfcc, np.load)
+        stats = cache.stats()
+        files = cache_files(cache.path)
+        self.assertLessEqual(stats["nbytes"], 100000)
+        self.assertEqual(len(files), stats["entries"])
+        self.assertEqual(sum(os.path.getsize(f) for f in files), stats["nbytes"])
+
+    def test_forked_workers(self):
+        cache = FeatureCache(os.path.join(self.dir, "cache"), max_bytes=100000)
+        cache.get(self.paths[0], self.mfcc, np.load)
+
+        def work(i):
+            status = 0
+            for path in self.paths[i::4]:
+                features = cache.get(path, self.mfcc, np.load)
+                if not np.array_equal(features, self.mfcc.apply(np.load(path))):
+                    status = 1
+            os._exit(status)
+
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=work, args=(i,)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+
+        # the connection of the parent still works
+        stats = cache.stats()
+        self.assertLessEqual(stats["nbytes"], 100000)
+        self.assertEqual(len(cache_files(cache.path)), stats["entries"])
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import threading
+import time
+import unittest
+
+import numpy as np
+import wav2letter.decoder as decoder
+from wav2letter.feature import FeatureParams, Mfcc
+
+
+DECODER_DATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../../src/decoder/test"
+)
+
+
+def python_progress(native_call, n_calls):
+    """
+    Iterations of a Python loop run while another thread makes `n_calls` calls
+    to `native_call`, relative to the ones of the same loop run alone for the
+    same time: close to 0 if the calls hold the GIL, to 1 if they release it
+    on a multi-core CPU
+    """
+    native_call()  # warm-up
+    done = threading.Event()
+
+    def run():
+        for _ in range(n_calls):
+            native_call()
+        done.set()
+
+    thread = threading.Thread(target=run)
+    with_calls = 0
+    start = time.perf_counter()
+    thread.start()
+    while not done.is_set():
+        with_calls += 1
+    duration = time.perf_counter() - start
+    thread.join()
+
+    # the same loop, stopped by a sleeping thread
+    done.clear()
+    threading.Timer(duration, done.set).start()
+    alone = 0
+    while not done.is_set():
+        alone += 1
+    return with_calls / alone
+
+
+@unittest.skipIf(os.cpu_count() < 2, "needs at least 2 cores")
+class GilReleaseTestCase(unittest.TestCase):
+    def test_feature_apply(self):
+        rng = np.random.RandomState(0)
+        signal = rng.uniform(-1, 1, 16000 * 10).astype(np.float32)
+        mfcc = Mfcc(FeatureParams())
+        self.assertGreater(python_progress(lambda: mfcc.apply(signal), 10), 0.5)
+
+    @unittest.skipIf(not hasattr(decoder, "KenLM"), "needs KenLM")
+    def test_lexicon_decoder_decode(self):
+        from wav2letter.common import Dictionary, create_word_dict, load_words
+        from wav2letter.decoder.emissions import load_dump_dir
+
+        emissions, transitions = load_dump_dir(DECODER_DATA)
+        words_path = os.path.join(DECODER_DATA, "words.lst")
+        word_dict = create_word_dict(load_words(words_path))
+        token_dict = Dictionary(os.path.join(DECODER_DATA, "letters.lst"))
+        token_dict.add_entry("1")
+        lm = decoder.KenLM(os.path.join(DECODER_DATA, "lm.arpa"), word_dict)
+        trie = decoder.Trie.from_lexicon(
+            words_path, token_dict, word_dict, lm, 0, decoder.SmearingMode.MAX
+        )
+        opts = decoder.DecoderOptions(
+            500, 25, 100.0, 2.0, 2.0, -math.inf, -1, 0, False, decoder.CriterionType.ASG
+        )
+        lexicon_decoder = decoder.LexiconDecoder(
+            opts,
+            trie,
+            lm,
+            token_dict.get_index("|"),
+            -1,
+            word_dict.get_index("<unk>"),
+            transitions,
+            False,
+        )
+        progress = python_progress(lambda: lexicon_decoder.decode(emissions), 10)
+        self.assertGreater(progress, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+import gc
+import unittest
+
+import numpy as np
+from wav2letter.decoder import DecodeResult, NBestDump, NBestList
+
+
+def make_result(length, score):
+    result = DecodeResult(length)
+    result.tokens = list(range(length))
+    result.words = [length] * length
+    result.score = result.amScore = result.lmScore = score
+    return result
+
+
+class NBestListTestCase(unittest.TestCase):
+    def test_views_survive_add(self):
+        nbest = NBestList([make_result(3, 1.0)])
+        tokens, score = nbest.tokens, nbest.score
+        for i in range(1000):  # reallocates the vectors of the list
+            nbest.add(make_result(5, float(i)))
+        gc.collect()
+        np.testing.assert_array_equal(tokens, [0, 1, 2])
+        np.testing.assert_array_equal(score, [1.0])
+        self.assertEqual(len(nbest), 1001)
+        self.assertEqual(len(nbest.tokens), 3 + 5 * 1000)
+        np.testing.assert_array_equal(nbest.tokens[:3], tokens)
+
+    def test_views_are_read_only(self):
+        nbest = NBestList([make_result(3, 1.0)])
+        with self.assertRaises(ValueError):
+            nbest.tokens[0] = 1
+        with self.assertRaises(ValueError):
+            nbest.score[:] = 0
+
+    def test_view_outlives_list(self):
+        nbest = NBestList([make_result(3, 1.0)])
+        tokens = nbest.tokens[1:]
+        nbest.add(make_result(2, 2.0))
+        del nbest
+        gc.collect()
+        np.testing.assert_array_equal(tokens, [1, 2])
+
+
+class NBestDumpTestCase(unittest.TestCase):
+    def test_views_survive_add(self):
+        dump = NBestDump()
+        dump.add("u0", NBestList([make_result(3, 1.0), make_result(2, 0.5)]))
+        words, hyp_offsets = dump.words, dump.hyp_offsets
+        for i in range(1000):
+            dump.add("u{}".format(i + 1), NBestList([make_result(4, float(i))]))
+        np.testing.assert_array_equal(words, [3, 3, 3, 2, 2])
+        np.testing.assert_array_equal(hyp_offsets, [0, 2])
+        self.assertEqual(len(dump), 1001)
+        np.testing.assert_array_equal(dump.words[:5], words)
+        with self.assertRaises(ValueError):
+            dump.words[0] = 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,6 +21,8 @@
 namespace py = pybind11;
 using namespace w2l;
 
+// Raw pointers come in as py::bytes. They must be unpacked while holding the
+// GIL; the criterion itself then runs with the GIL released.
 template <class T>
 static T castBytes(const py::bytes& b) {
   static_assert(
@@ -49,18 +51,26 @@ static void CpuFAC_forward(
     py::bytes trans,
     py::bytes loss,
     py::bytes workspace) {
+  auto inputPtr = castBytes<const float*>(input);
+  auto targetPtr = castBytes<const int*>(target);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto transPtr = castBytes<const float*>(trans);
+  auto lossPtr = castBytes<float*>(loss);
+  auto workspacePtr = castBytes<void*>(workspace);
+
+  py::gil_scoped_release release;
   CpuFAC::forward(
       B,
       T,
       N,
       L,
       scaleMode,
-      castBytes<const float*>(input),
-      castBytes<const int*>(target),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(trans),
-      castBytes<float*>(loss),
-      castBytes<void*>(workspace));
+      inputPtr,
+      targetPtr,
+      targetSizePtr,
+      transPtr,
+      lossPtr,
+      workspacePtr);
 }
 
 static void CpuFAC_backward(
@@ -74,17 +84,25 @@ static void CpuFAC_backward(
     py::bytes inputGrad,
     py::bytes transGrad,
     py::bytes workspace) {
+  auto targetPtr = castBytes<const int*>(target);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto gradPtr = castBytes<const float*>(grad);
+  auto inputGradPtr = castBytes<float*>(inputGrad);
+  auto transGradPtr = castBytes<float*>(transGrad);
+  auto workspacePtr = castBytes<void*>(workspace);
+
+  py::gil_scoped_release release;
   CpuFAC::backward(
       B,
       T,
       N,
       L,
-      castBytes<const int*>(target),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(grad),
-      castBytes<float*>(inputGrad),
-      castBytes<float*>(transGrad),
-      castBytes<void*>(workspace));
+      targetPtr,
+      targetSizePtr,
+      gradPtr,
+      inputGradPtr,
+      transGradPtr,
+      workspacePtr);
 }
 
 static void CpuFCC_forward(
@@ -97,16 +115,23 @@ static void CpuFCC_forward(
     py::bytes trans,
     py::bytes loss,
     py::bytes workspace) {
+  auto inputPtr = castBytes<const float*>(input);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto transPtr = castBytes<const float*>(trans);
+  auto lossPtr = castBytes<float*>(loss);
+  auto workspacePtr = castBytes<void*>(workspace);
+
+  py::gil_scoped_release release;
   CpuFCC::forward(
       B,
       T,
       N,
       scaleMode,
-      castBytes<const float*>(input),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(trans),
-      castBytes<float*>(loss),
-      castBytes<void*>(workspace));
+      inputPtr,
+      targetSizePtr,
+      transPtr,
+      lossPtr,
+      workspacePtr);
 }
 
 static void CpuFCC_backward(
@@ -118,15 +143,15 @@ static void CpuFCC_backward(
     py::bytes inputGrad,
     py::bytes transGrad,
     py::bytes workspace) {
+  auto transPtr = castBytes<const float*>(trans);
+  auto gradPtr = castBytes<const float*>(grad);
+  auto inputGradPtr = castBytes<float*>(inputGrad);
+  auto transGradPtr = castBytes<float*>(transGrad);
+  auto workspacePtr = castBytes<void*>(workspace);
+
+  py::gil_scoped_release release;
   CpuFCC::backward(
-      B,
-      T,
-      N,
-      castBytes<const float*>(trans),
-      castBytes<const float*>(grad),
-      castBytes<float*>(inputGrad),
-      castBytes<float*>(transGrad),
-      castBytes<void*>(workspace));
+      B, T, N, transPtr, gradPtr, inputGradPtr, transGradPtr, workspacePtr);
 }
 
 static void CpuViterbi_compute(
@@ -137,14 +162,13 @@ static void CpuViterbi_compute(
     py::bytes trans,
     py::bytes path,
     py::bytes workspace) {
-  CpuViterbi::compute(
-      B,
-      T,
-      N,
-      castBytes<const float*>(input),
-      castBytes<const float*>(trans),
-      castBytes<int*>(path),
-      castBytes<void*>(workspace));
+  auto inputPtr = castBytes<const float*>(input);
+  auto transPtr = castBytes<const float*>(trans);
+  auto pathPtr = castBytes<int*>(path);
+  auto workspacePtr = castBytes<void*>(workspace);
+
+  py::gil_scoped_release release;
+  CpuViterbi::compute(B, T, N, inputPtr, transPtr, pathPtr, workspacePtr);
 }
 
 #ifdef W2L_LIBRARIES_USE_CUDA
@@ -166,19 +190,28 @@ static void CudaFAC_forward(
     py::bytes loss,
     py::bytes workspace,
     py::bytes stream) {
+  auto inputPtr = castBytes<const float*>(input);
+  auto targetPtr = castBytes<const int*>(target);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto transPtr = castBytes<const float*>(trans);
+  auto lossPtr = castBytes<float*>(loss);
+  auto workspacePtr = castBytes<void*>(workspace);
+  auto streamPtr = castBytes<cudaStream_t>(stream);
+
+  py::gil_scoped_release release;
   CudaFAC::forward(
       B,
       T,
       N,
       L,
       scaleMode,
-      castBytes<const float*>(input),
-      castBytes<const int*>(target),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(trans),
-      castBytes<float*>(loss),
-      castBytes<void*>(workspace),
-      castBytes<cudaStream_t>(stream));
+      inputPtr,
+      targetPtr,
+      targetSizePtr,
+      transPtr,
+      lossPtr,
+      workspacePtr,
+      streamPtr);
 }
 
 static void CudaFAC_backward(
@@ -193,18 +226,27 @@ static void CudaFAC_backward(
     py::bytes transGrad,
     py::bytes workspace,
     py::bytes stream) {
+  auto targetPtr = castBytes<const int*>(target);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto gradPtr = castBytes<const float*>(grad);
+  auto inputGradPtr = castBytes<float*>(inputGrad);
+  auto transGradPtr = castBytes<float*>(transGrad);
+  auto workspacePtr = castBytes<void*>(workspace);
+  auto streamPtr = castBytes<cudaStream_t>(stream);
+
+  py::gil_scoped_release release;
   CudaFAC::backward(
       B,
       T,
       N,
       L,
-      castBytes<const int*>(target),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(grad),
-      castBytes<float*>(inputGrad),
-      castBytes<float*>(transGrad),
-      castBytes<void*>(workspace),
-      castBytes<cudaStream_t>(stream));
+      targetPtr,
+      targetSizePtr,
+      gradPtr,
+      inputGradPtr,
+      transGradPtr,
+      workspacePtr,
+      streamPtr);
 }
 
 static void CudaFCC_forward(
@@ -218,17 +260,25 @@ static void CudaFCC_forward(
     py::bytes loss,
     py::bytes workspace,
     py::bytes stream) {
+  auto inputPtr = castBytes<const float*>(input);
+  auto targetSizePtr = castBytes<const int*>(targetSize);
+  auto transPtr = castBytes<const float*>(trans);
+  auto lossPtr = castBytes<float*>(loss);
+  auto workspacePtr = castBytes<void*>(workspace);
+  auto streamPtr = castBytes<cudaStream_t>(stream);
+
+  py::gil_scoped_release release;
   CudaFCC::forward(
       B,
       T,
       N,
       scaleMode,
-      castBytes<const float*>(input),
-      castBytes<const int*>(targetSize),
-      castBytes<const float*>(trans),
-      castBytes<float*>(loss),
-      castBytes<void*>(workspace),
-      castBytes<cudaStream_t>(stream));
+      inputPtr,
+      targetSizePtr,
+      transPtr,
+      lossPtr,
+      workspacePtr,
+      streamPtr);
 }
 
 static void CudaFCC_backward(
@@ -241,16 +291,24 @@ static void CudaFCC_backward(
     py::bytes transGrad,
     py::bytes workspace,
     py::bytes stream) {
+  auto transPtr = castBytes<const float*>(trans);
+  auto gradPtr = castBytes<const float*>(grad);
+  auto inputGradPtr = castBytes<float*>(inputGrad);
+  auto transGradPtr = castBytes<float*>(transGrad);
+  auto workspacePtr = castBytes<void*>(workspace);
+  auto streamPtr = castBytes<cudaStream_t>(stream);
+
+  py::gil_scoped_release release;
   CudaFCC::backward(
       B,
       T,
       N,
-      castBytes<const float*>(trans),
-      castBytes<const float*>(grad),
-      castBytes<float*>(inputGrad),
-      castBytes<float*>(transGrad),
-      castBytes<void*>(workspace),
-      castBytes<cudaStream_t>(stream));
+      transPtr,
+      gradPtr,
+      inputGradPtr,
+      transGradPtr,
+      workspacePtr,
+      streamPtr);
 }
 
 static void CudaViterbi_compute(
@@ -262,15 +320,15 @@ static void CudaViterbi_compute(
     py::bytes path,
     py::bytes workspace,
     py::bytes stream) {
+  auto inputPtr = castBytes<const float*>(input);
+  auto transPtr = castBytes<const float*>(trans);
+  auto pathPtr = castBytes<int*>(path);
+  auto workspacePtr = castBytes<void*>(workspace);
+  auto streamPtr = castBytes<cudaStream_t>(stream);
+
+  py::gil_scoped_release release;
   CudaViterbi::compute(
-      B,
-      T,
-      N,
-      castBytes<const float*>(input),
-      castBytes<const float*>(trans),
-      castBytes<int*>(path),
-      castBytes<void*>(workspace),
-      castBytes<cudaStream_t>(stream));
+      B, T, N, inputPtr, transPtr, pathPtr, workspacePtr, streamPtr);
 }
 
 #endif // W2L_LIBRARIES_USE_CUDA
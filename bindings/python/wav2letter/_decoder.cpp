@@ -6,10 +6,26 @@
  * LICENSE file in the root directory of this source tree.
  */
 
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <algorithm>
+#include <string>
+#include <thread>
+
+#include "libraries/decoder/BatchDecoder.h"
 #include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/LexiconFreeDecoder.h"
+#include "libraries/decoder/LexiconFreeSeq2SeqDecoder.h"
+#include "libraries/decoder/LexiconSeq2SeqDecoder.h"
+#include "libraries/decoder/NBestDump.h"
+#include "libraries/decoder/NBestList.h"
+#include "libraries/decoder/QuantizedEmissions.h"
+#include "libraries/decoder/StreamingDecodeSession.h"
+
+#include "libraries/lm/BatchLM.h"
+#include "libraries/lm/CachedLM.h"
 
 #ifdef W2L_LIBRARIES_USE_KENLM
 #include "libraries/lm/KenLM.h"
@@ -96,22 +112,611 @@ class PyLM : public LM {
  *          return (outstate, -1)
  *```
  */
-void LexiconDecoder_decodeStep(
-    LexiconDecoder& decoder,
-    uintptr_t emissions,
-    int T,
-    int N) {
+
+/**
+ * Alias type for BatchLM: a Python LM which scores all the (state, token)
+ * pairs of a frame in one call, with NumPy arrays, instead of one GIL round
+ * trip per query. States are identified by int64 ids, -1 is the end of
+ * sentence token. Scores are cached in the states, so a pair is never sent
+ * twice.
+ *
+ * ```python
+ * from wav2letter.decoder import BatchLM
+ * class MyBatchLM(BatchLM):
+ *      def __init__(self):
+ *          BatchLM.__init__(self)
+ *          self.history = dict()
+ *
+ *      def start_state(self, state_id, start_with_nothing):
+ *          self.history[state_id] = ()
+ *
+ *      def score_batch(self, state_ids, tokens, new_state_ids):
+ *          for s, token, new_s in zip(state_ids, tokens, new_state_ids):
+ *              self.history[new_s] = self.history[s] + (token,)
+ *          return numpy.full(len(tokens), -1, dtype=numpy.float32)
+ *```
+ */
+class PyBatchLM : public BatchLM {
+  using BatchLM::BatchLM;
+
+ protected:
+  void startState(int64_t stateId, bool startWithNothing) override {
+    PYBIND11_OVERLOAD_PURE_NAME(
+        void, BatchLM, "start_state", startState, stateId, startWithNothing);
+  }
+
+  void scoreStates(
+      const std::vector<int64_t>& stateIds,
+      const std::vector<int>& usrTokenIndices,
+      const std::vector<int64_t>& newStateIds,
+      std::vector<float>& scores) override {
+    py::gil_scoped_acquire gil;
+    py::function overload =
+        py::get_overload(static_cast<const BatchLM*>(this), "score_batch");
+    if (!overload) {
+      throw std::runtime_error("[BatchLM] score_batch is not implemented");
+    }
+    py::object result = overload(
+        py::array_t<int64_t>(stateIds.size(), stateIds.data()),
+        py::array_t<int>(usrTokenIndices.size(), usrTokenIndices.data()),
+        py::array_t<int64_t>(newStateIds.size(), newStateIds.data()));
+    auto array =
+        py::array_t<float, py::array::c_style | py::array::forcecast>::ensure(
+            result);
+    if (!array || array.ndim() != 1) {
+      throw std::invalid_argument(
+          "[BatchLM] score_batch should return a 1-D array of scores");
+    }
+    scores.assign(array.data(), array.data() + array.size());
+  }
+};
+
+void Decoder_decodeStep(Decoder& decoder, uintptr_t emissions, int T, int N) {
   decoder.decodeStep(reinterpret_cast<const float*>(emissions), T, N);
 }
 
-std::vector<DecodeResult> LexiconDecoder_decode(
-    LexiconDecoder& decoder,
-    uintptr_t emissions,
-    int T,
-    int N) {
+std::vector<DecodeResult>
+Decoder_decode(Decoder& decoder, uintptr_t emissions, int T, int N) {
   return decoder.decode(reinterpret_cast<const float*>(emissions), T, N);
 }
 
+/* Whether the buffer holds `format` values of `itemsize` bytes, native order */
+bool hasFormat(const py::buffer_info& info, char format, size_t itemsize) {
+  const std::string& fmt = info.format;
+  return info.itemsize == itemsize && !fmt.empty() && fmt.back() == format &&
+      (fmt.size() == 1 ||
+       (fmt.size() == 2 && (fmt[0] == '@' || fmt[0] == '=' || fmt[0] == '<')));
+}
+
+/* Check the shape [T, N] and strides of dense emissions of any type */
+void checkEmissionsShape(const py::buffer_info& info, int& T, int& N) {
+  if (info.ndim == 2) {
+    if ((T >= 0 && info.shape[0] != T) || (N >= 0 && info.shape[1] != N)) {
+      throw std::invalid_argument(
+          "emissions shape [" + std::to_string(info.shape[0]) + ", " +
+          std::to_string(info.shape[1]) + "] doesn't match T=" +
+          std::to_string(T) + ", N=" + std::to_string(N));
+    }
+    T = info.shape[0];
+    N = info.shape[1];
+    bool isDense = (N <= 1 || info.strides[1] == info.itemsize) &&
+        (T <= 1 || info.strides[0] == N * info.itemsize);
+    if (!isDense) {
+      throw std::invalid_argument(
+          "emissions must be C-contiguous, got strides [" +
+          std::to_string(info.strides[0]) + ", " +
+          std::to_string(info.strides[1]) + "]");
+    }
+  } else if (info.ndim == 1) {
+    if (T < 0 || N < 0) {
+      throw std::invalid_argument(
+          "T and N must be given for 1-dimensional emissions");
+    }
+    if (info.shape[0] < static_cast<int64_t>(T) * N) {
+      throw std::invalid_argument(
+          "emissions buffer holds " + std::to_string(info.shape[0]) +
+          " values, expected at least T * N = " + std::to_string(T * N));
+    }
+    if (info.shape[0] > 1 && info.strides[0] != info.itemsize) {
+      throw std::invalid_argument("emissions must be contiguous");
+    }
+  } else {
+    throw std::invalid_argument(
+        "emissions must be of shape [T, N], got " + std::to_string(info.ndim) +
+        " dimensions");
+  }
+}
+
+/**
+ * Emissions are read by the decoders as a dense row-major [T, N] float matrix
+ * (`emissions[t * N + n]`). Any object exposing the buffer protocol (numpy
+ * array, `np.memmap`, memoryview, `torch.Tensor.numpy()`, ...) can be passed
+ * directly: we only validate dtype, shape and strides and hand the underlying
+ * pointer to the decoder, nothing is copied. The `py::buffer_info` owns the
+ * buffer view, so it must outlive the decoder call.
+ */
+void checkEmissionsBuffer(const py::buffer_info& info, int& T, int& N) {
+  if (!hasFormat(info, 'f', sizeof(float))) {
+    throw std::invalid_argument(
+        "emissions must be a float32 buffer, got format '" + info.format + "'");
+  }
+  checkEmissionsShape(info, T, N);
+}
+
+using FloatArray =
+    py::array_t<float, py::array::c_style | py::array::forcecast>;
+
+// Frames of float16 or int8 emissions converted to float32 at a time
+const int kDequantizeChunkSize = 64;
+
+/**
+ * Emissions of a decode call: float32 buffers are handed to the decoder as
+ * they are, float16 and int8 buffers (with one float32 scale and offset per
+ * frame, see QuantizedEmissions) are converted to float32 on the fly, a chunk
+ * of frames at a time.
+ */
+struct EmissionsArg {
+  py::buffer_info info;
+  FloatArray scales;
+  FloatArray offsets;
+  EmissionsType type;
+  int T;
+  int N;
+
+  EmissionsArg(
+      py::buffer emissions,
+      int T,
+      int N,
+      py::object scales,
+      py::object offsets)
+      : info(emissions.request()), T(T), N(N) {
+    if (hasFormat(info, 'f', sizeof(float))) {
+      type = EmissionsType::FLOAT32;
+    } else if (hasFormat(info, 'e', sizeof(uint16_t))) {
+      type = EmissionsType::FLOAT16;
+    } else if (hasFormat(info, 'b', sizeof(int8_t))) {
+      type = EmissionsType::INT8;
+    } else {
+      throw std::invalid_argument(
+          "emissions must be a float32, float16 or int8 buffer, got format '" +
+          info.format + "'");
+    }
+    checkEmissionsShape(info, this->T, this->N);
+
+    if (type != EmissionsType::INT8) {
+      if (!scales.is_none() || !offsets.is_none()) {
+        throw std::invalid_argument(
+            "scales and offsets are for int8 emissions");
+      }
+      return;
+    }
+    if (scales.is_none() || offsets.is_none()) {
+      throw std::invalid_argument("int8 emissions need scales and offsets");
+    }
+    this->scales = FloatArray::ensure(scales);
+    this->offsets = FloatArray::ensure(offsets);
+    if (!this->scales || !this->offsets || this->scales.size() != this->T ||
+        this->offsets.size() != this->T) {
+      throw std::invalid_argument(
+          "scales and offsets must be float arrays of size T=" +
+          std::to_string(this->T));
+    }
+  }
+
+  QuantizedEmissions view() const {
+    return QuantizedEmissions(
+        type,
+        info.ptr,
+        T,
+        N,
+        type == EmissionsType::INT8 ? scales.data() : nullptr,
+        type == EmissionsType::INT8 ? offsets.data() : nullptr);
+  }
+};
+
+/* Seq2Seq decoders need all the emissions in a single decodeStep() */
+int dequantizeChunkSize(const Decoder& decoder, int T) {
+  if (dynamic_cast<const LexiconSeq2SeqDecoder*>(&decoder) ||
+      dynamic_cast<const LexiconFreeSeq2SeqDecoder*>(&decoder)) {
+    return std::max(T, 1);
+  }
+  return kDequantizeChunkSize;
+}
+
+void Decoder_decodeStepBuffer(
+    Decoder& decoder,
+    py::buffer emissions,
+    int T,
+    int N,
+    py::object scales,
+    py::object offsets) {
+  EmissionsArg arg(emissions, T, N, scales, offsets);
+  auto quantized = arg.view();
+  py::gil_scoped_release release;
+  quantized.decodeStep(decoder, dequantizeChunkSize(decoder, arg.T));
+}
+
+std::vector<DecodeResult> Decoder_decodeBuffer(
+    Decoder& decoder,
+    py::buffer emissions,
+    int T,
+    int N,
+    py::object scales,
+    py::object offsets) {
+  EmissionsArg arg(emissions, T, N, scales, offsets);
+  auto quantized = arg.view();
+  py::gil_scoped_release release;
+  return quantized.decode(decoder, dequantizeChunkSize(decoder, arg.T));
+}
+
+NBestList Decoder_decodeNBest(
+    Decoder& decoder,
+    py::buffer emissions,
+    int T,
+    int N,
+    py::object scales,
+    py::object offsets) {
+  EmissionsArg arg(emissions, T, N, scales, offsets);
+  auto quantized = arg.view();
+  py::gil_scoped_release release;
+  return NBestList(
+      quantized.decode(decoder, dequantizeChunkSize(decoder, arg.T)));
+}
+
+NBestList Decoder_getAllFinalHypothesisNBest(const Decoder& decoder) {
+  return NBestList(decoder.getAllFinalHypothesis());
+}
+
+/*
+ * The arrays of NBestList and NBestDump are read-only zero-copy views. Their
+ * base is (list, anchor), the anchor being shared by all the views of the
+ * current content of the list. Before add() grows the list, the buffers seen
+ * by living views are moved into their anchor (their address is unchanged)
+ * and the list continues on copies: views remain valid snapshots.
+ */
+constexpr const char* kViewAnchor = "_view_anchor";
+
+using RetiredBuffers = std::vector<std::shared_ptr<void>>;
+
+py::object NBestList_anchor(py::object self) {
+  auto dict = py::reinterpret_borrow<py::dict>(self.attr("__dict__"));
+  if (!dict.contains(kViewAnchor)) {
+    dict[kViewAnchor] = py::capsule(new RetiredBuffers(), [](void* buffers) {
+      delete static_cast<RetiredBuffers*>(buffers);
+    });
+  }
+  return dict[kViewAnchor];
+}
+
+template <typename C, typename T>
+py::array_t<T> NBestList_array(py::object self, std::vector<T> C::* field) {
+  auto& values = self.cast<C&>().*field;
+  auto base = py::make_tuple(self, NBestList_anchor(self));
+  py::array_t<T> array(values.size(), values.data(), base);
+  array.attr("setflags")("write"_a = false);
+  return array;
+}
+
+template <typename C, typename T>
+void NBestList_retire(
+    C& list,
+    RetiredBuffers& retired,
+    std::vector<T> C::* field) {
+  auto buffer = std::make_shared<std::vector<T>>(std::move(list.*field));
+  list.*field = *buffer;
+  retired.push_back(buffer);
+}
+
+/* Call before modifying the list (GIL held) */
+template <typename C, typename... T>
+void NBestList_detachViews(py::object self, std::vector<T> C::*... fields) {
+  auto dict = py::reinterpret_borrow<py::dict>(self.attr("__dict__"));
+  if (!dict.contains(kViewAnchor)) {
+    return;
+  }
+  py::object anchor = dict[kViewAnchor];
+  PyDict_DelItemString(dict.ptr(), kViewAnchor);
+  if (anchor.ref_count() > 1) { // views are alive
+    auto& retired = *static_cast<RetiredBuffers*>(
+        py::reinterpret_borrow<py::capsule>(anchor));
+    auto& list = self.cast<C&>();
+    (void)std::initializer_list<int>{
+        (NBestList_retire(list, retired, fields), 0)...};
+  }
+}
+
+void NBestList_add(py::object self, const DecodeResult& result) {
+  NBestList_detachViews(
+      self,
+      &NBestList::tokens,
+      &NBestList::words,
+      &NBestList::offsets,
+      &NBestList::score,
+      &NBestList::amScore,
+      &NBestList::lmScore);
+  self.cast<NBestList&>().add(result);
+}
+
+DecodeResult NBestList_getitem(const NBestList& nbest, int i) {
+  return nbest.get(i < 0 ? i + nbest.size() : i);
+}
+
+void NBestDump_save(const NBestDump& dump, const std::string& path) {
+  py::gil_scoped_release release;
+  dump.save(path);
+}
+
+void NBestDump_add(
+    py::object self,
+    const std::string& id,
+    const NBestList& nbest,
+    bool unique) {
+  NBestList_detachViews(
+      self,
+      &NBestDump::hypOffsets,
+      &NBestDump::offsets,
+      &NBestDump::words,
+      &NBestDump::score,
+      &NBestDump::amScore,
+      &NBestDump::lmScore);
+  self.cast<NBestDump&>().add(id, nbest, unique);
+}
+
+NBestDump NBestDump_load(const std::string& path) {
+  py::gil_scoped_release release;
+  return NBestDump::load(path);
+}
+
+StreamingDecodeResult StreamingDecodeSession_decodeChunk(
+    StreamingDecodeSession& session,
+    py::buffer emissions,
+    int T) {
+  py::buffer_info info = emissions.request();
+  int N = session.nTokens();
+  checkEmissionsBuffer(info, T, N);
+  py::gil_scoped_release release;
+  return session.decodeChunk(static_cast<const float*>(info.ptr), T);
+}
+
+/**
+ * Emissions of a batch are given either as a sequence of [T_i, N] buffers or
+ * as one padded [B, T, N] buffer. In both cases `lengths` (optional) gives the
+ * number of valid frames of each utterance. Buffers are not copied.
+ */
+std::vector<std::vector<DecodeResult>> BatchDecoder_decode(
+    BatchDecoder& decoder,
+    py::object emissions,
+    py::object lengths,
+    int numThreads) {
+  std::vector<py::buffer_info> infos;
+  std::vector<const float*> emissionPtrs;
+  std::vector<int> T;
+  int N = -1;
+
+  if (py::isinstance<py::buffer>(emissions)) {
+    infos.emplace_back(emissions.cast<py::buffer>().request());
+    const py::buffer_info& info = infos.back();
+    if (info.ndim != 3) {
+      throw std::invalid_argument(
+          "batched emissions must be of shape [B, T, N], got " +
+          std::to_string(info.ndim) + " dimensions");
+    }
+    int frames = info.shape[1];
+    N = info.shape[2];
+    // Check a single [T, N] slice, all of them share the same strides
+    py::buffer_info slice(
+        info.ptr,
+        info.itemsize,
+        info.format,
+        2,
+        {info.shape[1], info.shape[2]},
+        {info.strides[1], info.strides[2]});
+    checkEmissionsBuffer(slice, frames, N);
+    for (int b = 0; b < info.shape[0]; b++) {
+      emissionPtrs.push_back(
+          reinterpret_cast<const float*>(
+              static_cast<const char*>(info.ptr) + b * info.strides[0]));
+      T.push_back(frames);
+    }
+  } else {
+    for (auto item : emissions) {
+      infos.emplace_back(item.cast<py::buffer>().request());
+      int frames = -1;
+      checkEmissionsBuffer(infos.back(), frames, N);
+      emissionPtrs.push_back(static_cast<const float*>(infos.back().ptr));
+      T.push_back(frames);
+    }
+  }
+
+  if (!lengths.is_none()) {
+    auto lens = lengths.cast<std::vector<int>>();
+    if (lens.size() != T.size()) {
+      throw std::invalid_argument(
+          "got " + std::to_string(lens.size()) + " lengths for " +
+          std::to_string(T.size()) + " utterances");
+    }
+    for (int i = 0; i < lens.size(); i++) {
+      if (lens[i] < 0 || lens[i] > T[i]) {
+        throw std::invalid_argument(
+            "invalid length " + std::to_string(lens[i]) + " for utterance " +
+            std::to_string(i) + " with " + std::to_string(T[i]) + " frames");
+      }
+      T[i] = lens[i];
+    }
+  }
+
+  py::gil_scoped_release release;
+  return decoder.decode(emissionPtrs, T, N, numThreads);
+}
+
+std::vector<NBestList> BatchDecoder_decodeNBest(
+    BatchDecoder& decoder,
+    py::object emissions,
+    py::object lengths,
+    int numThreads) {
+  auto results = BatchDecoder_decode(decoder, emissions, lengths, numThreads);
+  py::gil_scoped_release release;
+  std::vector<NBestList> nbests;
+  nbests.reserve(results.size());
+  for (const auto& result : results) {
+    nbests.emplace_back(result);
+  }
+  return nbests;
+}
+
+/**
+ * Seq2Seq decoders score all the hypothesis of the beam with a single call
+ * of the AM update function per output step. From python it is
+ *
+ *   am_update_func(emissions, prev_tokens, prev_states, t)
+ *       -> (scores, states)
+ *
+ * - `emissions`: [T, N] float32 numpy array, a view on the encoder output given
+ *   to `decode` (only valid during the call)
+ * - `prev_tokens`: [nHyp] int32 numpy array, last token of each hypothesis
+ * - `prev_states`: list of nHyp AM states returned at the previous step (None
+ *   at the first step)
+ * - `t`: output step
+ * - `scores`: [nHyp, nTokens] float array of AM scores of the next token
+ * - `states`: list of nHyp new AM states (any python object), None marks an
+ *   invalid hypothesis which is dropped from the beam
+ *
+ * AM states are python objects kept alive by the decoder through AMStatePtr.
+ */
+AMStatePtr toAMState(py::object obj) {
+  if (obj.is_none()) {
+    return nullptr;
+  }
+  // The decoder may release states while the GIL is not held
+  return AMStatePtr(new py::object(std::move(obj)), [](void* ptr) {
+    py::gil_scoped_acquire gil;
+    delete static_cast<py::object*>(ptr);
+  });
+}
+
+py::object fromAMState(const AMStatePtr& state) {
+  if (!state) {
+    return py::none();
+  }
+  return *static_cast<py::object*>(state.get());
+}
+
+AMUpdateFunc wrapAMUpdateFunc(py::function pyFunc) {
+  // Keep the python callable alive as long as the decoder, free it with the GIL
+  auto func = std::shared_ptr<py::function>(
+      new py::function(std::move(pyFunc)), [](py::function* ptr) {
+        py::gil_scoped_acquire gil;
+        delete ptr;
+      });
+  return [func](
+             const float* emissions,
+             const int N,
+             const int T,
+             const std::vector<int>& rawY,
+             const std::vector<AMStatePtr>& rawPrevStates,
+             int& t) {
+    py::gil_scoped_acquire gil;
+    // no copy of the emissions: `base` makes numpy reference external memory
+    py::array_t<float> emissionsView(
+        {T, N}, emissions, py::capsule(emissions, [](void*) {}));
+    py::array_t<int> prevTokens(rawY.size(), rawY.data());
+    py::list prevStates;
+    for (const auto& state : rawPrevStates) {
+      prevStates.append(fromAMState(state));
+    }
+
+    py::tuple output = (*func)(emissionsView, prevTokens, prevStates, t);
+    if (output.size() != 2) {
+      throw std::invalid_argument(
+          "am_update_func must return a tuple (scores, states)");
+    }
+    auto scores = output[0]
+                      .cast<py::array_t<
+                          float,
+                          py::array::c_style | py::array::forcecast>>();
+    auto states = output[1].cast<py::list>();
+    if (scores.ndim() != 2 || scores.shape(0) != rawY.size() ||
+        states.size() != rawY.size()) {
+      throw std::invalid_argument(
+          "am_update_func must return scores of shape [" +
+          std::to_string(rawY.size()) + ", nTokens] and " +
+          std::to_string(rawY.size()) + " states");
+    }
+
+    int nTokens = scores.shape(1);
+    std::vector<std::vector<float>> amScores(rawY.size());
+    std::vector<AMStatePtr> outStates(rawY.size());
+    for (int i = 0; i < rawY.size(); i++) {
+      amScores[i].assign(
+          scores.data() + i * nTokens, scores.data() + (i + 1) * nTokens);
+      outStates[i] = toAMState(states[i]);
+    }
+    return std::make_pair(std::move(amScores), std::move(outStates));
+  };
+}
+
+FlatTriePtr FlatTrie_fromArrays(
+    int maxChildren,
+    int rootIdx,
+    py::array_t<int, py::array::c_style | py::array::forcecast> indices,
+    py::array_t<int64_t, py::array::c_style | py::array::forcecast> offsets,
+    py::array_t<int, py::array::c_style | py::array::forcecast> labels,
+    py::array_t<float, py::array::c_style | py::array::forcecast> scores,
+    SmearingMode smearMode) {
+  if (indices.ndim() != 1 || offsets.ndim() != 1 || labels.ndim() != 1 ||
+      scores.ndim() != 1) {
+    throw std::invalid_argument("[FlatTrie] arrays should be 1-D");
+  }
+  int nSpellings = labels.shape(0);
+  if (scores.shape(0) != nSpellings || offsets.shape(0) != nSpellings + 1) {
+    throw std::invalid_argument(
+        "[FlatTrie] labels and scores should have one entry per spelling, "
+        "offsets one more");
+  }
+  if (offsets.at(0) != 0 || offsets.at(nSpellings) != indices.shape(0)) {
+    throw std::invalid_argument(
+        "[FlatTrie] offsets should start at 0 and end at len(indices)");
+  }
+
+  py::gil_scoped_release release;
+  return FlatTrie::fromSpellings(
+      maxChildren,
+      rootIdx,
+      indices.data(),
+      offsets.data(),
+      labels.data(),
+      scores.data(),
+      nSpellings,
+      smearMode);
+}
+
+/* Counters of `decoder.stats()`, the sampled beam sizes are numpy arrays */
+py::dict DecoderStats_toDict(const DecoderStats& stats) {
+  py::dict result;
+  result["frames"] = stats.nFrames;
+  result["skipped_frames"] = stats.nSkippedFrames;
+  result["hypotheses"] = stats.nHypotheses;
+  result["candidates"] = stats.nCandidates;
+  result["pruned_candidates"] = stats.nPrunedCandidates;
+  result["avg_beam_size_token"] = stats.averageBeamSizeToken();
+  result["avg_beam_threshold"] = stats.averageBeamThreshold();
+  result["trie_nodes"] = stats.nTrieNodes;
+  result["lm_queries"] = stats.nLmQueries;
+  result["lm_cache_hits"] = stats.nLmCacheHits;
+  result["peak_hypotheses"] = stats.peakHypotheses;
+  result["peak_candidates"] = stats.peakCandidates;
+  result["expand_time"] = stats.expandTime;
+  result["lm_prefetch_time"] = stats.lmPrefetchTime;
+  result["store_time"] = stats.storeTime;
+  result["end_time"] = stats.endTime;
+  result["sample_rate"] = stats.sampleRate;
+  result["sampled_hypotheses"] = py::array_t<int>(
+      stats.sampledHypotheses.size(), stats.sampledHypotheses.data());
+  result["sampled_candidates"] = py::array_t<int>(
+      stats.sampledCandidates.size(), stats.sampledCandidates.data());
+  return result;
+}
+
 } // namespace
 
 PYBIND11_MODULE(_decoder, m) {
@@ -133,7 +738,85 @@ PYBIND11_MODULE(_decoder, m) {
       .def("get_root", &Trie::getRoot)
       .def("insert", &Trie::insert, "indices"_a, "label"_a, "score"_a)
       .def("search", &Trie::search, "indices"_a)
-      .def("smear", &Trie::smear, "smear_mode"_a);
+      .def("smear", &Trie::smear, "smear_mode"_a)
+      .def("save", &Trie::save, "path"_a)
+      .def_static(
+          "load",
+          &Trie::load,
+          "path"_a,
+          "mmap"_a = true,
+          py::call_guard<py::gil_scoped_release>())
+      .def_static(
+          "from_lexicon",
+          &Trie::fromLexicon,
+          "lexicon_path"_a,
+          "token_dict"_a,
+          "word_dict"_a,
+          "lm"_a,
+          "max_reps"_a,
+          "smear_mode"_a,
+          "num_threads"_a = 1,
+          "root_idx"_a = -1,
+          py::call_guard<py::gil_scoped_release>());
+
+  // Read-only, array-backed trie. Nodes returned by `get_root` and `search`
+  // point into the trie arrays and keep the trie alive.
+  py::class_<FlatTrieNode>(m, "FlatTrieNode")
+      .def_readonly("idx", &FlatTrieNode::idx)
+      .def_readonly("first_child", &FlatTrieNode::firstChild)
+      .def_readonly("n_children", &FlatTrieNode::nChildren)
+      .def_readonly("first_label", &FlatTrieNode::firstLabel)
+      .def_readonly("n_labels", &FlatTrieNode::nLabels)
+      .def_readonly("max_score", &FlatTrieNode::maxScore);
+
+  py::class_<FlatTrie, FlatTriePtr>(m, "FlatTrie")
+      .def(py::init<const Trie&>(), "trie"_a)
+      .def_static(
+          "from_arrays",
+          &FlatTrie_fromArrays,
+          "max_children"_a,
+          "root_idx"_a,
+          "indices"_a,
+          "offsets"_a,
+          "labels"_a,
+          "scores"_a,
+          "smear_mode"_a = SmearingMode::MAX)
+      .def_static(
+          "load",
+          &FlatTrie::load,
+          "path"_a,
+          "mmap"_a = true,
+          py::call_guard<py::gil_scoped_release>())
+      .def("save", &FlatTrie::save, "path"_a)
+      .def("share", &FlatTrie::share)
+      .def("is_shared", &FlatTrie::isShared)
+      .def("to_trie", &FlatTrie::toTrie)
+      .def(
+          "get_root",
+          &FlatTrie::getRoot,
+          py::return_value_policy::reference_internal)
+      .def(
+          "search",
+          &FlatTrie::search,
+          "indices"_a,
+          py::return_value_policy::reference_internal)
+      .def(
+          "get_labels",
+          [](const FlatTrie& trie, const FlatTrieNode* node) {
+            auto labels = trie.getLabels(node);
+            return std::vector<int>(labels.begin(), labels.end());
+          },
+          "node"_a)
+      .def(
+          "get_scores",
+          [](const FlatTrie& trie, const FlatTrieNode* node) {
+            return std::vector<float>(
+                trie.getScores(node), trie.getScores(node) + node->nLabels);
+          },
+          "node"_a)
+      .def("n_nodes", &FlatTrie::nNodes)
+      .def("n_labels", &FlatTrie::nLabels)
+      .def("memory_size", &FlatTrie::memorySize);
 
   py::class_<LM, LMPtr, PyLM>(m, "LM")
       .def(py::init<>())
@@ -141,6 +824,28 @@ PYBIND11_MODULE(_decoder, m) {
       .def("score", &LM::score, "state"_a, "usr_token_idx"_a)
       .def("finish", &LM::finish, "state"_a);
 
+  py::class_<BatchLM, BatchLMPtr, PyBatchLM, LM>(m, "BatchLM")
+      .def(py::init<>())
+      .def(
+          "prefetch",
+          &BatchLM::prefetch,
+          "states"_a,
+          "usr_token_indices"_a,
+          py::call_guard<py::gil_scoped_release>());
+
+  py::class_<CachedLM, CachedLMPtr, LM>(m, "CachedLM")
+      .def(
+          py::init<const LMPtr&, int>(),
+          "lm"_a,
+          "capacity"_a,
+          py::keep_alive<1, 2>())
+      .def("clear", &CachedLM::clear)
+      .def("capacity", &CachedLM::capacity)
+      .def("size", &CachedLM::size)
+      .def("hits", &CachedLM::hits)
+      .def("misses", &CachedLM::misses)
+      .def("reset_counters", &CachedLM::resetCounters);
+
   py::class_<LMState, LMStatePtr>(m, "LMState")
       .def(py::init<>())
       .def_readwrite("children", &LMState::children)
@@ -157,7 +862,8 @@ PYBIND11_MODULE(_decoder, m) {
 
   py::enum_<CriterionType>(m, "CriterionType")
       .value("ASG", CriterionType::ASG)
-      .value("CTC", CriterionType::CTC);
+      .value("CTC", CriterionType::CTC)
+      .value("S2S", CriterionType::S2S);
 
   py::class_<DecoderOptions>(m, "DecoderOptions")
       .def(
@@ -189,9 +895,16 @@ PYBIND11_MODULE(_decoder, m) {
       .def_readwrite("word_score", &DecoderOptions::wordScore)
       .def_readwrite("unk_score", &DecoderOptions::unkScore)
       .def_readwrite("sil_score", &DecoderOptions::silScore)
-      .def_readwrite("eos_score", &DecoderOptions::silScore)
+      .def_readwrite("eos_score", &DecoderOptions::eosScore)
+      .def_readwrite("blank_score", &DecoderOptions::blankScore)
       .def_readwrite("log_add", &DecoderOptions::logAdd)
-      .def_readwrite("criterion_type", &DecoderOptions::criterionType);
+      .def_readwrite("criterion_type", &DecoderOptions::criterionType)
+      .def_readwrite(
+          "blank_skip_threshold", &DecoderOptions::blankSkipThreshold)
+      .def_readwrite(
+          "adaptive_beam_min_ratio", &DecoderOptions::adaptiveBeamMinRatio)
+      .def_readwrite(
+          "adaptive_beam_entropy", &DecoderOptions::adaptiveBeamEntropy);
 
   py::class_<DecodeResult>(m, "DecodeResult")
       .def(py::init<int>(), "length"_a)
@@ -201,8 +914,162 @@ PYBIND11_MODULE(_decoder, m) {
       .def_readwrite("words", &DecodeResult::words)
       .def_readwrite("tokens", &DecodeResult::tokens);
 
-  // NB: `decode` and `decodeStep` expect raw emissions pointers.
-  py::class_<LexiconDecoder>(m, "LexiconDecoder")
+  // All the hypotheses of an utterance in flat arrays: the tokens and words
+  // of hypothesis i are tokens[offsets[i]:offsets[i + 1]]. The numpy arrays
+  // are read-only views on the list, no copy is made. They keep showing the
+  // hypotheses they were taken with after add().
+  py::class_<NBestList>(m, "NBestList", py::dynamic_attr())
+      .def(py::init<>())
+      .def(py::init<const std::vector<DecodeResult>&>(), "results"_a)
+      .def_property_readonly(
+          "tokens",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::tokens);
+          })
+      .def_property_readonly(
+          "words",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::words);
+          })
+      .def_property_readonly(
+          "offsets",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::offsets);
+          })
+      .def_property_readonly(
+          "score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::score);
+          })
+      .def_property_readonly(
+          "am_score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::amScore);
+          })
+      .def_property_readonly(
+          "lm_score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestList::lmScore);
+          })
+      .def("add", &NBestList_add, "result"_a)
+      .def("length", &NBestList::length, "i"_a)
+      .def("__len__", &NBestList::size)
+      .def("__getitem__", &NBestList_getitem, "i"_a);
+
+  // The deduplicated n-best lists of many utterances, for rescoring: the
+  // hypotheses of utterance u are hyp_offsets[u]:hyp_offsets[u + 1], the
+  // words of hypothesis i are words[offsets[i]:offsets[i + 1]]. Arrays are
+  // read-only views on the dump, which keep showing the utterances they were
+  // taken with after add(). See NBestDump.h for the file format.
+  py::class_<NBestDump>(m, "NBestDump", py::dynamic_attr())
+      .def(py::init<>())
+      .def_readonly("ids", &NBestDump::ids)
+      .def_property_readonly(
+          "hyp_offsets",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::hypOffsets);
+          })
+      .def_property_readonly(
+          "offsets",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::offsets);
+          })
+      .def_property_readonly(
+          "words",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::words);
+          })
+      .def_property_readonly(
+          "score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::score);
+          })
+      .def_property_readonly(
+          "am_score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::amScore);
+          })
+      .def_property_readonly(
+          "lm_score",
+          [](py::object self) {
+            return NBestList_array(self, &NBestDump::lmScore);
+          })
+      .def("add", &NBestDump_add, "id"_a, "nbest"_a, "unique"_a = true)
+      .def("n_hypotheses", &NBestDump::nHypotheses)
+      .def("save", &NBestDump_save, "path"_a)
+      .def_static("load", &NBestDump_load, "path"_a)
+      .def("__len__", &NBestDump::size);
+
+  // NB: `decode` and `decodeStep` accept either raw emissions pointers or any
+  // float32 buffer of shape [T, N] (wrapped without copying). float16 buffers,
+  // and int8 buffers with their per-frame `scales` and `offsets`, are
+  // converted to float32 a few frames at a time while decoding.
+  // The GIL is released while decoding, so several decoders can run in
+  // parallel Python threads. LMs and AM update functions implemented in Python
+  // re-acquire it for each call into Python.
+  py::class_<Decoder, DecoderPtr>(m, "Decoder")
+      .def(
+          "decode_begin",
+          &Decoder::decodeBegin,
+          py::call_guard<py::gil_scoped_release>())
+      .def(
+          "decode_step",
+          &Decoder_decodeStep,
+          "emissions"_a,
+          "T"_a,
+          "N"_a,
+          py::call_guard<py::gil_scoped_release>())
+      .def(
+          "decode_step",
+          &Decoder_decodeStepBuffer,
+          "emissions"_a,
+          "T"_a = -1,
+          "N"_a = -1,
+          "scales"_a = py::none(),
+          "offsets"_a = py::none())
+      .def(
+          "decode_end",
+          &Decoder::decodeEnd,
+          py::call_guard<py::gil_scoped_release>())
+      .def(
+          "decode",
+          &Decoder_decode,
+          "emissions"_a,
+          "T"_a,
+          "N"_a,
+          py::call_guard<py::gil_scoped_release>())
+      .def(
+          "decode",
+          &Decoder_decodeBuffer,
+          "emissions"_a,
+          "T"_a = -1,
+          "N"_a = -1,
+          "scales"_a = py::none(),
+          "offsets"_a = py::none())
+      .def(
+          "prune",
+          &Decoder::prune,
+          "look_back"_a = 0,
+          py::call_guard<py::gil_scoped_release>())
+      .def("n_decoded_frames_in_buffer", &Decoder::nDecodedFramesInBuffer)
+      .def(
+          "get_best_hypothesis", &Decoder::getBestHypothesis, "look_back"_a = 0)
+      .def("get_all_final_hypothesis", &Decoder::getAllFinalHypothesis)
+      .def(
+          "decode_nbest",
+          &Decoder_decodeNBest,
+          "emissions"_a,
+          "T"_a = -1,
+          "N"_a = -1,
+          "scales"_a = py::none(),
+          "offsets"_a = py::none())
+      .def(
+          "get_all_final_hypothesis_nbest",
+          &Decoder_getAllFinalHypothesisNBest,
+          py::call_guard<py::gil_scoped_release>());
+
+  py::class_<LexiconDecoder, std::shared_ptr<LexiconDecoder>, Decoder>(
+      m, "LexiconDecoder")
       .def(py::init<
            const DecoderOptions&,
            const TriePtr,
@@ -212,19 +1079,208 @@ PYBIND11_MODULE(_decoder, m) {
            const int,
            const std::vector<float>&,
            const bool>())
-      .def("decode_begin", &LexiconDecoder::decodeBegin)
       .def(
-          "decode_step",
-          &LexiconDecoder_decodeStep,
+          "enable_stats",
+          &LexiconDecoder::enableStats,
+          "enable"_a = true,
+          "sample_rate"_a = 0)
+      .def("stats", [](const LexiconDecoder& decoder) {
+        return DecoderStats_toDict(decoder.stats());
+      });
+
+  py::class_<FlatLexiconDecoder, std::shared_ptr<FlatLexiconDecoder>, Decoder>(
+      m, "FlatLexiconDecoder")
+      .def(
+          py::init<
+              const DecoderOptions&,
+              const FlatTriePtr,
+              const LMPtr,
+              const int,
+              const int,
+              const int,
+              const std::vector<float>&,
+              const bool>(),
+          "options"_a,
+          "trie"_a,
+          "lm"_a,
+          "sil_idx"_a,
+          "blank_idx"_a,
+          "unk_idx"_a,
+          "transitions"_a,
+          "is_token_lm"_a)
+      .def(
+          "enable_stats",
+          &FlatLexiconDecoder::enableStats,
+          "enable"_a = true,
+          "sample_rate"_a = 0)
+      .def("stats", [](const FlatLexiconDecoder& decoder) {
+        return DecoderStats_toDict(decoder.stats());
+      });
+
+  py::class_<LexiconFreeDecoder, std::shared_ptr<LexiconFreeDecoder>, Decoder>(
+      m, "LexiconFreeDecoder")
+      .def(
+          py::init<
+              const DecoderOptions&,
+              const LMPtr,
+              const int,
+              const int,
+              const std::vector<float>&>(),
+          "options"_a,
+          "lm"_a,
+          "sil_idx"_a,
+          "blank_idx"_a,
+          "transitions"_a);
+
+  // Seq2Seq decoders are offline only, use `decode`
+  py::class_<
+      LexiconSeq2SeqDecoder,
+      std::shared_ptr<LexiconSeq2SeqDecoder>,
+      Decoder>(m, "LexiconSeq2SeqDecoder")
+      .def(
+          py::init([](const DecoderOptions& opt,
+                      const TriePtr& trie,
+                      const LMPtr& lm,
+                      int eos,
+                      py::function amUpdateFunc,
+                      int maxOutputLength,
+                      bool isLmToken) {
+            return new LexiconSeq2SeqDecoder(
+                opt,
+                trie,
+                lm,
+                eos,
+                wrapAMUpdateFunc(std::move(amUpdateFunc)),
+                maxOutputLength,
+                isLmToken);
+          }),
+          "options"_a,
+          "trie"_a,
+          "lm"_a,
+          "eos_idx"_a,
+          "am_update_func"_a,
+          "max_output_length"_a,
+          "is_token_lm"_a);
+
+  py::class_<
+      LexiconFreeSeq2SeqDecoder,
+      std::shared_ptr<LexiconFreeSeq2SeqDecoder>,
+      Decoder>(m, "LexiconFreeSeq2SeqDecoder")
+      .def(
+          py::init([](const DecoderOptions& opt,
+                      const LMPtr& lm,
+                      int eos,
+                      py::function amUpdateFunc,
+                      int maxOutputLength) {
+            return new LexiconFreeSeq2SeqDecoder(
+                opt,
+                lm,
+                eos,
+                wrapAMUpdateFunc(std::move(amUpdateFunc)),
+                maxOutputLength);
+          }),
+          "options"_a,
+          "lm"_a,
+          "eos_idx"_a,
+          "am_update_func"_a,
+          "max_output_length"_a);
+
+  // Decodes a batch of utterances with native threads, each thread having its
+  // own LexiconDecoder (or FlatLexiconDecoder if the trie is a FlatTrie) and
+  // all of them sharing the same trie and LM.
+  py::class_<BatchDecoder>(m, "BatchLexiconDecoder")
+      .def(
+          py::init([](const DecoderOptions& opt,
+                      const TriePtr& trie,
+                      const LMPtr& lm,
+                      int sil,
+                      int blank,
+                      int unk,
+                      const std::vector<float>& transitions,
+                      bool isLmToken) {
+            return new BatchDecoder([=]() {
+              return std::make_shared<LexiconDecoder>(
+                  opt, trie, lm, sil, blank, unk, transitions, isLmToken);
+            });
+          }),
+          "options"_a,
+          "trie"_a,
+          "lm"_a,
+          "sil_idx"_a,
+          "blank_idx"_a,
+          "unk_idx"_a,
+          "transitions"_a,
+          "is_token_lm"_a)
+      .def(
+          py::init([](const DecoderOptions& opt,
+                      const FlatTriePtr& trie,
+                      const LMPtr& lm,
+                      int sil,
+                      int blank,
+                      int unk,
+                      const std::vector<float>& transitions,
+                      bool isLmToken) {
+            return new BatchDecoder([=]() {
+              return std::make_shared<FlatLexiconDecoder>(
+                  opt, trie, lm, sil, blank, unk, transitions, isLmToken);
+            });
+          }),
+          "options"_a,
+          "trie"_a,
+          "lm"_a,
+          "sil_idx"_a,
+          "blank_idx"_a,
+          "unk_idx"_a,
+          "transitions"_a,
+          "is_token_lm"_a)
+      .def(
+          "decode_batch",
+          &BatchDecoder_decode,
           "emissions"_a,
-          "T"_a,
-          "N"_a)
-      .def("decode_end", &LexiconDecoder::decodeEnd)
-      .def("decode", &LexiconDecoder_decode, "emissions"_a, "T"_a, "N"_a)
-      .def("prune", &LexiconDecoder::prune, "look_back"_a = 0)
-      .def(
-          "get_best_hypothesis",
-          &LexiconDecoder::getBestHypothesis,
-          "look_back"_a = 0)
-      .def("get_all_final_hypothesis", &LexiconDecoder::getAllFinalHypothesis);
+          "lengths"_a = py::none(),
+          "num_threads"_a = std::max(
+              1, static_cast<int>(std::thread::hardware_concurrency())))
+      .def(
+          "decode_batch_nbest",
+          &BatchDecoder_decodeNBest,
+          "emissions"_a,
+          "lengths"_a = py::none(),
+          "num_threads"_a = std::max(
+              1, static_cast<int>(std::thread::hardware_concurrency())))
+      // waits for concurrent decode_batch() calls, whose LM may need the GIL
+      .def(
+          "n_decoders",
+          &BatchDecoder::nDecoders,
+          py::call_guard<py::gil_scoped_release>());
+
+  py::class_<StreamingDecodeResult>(m, "StreamingDecodeResult")
+      .def_readonly("stable", &StreamingDecodeResult::stable)
+      .def_readonly("partial", &StreamingDecodeResult::partial)
+      .def_readonly("latency", &StreamingDecodeResult::latency);
+
+  // Chunks are [T, N] float32 buffers (or 1-D with T given), the GIL is
+  // released while decoding them
+  py::class_<StreamingDecodeSession>(m, "StreamingDecodeSession")
+      .def(
+          py::init<const DecoderPtr&, int, int>(),
+          "decoder"_a,
+          "N"_a,
+          "look_back"_a = 50)
+      .def(
+          "decode_chunk",
+          &StreamingDecodeSession_decodeChunk,
+          "emissions"_a,
+          "T"_a = -1)
+      .def(
+          "finish",
+          &StreamingDecodeSession::finish,
+          py::call_guard<py::gil_scoped_release>())
+      .def(
+          "reset",
+          &StreamingDecodeSession::reset,
+          py::call_guard<py::gil_scoped_release>())
+      .def("n_decoded_frames", &StreamingDecodeSession::nDecodedFrames)
+      .def("n_stable_frames", &StreamingDecodeSession::nStableFrames)
+      .def("n_frames_in_buffer", &StreamingDecodeSession::nFramesInBuffer)
+      .def("is_finished", &StreamingDecodeSession::isFinished);
 }
@@ -6,19 +6,25 @@
  * LICENSE file in the root directory of this source tree.
  */
 
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <thread>
+
+#include "libraries/feature/BatchFeatures.h"
 #include "libraries/feature/Ceplifter.h"
 #include "libraries/feature/Dct.h"
 #include "libraries/feature/Derivatives.h"
 #include "libraries/feature/Dither.h"
 #include "libraries/feature/FeatureParams.h"
+#include "libraries/feature/FftPlan.h"
 #include "libraries/feature/Mfcc.h"
 #include "libraries/feature/Mfsc.h"
 #include "libraries/feature/PowerSpectrum.h"
 #include "libraries/feature/PreEmphasis.h"
 #include "libraries/feature/SpeechUtils.h"
+#include "libraries/feature/StreamingFeatures.h"
 #include "libraries/feature/TriFilterbank.h"
 #include "libraries/feature/Windowing.h"
 
@@ -29,6 +35,7 @@ using WindowType = w2l::WindowType;
 using FrequencyScale = w2l::FrequencyScale;
 using FeatureParams = w2l::FeatureParams;
 
+using BatchFeatures = w2l::BatchFeatures;
 using Ceplifter = w2l::Ceplifter;
 using Dct = w2l::Dct;
 using Derivatives = w2l::Derivatives;
@@ -37,9 +44,206 @@ using Mfcc = w2l::Mfcc;
 using Mfsc = w2l::Mfsc;
 using PowerSpectrum = w2l::PowerSpectrum;
 using PreEmphasis = w2l::PreEmphasis;
+using StreamingFeatures = w2l::StreamingFeatures;
+using StreamingMfcc = w2l::StreamingMfcc;
+using StreamingMfsc = w2l::StreamingMfsc;
 using TriFilterbank = w2l::TriFilterbank;
 using Windowing = w2l::Windowing;
 
+namespace {
+
+using FloatArray =
+    py::array_t<float, py::array::c_style | py::array::forcecast>;
+
+/* Feature size of each frame of an extractor */
+int64_t featureSize(const PowerSpectrum& extractor) {
+  return extractor.getFeatureParams().powSpecFeatSz();
+}
+
+int64_t featureSize(const Mfsc& extractor) {
+  return extractor.getFeatureParams().mfscFeatSz();
+}
+
+int64_t featureSize(const Mfcc& extractor) {
+  return extractor.getFeatureParams().mfccFeatSz();
+}
+
+/*
+ * Numpy array of the given shape owning `values`, which are moved into it,
+ * not copied
+ */
+template <typename T>
+py::array_t<T> toArray(
+    std::vector<T>&& values,
+    const std::vector<size_t>& shape) {
+  auto owner = new std::vector<T>(std::move(values));
+  py::capsule free(
+      owner, [](void* ptr) { delete static_cast<std::vector<T>*>(ptr); });
+  return py::array_t<T>(shape, owner->data(), free);
+}
+
+/*
+ * Features [frames, feat_dim] of a 1-D signal. A C-contiguous float32 array
+ * (or any buffer numpy can view as one) is read in place, other inputs
+ * (lists, float64 arrays...) are converted first.
+ */
+template <class Extractor>
+py::array_t<float> Extractor_apply(Extractor& extractor, FloatArray input) {
+  if (input.ndim() != 1) {
+    throw std::invalid_argument(
+        "input must be a 1-D signal, got " + std::to_string(input.ndim()) +
+        " dimensions");
+  }
+  std::vector<float> features;
+  {
+    py::gil_scoped_release release;
+    features = extractor.apply(input.data(), input.size());
+  }
+  size_t featSz = featureSize(extractor);
+  size_t nFrames = features.size() / featSz;
+  return toArray(std::move(features), {nFrames, featSz});
+}
+
+/*
+ * Features [batch, frames, feat_dim] of signals of the same length, given as
+ * a [batch, T] array or as a 1-D array of `batch_sz` signals concatenated
+ * (batch_sz = 0: the rows of the 2-D array)
+ */
+template <class Extractor>
+py::array_t<float>
+Extractor_batchApply(Extractor& extractor, FloatArray input, int batchSz) {
+  if (input.ndim() == 2) {
+    if (batchSz != 0 && batchSz != input.shape(0)) {
+      throw std::invalid_argument(
+          "batch_sz is " + std::to_string(batchSz) + " but input has " +
+          std::to_string(input.shape(0)) + " rows");
+    }
+    batchSz = input.shape(0);
+  } else if (input.ndim() != 1 || batchSz == 0) {
+    throw std::invalid_argument(
+        "input must be a [batch, T] array, or a 1-D array with batch_sz");
+  }
+  std::vector<float> features;
+  {
+    py::gil_scoped_release release;
+    features = extractor.batchApply(input.data(), input.size(), batchSz);
+  }
+  size_t featSz = featureSize(extractor);
+  size_t nFrames = features.size() / (featSz * batchSz);
+  return toArray(
+      std::move(features), {static_cast<size_t>(batchSz), nFrames, featSz});
+}
+
+/* BatchFeatures with extractors of the type and parameters of `extractor` */
+template <class Extractor>
+BatchFeatures* BatchFeatures_create(const Extractor& extractor) {
+  auto params = extractor.getFeatureParams();
+  return new BatchFeatures(
+      [params]() { return std::make_shared<Extractor>(params); });
+}
+
+/* Same for Mfsc and Mfcc, keeping their frameIndependent() */
+template <class Extractor>
+BatchFeatures* BatchFeatures_createMfsc(const Extractor& extractor) {
+  auto params = extractor.getFeatureParams();
+  bool frameIndependent = extractor.frameIndependent();
+  return new BatchFeatures([params, frameIndependent]() {
+    return std::make_shared<Extractor>(params, frameIndependent);
+  });
+}
+
+/*
+ * Features of signals of various lengths, given either as a sequence of 1-D
+ * arrays or as a flat 1-D array with the `offsets` (B + 1) of the B signals
+ * in it. Returns the features of all the signals [frames, feat_dim] and the
+ * offsets (B + 1) of the signals in them, in frames. Float32 C-contiguous
+ * arrays are read in place.
+ */
+py::tuple BatchFeatures_extractBatch(
+    BatchFeatures& batchFeatures,
+    py::object signals,
+    int numThreads,
+    py::object offsets) {
+  std::vector<FloatArray> arrays;
+  std::vector<const float*> inputs;
+  std::vector<int64_t> inputSizes;
+  if (!offsets.is_none()) {
+    arrays.emplace_back(signals.cast<FloatArray>());
+    auto bounds = offsets.cast<
+        py::array_t<int64_t, py::array::c_style | py::array::forcecast>>();
+    if (arrays[0].ndim() != 1 || bounds.ndim() != 1 || bounds.size() == 0) {
+      throw std::invalid_argument(
+          "with offsets, signals must be a 1-D array and offsets a 1-D array "
+          "of B + 1 offsets");
+    }
+    const int64_t* bound = bounds.data();
+    for (int i = 0; i + 1 < bounds.size(); i++) {
+      if (bound[i] < 0 || bound[i + 1] < bound[i] ||
+          bound[i + 1] > arrays[0].size()) {
+        throw std::invalid_argument(
+            "invalid offsets " + std::to_string(bound[i]) + ", " +
+            std::to_string(bound[i + 1]) + " for signal " + std::to_string(i) +
+            " in " + std::to_string(arrays[0].size()) + " samples");
+      }
+      inputs.push_back(arrays[0].data() + bound[i]);
+      inputSizes.push_back(bound[i + 1] - bound[i]);
+    }
+  } else {
+    for (auto item : signals) {
+      arrays.emplace_back(item.cast<FloatArray>());
+      if (arrays.back().ndim() != 1) {
+        throw std::invalid_argument(
+            "signal " + std::to_string(inputs.size()) + " has " +
+            std::to_string(arrays.back().ndim()) + " dimensions instead of 1");
+      }
+      inputs.push_back(arrays.back().data());
+      inputSizes.push_back(arrays.back().size());
+    }
+  }
+
+  std::vector<float> features;
+  std::vector<int64_t> frameOffsets;
+  {
+    py::gil_scoped_release release;
+    features =
+        batchFeatures.apply(inputs, inputSizes, numThreads, frameOffsets);
+  }
+  size_t featSz = batchFeatures.featureSize();
+  size_t nFrames = frameOffsets.back();
+  size_t nOffsets = frameOffsets.size();
+  return py::make_tuple(
+      toArray(std::move(features), {nFrames, featSz}),
+      toArray(std::move(frameOffsets), {nOffsets}));
+}
+
+/* Features [frames, feat_dim] of the frames completed by a 1-D chunk */
+py::array_t<float> StreamingFeatures_applyChunk(
+    StreamingFeatures& streaming,
+    FloatArray input) {
+  if (input.ndim() != 1) {
+    throw std::invalid_argument(
+        "input must be a 1-D chunk, got " + std::to_string(input.ndim()) +
+        " dimensions");
+  }
+  std::vector<float> features;
+  {
+    py::gil_scoped_release release;
+    features = streaming.applyChunk(input.data(), input.size());
+  }
+  size_t featSz = streaming.featureSize();
+  size_t nFrames = features.size() / featSz;
+  return toArray(std::move(features), {nFrames, featSz});
+}
+
+py::array_t<float> StreamingFeatures_finish(StreamingFeatures& streaming) {
+  auto features = streaming.finish();
+  size_t featSz = streaming.featureSize();
+  size_t nFrames = features.size() / featSz;
+  return toArray(std::move(features), {nFrames, featSz});
+}
+
+} // namespace
+
 PYBIND11_MODULE(_feature, m) {
   py::enum_<WindowType>(m, "WindowType")
       .value("HAMMING", WindowType::HAMMING)
@@ -120,7 +324,7 @@ PYBIND11_MODULE(_feature, m) {
       .def("apply_in_place", &Ceplifter::applyInPlace, "input"_a);
   py::class_<Dct>(m, "Dct")
       .def(py::init<int64_t, int64_t>(), "num_filters"_a, "num_ceps"_a)
-      .def("apply", &Dct::apply, "input"_a);
+      .def("apply", &Dct::apply, "input"_a, "frame_independent"_a = false);
   py::class_<Derivatives>(m, "Derivatives")
       .def(py::init<int64_t, int64_t>(), "delta_window"_a, "acc_window"_a)
       .def("apply", &Derivatives::apply, "input"_a, "num_feat"_a);
@@ -128,24 +332,74 @@ PYBIND11_MODULE(_feature, m) {
       .def(py::init<float>(), "dither_val"_a)
       .def("apply", &Dither::apply, "input"_a)
       .def("apply_in_place", &Dither::applyInPlace, "input"_a);
+  // Featurization releases the GIL, FFT buffers are guarded by a mutex inside
+  // each extractor. Signals and features are numpy arrays, see
+  // Extractor_apply().
   py::class_<Mfcc>(m, "Mfcc")
-      .def(py::init<const FeatureParams&>(), "params"_a)
-      .def("apply", &Mfcc::apply, "input"_a)
-      .def("batch_apply", &Mfcc::batchApply, "input"_a, "batch_sz"_a)
+      .def(
+          py::init<const FeatureParams&, bool>(),
+          "params"_a,
+          "frame_independent"_a = false)
+      .def("apply", &Extractor_apply<Mfcc>, "input"_a)
+      .def(
+          "batch_apply",
+          &Extractor_batchApply<Mfcc>,
+          "input"_a,
+          "batch_sz"_a = 0)
       .def("output_size", &Mfcc::outputSize, "input_sz"_a)
       .def("get_feature_params", &Mfcc::getFeatureParams);
   py::class_<Mfsc>(m, "Mfsc")
-      .def(py::init<const FeatureParams&>(), "params"_a)
-      .def("apply", &Mfsc::apply, "input"_a)
-      .def("batch_apply", &Mfsc::batchApply, "input"_a, "batch_sz"_a)
+      .def(
+          py::init<const FeatureParams&, bool>(),
+          "params"_a,
+          "frame_independent"_a = false)
+      .def("apply", &Extractor_apply<Mfsc>, "input"_a)
+      .def(
+          "batch_apply",
+          &Extractor_batchApply<Mfsc>,
+          "input"_a,
+          "batch_sz"_a = 0)
       .def("output_size", &Mfsc::outputSize, "input_sz"_a)
       .def("get_feature_params", &Mfsc::getFeatureParams);
   py::class_<PowerSpectrum>(m, "PowerSpectrum")
       .def(py::init<const FeatureParams&>(), "params"_a)
-      .def("apply", &PowerSpectrum::apply, "input"_a)
-      .def("batch_apply", &PowerSpectrum::batchApply, "input"_a, "batch_sz"_a)
+      .def("apply", &Extractor_apply<PowerSpectrum>, "input"_a)
+      .def(
+          "batch_apply",
+          &Extractor_batchApply<PowerSpectrum>,
+          "input"_a,
+          "batch_sz"_a = 0)
       .def("output_size", &PowerSpectrum::outputSize, "input_sz"_a)
       .def("get_feature_params", &PowerSpectrum::getFeatureParams);
+  // Features of a batch of signals of various lengths with native threads,
+  // each thread having its own extractor of the type and parameters of the
+  // one given.
+  py::class_<BatchFeatures>(m, "BatchFeatures")
+      .def(py::init(&BatchFeatures_createMfsc<Mfcc>), "extractor"_a)
+      .def(py::init(&BatchFeatures_createMfsc<Mfsc>), "extractor"_a)
+      .def(py::init(&BatchFeatures_create<PowerSpectrum>), "extractor"_a)
+      .def(
+          "extract_batch",
+          &BatchFeatures_extractBatch,
+          "signals"_a,
+          "num_threads"_a = std::max(
+              1, static_cast<int>(std::thread::hardware_concurrency())),
+          "offsets"_a = py::none())
+      .def("feature_size", &BatchFeatures::featureSize)
+      .def("n_extractors", &BatchFeatures::nExtractors);
+  // Features of a signal given chunk by chunk, the same as the ones of Mfsc
+  // and Mfcc with frame_independent=True on the whole signal.
+  py::class_<StreamingFeatures>(m, "StreamingFeatures")
+      .def("apply_chunk", &StreamingFeatures_applyChunk, "input"_a)
+      .def("finish", &StreamingFeatures_finish)
+      .def("reset", &StreamingFeatures::reset)
+      .def("n_frames", &StreamingFeatures::nFrames)
+      .def("feature_size", &StreamingFeatures::featureSize)
+      .def("get_feature_params", &StreamingFeatures::getFeatureParams);
+  py::class_<StreamingMfsc, StreamingFeatures>(m, "StreamingMfsc")
+      .def(py::init<const FeatureParams&>(), "params"_a);
+  py::class_<StreamingMfcc, StreamingFeatures>(m, "StreamingMfcc")
+      .def(py::init<const FeatureParams&>(), "params"_a);
   py::class_<PreEmphasis>(m, "PreEmphasis")
       .def(py::init<float, int64_t>(), "alpha"_a, "N"_a)
       .def("apply", &PreEmphasis::apply, "input"_a)
@@ -165,13 +419,26 @@ PYBIND11_MODULE(_feature, m) {
           "low_freq"_a = 0,
           "high_freq"_a = -1,
           "freq_scale"_a = FrequencyScale::MEL)
-      .def("apply", &TriFilterbank::apply, "input"_a, "mel_floor"_a = 0.0)
+      .def(
+          "apply",
+          &TriFilterbank::apply,
+          "input"_a,
+          "mel_floor"_a = 0.0,
+          "frame_independent"_a = false)
       .def("filterbank", &TriFilterbank::filterbank);
   py::class_<Windowing>(m, "Windowing")
       .def(py::init<int64_t, WindowType>(), "N"_a, "window"_a)
       .def("apply", &Windowing::apply, "input"_a)
       .def("apply_in_place", &Windowing::applyInPlace, "input"_a);
 
-  m.def("frame_signal", w2l::frameSignal, "input"_a, "params"_a);
+  m.def(
+      "frame_signal",
+      static_cast<std::vector<float> (*)(
+          const std::vector<float>&, const w2l::FeatureParams&)>(
+          w2l::frameSignal),
+      "input"_a,
+      "params"_a);
   m.def("cblas_gemm", w2l::cblasGemm, "A"_a, "B"_a, "n"_a, "k"_a);
+  m.def("import_fft_wisdom", w2l::importFftWisdom, "path"_a);
+  m.def("export_fft_wisdom", w2l::exportFftWisdom, "path"_a);
 }
@@ -1,3 +1,4 @@
 #!/usr/bin/env python3
 
 from wav2letter._decoder import *
+from wav2letter.decoder.nbest import save_nbest_text
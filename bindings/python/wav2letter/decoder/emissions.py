@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Emission dumps with a reduced precision. Decoders read float16 emissions, or
+int8 emissions with a scale and an offset per frame, and convert them to
+float32 a few frames at a time while decoding:
+
+    dump = load_emissions(path)
+    results = decoder.decode(dump.emissions, scales=dump.scales, offsets=dump.offsets)
+
+The file holds a header (magic, version, type, T, N) followed by the float32
+scales and offsets of int8 emissions and the [T, N] emissions themselves, so
+that `load_emissions` maps it in memory without reading it.
+
+`load_dump_dir` reads the float32 dumps of the decoder tests (src/decoder/test):
+a directory with T and N in TN.bin, emission.bin and transition.bin.
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+
+# `scales` and `offsets` are None unless emissions are int8
+EmissionsDump = namedtuple("EmissionsDump", ["emissions", "scales", "offsets"])
+
+_MAGIC = b"W2LEMIT\0"
+_VERSION = 1
+_HEADER = struct.Struct("<8siiqq")
+_DTYPES = ["float32", "float16", "int8"]
+
+
+def quantize_emissions(emissions, dtype="int8", clip=None):
+    """
+    Convert float32 [T, N] emissions to `dtype` ("float32", "float16" or
+    "int8"), return an EmissionsDump.
+
+    int8 emissions are `offsets[t] + scales[t] * (q + 128)`, spreading the 256
+    levels between the min and the max of each frame. If `clip` is given,
+    scores lower than the max of the frame minus `clip` are raised to it,
+    which gives a finer resolution to the scores that can be in the beam.
+    """
+    if dtype not in _DTYPES:
+        raise ValueError("dtype must be one of " + ", ".join(_DTYPES))
+    emissions = np.asarray(emissions, dtype=np.float32)
+    if emissions.ndim != 2:
+        raise ValueError("emissions must be of shape [T, N]")
+    if dtype != "int8":
+        return EmissionsDump(emissions.astype(dtype), None, None)
+
+    high = emissions.max(1, initial=-np.inf)
+    low = emissions.min(1, initial=np.inf)
+    if clip is not None:
+        low = np.maximum(low, high - clip)
+    scales = ((high - low) / 255).astype(np.float32)
+    levels = (emissions - low[:, None]) / np.where(scales > 0, scales, 1)[:, None]
+    values = (np.clip(np.rint(levels), 0, 255) - 128).astype(np.int8)
+    return EmissionsDump(values, scales, low.astype(np.float32))
+
+
+def dequantize_emissions(dump):
+    """float32 emissions of an EmissionsDump, as the decoders see them"""
+    if dump.scales is None:
+        return dump.emissions.astype(np.float32)
+    levels = dump.emissions.astype(np.float32) + 128
+    return dump.offsets[:, None] + dump.scales[:, None] * levels
+
+
+def save_emissions(path, emissions, dtype="int8", clip=None):
+    """Quantize float32 [T, N] emissions (see quantize_emissions) to a file"""
+    dump = quantize_emissions(emissions, dtype, clip)
+    T, N = dump.emissions.shape
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, _DTYPES.index(dtype), T, N))
+        if dump.scales is not None:
+            f.write(dump.scales.tobytes())
+            f.write(dump.offsets.tobytes())
+        f.write(np.ascontiguousarray(dump.emissions).tobytes())
+
+
+def load_emissions(path, mmap=True):
+    """
+    Read emissions written by save_emissions, return an EmissionsDump. If
+    `mmap` is true, the arrays are views on the file mapped in memory.
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ValueError("invalid emissions file: " + path)
+    magic, version, dtype, T, N = _HEADER.unpack(header)
+    if magic != _MAGIC or not 0 <= dtype < len(_DTYPES):
+        raise ValueError("invalid emissions file: " + path)
+    if version != _VERSION:
+        raise ValueError(
+            "unsupported emissions format version {} in {}".format(version, path)
+        )
+
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+    dtype = np.dtype(_DTYPES[dtype])
+    offset = _HEADER.size
+    scales = offsets = None
+    if dtype == np.int8:
+        scales = data[offset : offset + 4 * T].view(np.float32)
+        offsets = data[offset + 4 * T : offset + 8 * T].view(np.float32)
+        offset += 8 * T
+    if len(data) != offset + T * N * dtype.itemsize:
+        raise ValueError("invalid emissions file: " + path)
+    emissions = data[offset:].view(dtype).reshape(T, N)
+    return EmissionsDump(emissions, scales, offsets)
+
+
+def load_dump_dir(path):
+    """
+    Emissions [T, N] and transitions [N * N] (None if there is no
+    transition.bin) of a float32 dump directory
+    """
+    T, N = np.fromfile(os.path.join(path, "TN.bin"), dtype=np.int32, count=2)
+    emissions = np.fromfile(
+        os.path.join(path, "emission.bin"), dtype=np.float32, count=T * N
+    )
+    if emissions.size != T * N:
+        raise ValueError("truncated emissions in " + path)
+    transitions = None
+    transitions_path = os.path.join(path, "transition.bin")
+    if os.path.exists(transitions_path):
+        transitions = np.fromfile(transitions_path, dtype=np.float32, count=N * N)
+    return emissions.reshape(T, N), transitions
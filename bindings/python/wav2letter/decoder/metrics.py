@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+
+def edit_distance(hypothesis, reference):
+    """Levenshtein distance between two sequences of words (or tokens)"""
+    distances = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hypothesis, 1):
+            previous, distances[j] = (
+                distances[j],
+                min(
+                    distances[j] + 1,
+                    distances[j - 1] + 1,
+                    previous + (ref_word != hyp_word),
+                ),
+            )
+    return distances[-1]
+
+
+def word_error_rate(hypothesis, reference):
+    """Word error rate in percent, as reported by the Decoder binary"""
+    return 100.0 * edit_distance(hypothesis, reference) / max(len(reference), 1)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+from wav2letter.decoder.metrics import word_error_rate
+
+
+def save_nbest_text(dump, path, word_dict, references=None):
+    """
+    Write an NBestDump in the text layout of the Decoder beam dump read by
+    recipes/models/sota/2019/rescoring/rescore.py, one hypothesis per line:
+    `id | decoder score | am score | lm score | wer | transcription`.
+    `references` maps utterance ids to their list of words; the wer column is
+    0 for the utterances without one.
+    """
+    hyp_offsets = dump.hyp_offsets.tolist()
+    offsets = dump.offsets.tolist()
+    words = [word_dict.get_entry(w) for w in dump.words.tolist()]
+    scores = zip(
+        dump.score.tolist(), dump.am_score.tolist(), dump.lm_score.tolist()
+    )
+    with open(path, "w") as f:
+        for u, sample_id in enumerate(dump.ids):
+            reference = references.get(sample_id) if references else None
+            for i in range(hyp_offsets[u], hyp_offsets[u + 1]):
+                score, am_score, lm_score = next(scores)
+                prediction = words[offsets[i] : offsets[i + 1]]
+                wer = word_error_rate(prediction, reference) if reference else 0
+                values = (sample_id, score, am_score, lm_score, wer)
+                f.write(
+                    "{} | {:f} | {:f} | {:f} | {:f} | ".format(*values)
+                    + " ".join(prediction)
+                    + "\n"
+                )
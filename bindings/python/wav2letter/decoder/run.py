@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Decode a list of emission dumps with the lexicon decoder and a KenLM, in
+several worker processes:
+
+    python -m wav2letter.decoder.run emissions.lst hyp.txt \\
+        --tokens letters.lst --lexicon words.lst --lm lm.bin \\
+        --transitions transition.bin --replabel 1 --num_workers 16
+
+Each line of the list file is `<id> <path>` (or a path, used as id). A path is
+an emission file written by `wav2letter.decoder.emissions.save_emissions`
+(float32, float16 or int8), or a directory holding a `TN.bin` and an
+`emission.bin` as dumped for the decoder tests.
+
+The LM and the trie are loaded once, before forking the workers, so that
+their memory is shared by all of them. With `--share`, the trie is a FlatTrie
+in a read-only shared memory segment, the LM must be a binary KenLM (mapped
+from its file by KenLM) and the Python objects of the parent are frozen
+before forking: no page of the model is ever copied into a worker, so N
+workers cost about one model of memory. Lines
+`<id>\\t<transcription>` are written to the output file in the order of the
+list as soon as they are decoded. If the output file already exists, it is a
+checkpoint: its complete lines are kept and decoding resumes after them, so
+that a crashed run can just be started again with the same arguments.
+Throughput and real-time factor are reported on stderr.
+"""
+
+import argparse
+import gc
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+from wav2letter._decoder import (
+    CriterionType,
+    DecoderOptions,
+    FlatLexiconDecoder,
+    FlatTrie,
+    KenLM,
+    LexiconDecoder,
+    SmearingMode,
+    Trie,
+)
+from wav2letter.common import Dictionary, create_word_dict, load_words
+from wav2letter.decoder.emissions import EmissionsDump, load_dump_dir, load_emissions
+
+
+# LM, trie and options of the decoders, see load_decoder_resources()
+DecoderResources = namedtuple(
+    "DecoderResources",
+    [
+        "options",
+        "lm",
+        "trie",
+        "token_dict",
+        "word_dict",
+        "sil_idx",
+        "blank_idx",
+        "unk_idx",
+        "transitions",
+    ],
+)
+
+_KENLM_BINARY_MAGIC = b"mmap lm http://kheafield.com/code"
+
+# Shared by the forked workers, see _init_worker()
+_shared = {}
+
+
+def read_list(path):
+    """(id, path) of each utterance of a list file"""
+    utterances = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) > 2:
+                raise ValueError("invalid line in {}: {}".format(path, line.strip()))
+            utterances.append((fields[0], fields[-1]))
+    ids = [id for id, _ in utterances]
+    if len(set(ids)) != len(ids):
+        raise ValueError("duplicated utterance ids in " + path)
+    return utterances
+
+
+def load_dump(path):
+    """Emissions of a dump as an EmissionsDump (see load_emissions)"""
+    if os.path.isdir(path):
+        emissions, _ = load_dump_dir(path)
+        return EmissionsDump(emissions, None, None)
+    return load_emissions(path)
+
+
+def resume(output_path, utterances):
+    """
+    Number of utterances already decoded in `output_path`, which is truncated
+    after its last complete line
+    """
+    if not os.path.exists(output_path):
+        return 0
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        f.truncate(end)
+    lines = data[:end].decode("utf-8").splitlines()
+    if len(lines) > len(utterances):
+        raise ValueError(output_path + " has more lines than the list")
+    for line, (id, _) in zip(lines, utterances):
+        if line.split("\t", 1)[0] != id:
+            raise ValueError(
+                "{} does not match the list at utterance {}".format(output_path, id)
+            )
+    return len(lines)
+
+
+def _init_worker():
+    resources = _shared["resources"]
+    if isinstance(resources.trie, FlatTrie):
+        decoder_class = FlatLexiconDecoder
+    else:
+        decoder_class = LexiconDecoder
+    _shared["decoder"] = decoder_class(
+        resources.options,
+        resources.trie,
+        resources.lm,
+        resources.sil_idx,
+        resources.blank_idx,
+        resources.unk_idx,
+        resources.transitions,
+        False,
+    )
+
+
+def _decode(utterance):
+    id, path = utterance
+    dump = load_dump(path)
+    start = time.process_time()
+    result = _shared["decoder"].decode(
+        dump.emissions, scales=dump.scales, offsets=dump.offsets
+    )[0]
+    cpu_time = time.process_time() - start
+    word_dict = _shared["resources"].word_dict
+    words = [word_dict.get_entry(w) for w in result.words if w >= 0]
+    return id, " ".join(words), len(dump.emissions), cpu_time
+
+
+def add_decoder_arguments(parser):
+    """Arguments of the LexiconDecoder, see load_decoder_resources()"""
+    parser.add_argument("--tokens", required=True, help="token list (letters.lst)")
+    parser.add_argument("--lexicon", required=True, help="word spellings")
+    parser.add_argument("--lm", required=True, help="KenLM, arpa or binary")
+    parser.add_argument(
+        "--trie", help="trie saved with Trie.save, built from the lexicon if not set"
+    )
+    parser.add_argument(
+        "--transitions", help="ASG transitions, float32 [Ntokens, Ntokens]"
+    )
+    parser.add_argument(
+        "--criterion", choices=["asg", "ctc"], default="asg", help="AM criterion"
+    )
+    parser.add_argument(
+        "--replabel", type=int, default=0, help="number of repetition tokens (ASG)"
+    )
+    parser.add_argument("--beam_size", type=int, default=500)
+    parser.add_argument("--beam_size_token", type=int, default=25)
+    parser.add_argument("--beam_threshold", type=float, default=25.0)
+    parser.add_argument("--lm_weight", type=float, default=2.0)
+    parser.add_argument("--word_score", type=float, default=0.0)
+    parser.add_argument("--unk_score", type=float, default=-math.inf)
+    parser.add_argument("--sil_score", type=float, default=0.0)
+    parser.add_argument("--log_add", action="store_true")
+    parser.add_argument("--blank_skip_threshold", type=float, default=1.0)
+    parser.add_argument("--adaptive_beam_min_ratio", type=float, default=1.0)
+
+
+def is_binary_kenlm(path):
+    """Whether `path` is a binary KenLM (see KenLM's build_binary)"""
+    with open(path, "rb") as f:
+        return f.read(len(_KENLM_BINARY_MAGIC)) == _KENLM_BINARY_MAGIC
+
+
+def load_decoder_resources(args, num_threads=1, share=False):
+    """
+    Options, dictionaries, LM and trie described by the arguments of
+    add_decoder_arguments(), as DecoderResources. The trie is built with
+    `num_threads` threads if it is not loaded from a file.
+
+    If `share` is true, the trie is a FlatTrie in memory shared between
+    processes (see FlatTrie.share()) and the LM must be a binary KenLM, so
+    that processes forked afterwards never write to the pages of the model.
+    """
+    if share and not is_binary_kenlm(args.lm):
+        raise ValueError(
+            "sharing the LM needs a binary KenLM (see build_binary), an ARPA "
+            "file is parsed into private memory, only shared until written: "
+            + args.lm
+        )
+    token_dict = Dictionary(args.tokens)
+    for i in range(1, args.replabel + 1):
+        token_dict.add_entry(str(i))
+    word_dict = create_word_dict(load_words(args.lexicon))
+    sil_idx = token_dict.get_index("|")
+    unk_idx = word_dict.get_index("<unk>")
+
+    lm = KenLM(args.lm, word_dict)
+    if args.trie:
+        # a mapped file is shared
+        trie = (FlatTrie if share else Trie).load(args.trie, mmap=True)
+    else:
+        trie = Trie.from_lexicon(
+            args.lexicon,
+            token_dict,
+            word_dict,
+            lm,
+            args.replabel,
+            SmearingMode.MAX,
+            num_threads=num_threads,
+            root_idx=sil_idx,
+        )
+        if share:
+            trie = FlatTrie(trie).share()
+    transitions = []
+    if args.transitions:
+        transitions = np.fromfile(args.transitions, dtype=np.float32)
+
+    options = DecoderOptions(
+        args.beam_size,
+        args.beam_size_token,
+        args.beam_threshold,
+        args.lm_weight,
+        args.word_score,
+        args.unk_score,
+        args.sil_score,
+        0,
+        args.log_add,
+        CriterionType.CTC if args.criterion == "ctc" else CriterionType.ASG,
+    )
+    options.blank_skip_threshold = args.blank_skip_threshold
+    options.adaptive_beam_min_ratio = args.adaptive_beam_min_ratio
+    return DecoderResources(
+        options=options,
+        lm=lm,
+        trie=trie,
+        token_dict=token_dict,
+        word_dict=word_dict,
+        sil_idx=sil_idx,
+        blank_idx=token_dict.get_index("#") if args.criterion == "ctc" else -1,
+        unk_idx=unk_idx,
+        transitions=transitions,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wav2letter.decoder.run",
+        description="Decode a list of emission dumps in several processes",
+    )
+    parser.add_argument("list", help="list file, `<id> <path>` per line")
+    parser.add_argument("output", help="output file, `<id>\\t<transcription>` per line")
+    add_decoder_arguments(parser)
+    parser.add_argument(
+        "--num_workers", type=int, default=os.cpu_count(), help="decoding processes"
+    )
+    parser.add_argument(
+        "--share",
+        action="store_true",
+        help="share the trie and the LM between the workers without any copy, "
+        "needs a binary KenLM",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="start from scratch instead of resuming from the output file",
+    )
+    parser.add_argument(
+        "--sync_every",
+        type=int,
+        default=100,
+        help="the output file is synced to disk every this many utterances",
+    )
+    parser.add_argument(
+        "--frame_stride_ms",
+        type=float,
+        default=10.0,
+        help="duration of an emission frame, to compute the real-time factor",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    utterances = read_list(args.list)
+    if args.overwrite and os.path.exists(args.output):
+        os.remove(args.output)
+    n_done = resume(args.output, utterances)
+    if n_done > 0:
+        print(
+            "resuming after {} utterances of {}".format(n_done, args.output),
+            file=sys.stderr,
+        )
+    todo = utterances[n_done:]
+
+    start = time.perf_counter()
+    _shared["resources"] = load_decoder_resources(
+        args, args.num_workers, args.share
+    )
+    print(
+        "loaded the LM and the trie in {:.1f} s".format(time.perf_counter() - start),
+        file=sys.stderr,
+    )
+
+    start = time.perf_counter()
+    n_frames = 0
+    cpu_time = 0.0
+    pool = None
+    if args.num_workers > 1:
+        if args.share and hasattr(gc, "freeze"):
+            # the garbage collector of the workers won't write into the
+            # objects of the parent (Python 3.7+)
+            gc.collect()
+            gc.freeze()
+        pool = multiprocessing.get_context("fork").Pool(
+            args.num_workers, initializer=_init_worker
+        )
+        results = pool.imap(_decode, todo)
+    else:
+        _init_worker()
+        results = map(_decode, todo)
+    try:
+        with open(args.output, "a", encoding="utf-8") as output:
+            for i, (id, transcription, T, decode_time) in enumerate(results):
+                output.write("{}\t{}\n".format(id, transcription))
+                output.flush()
+                if (i + 1) % args.sync_every == 0:
+                    os.fsync(output.fileno())
+                n_frames += T
+                cpu_time += decode_time
+            os.fsync(output.fileno())
+    finally:
+        if pool is not None:
+            pool.terminate()
+    elapsed = time.perf_counter() - start
+
+    duration = n_frames * args.frame_stride_ms / 1000
+    print(
+        "decoded {} utterances ({:.1f} s of audio) in {:.1f} s: {:.2f} utterances/s, "
+        "RTF {:.4f} (wall time), {:.4f} (CPU time of the workers)".format(
+            len(todo),
+            duration,
+            elapsed,
+            len(todo) / max(elapsed, 1e-9),
+            elapsed / max(duration, 1e-9),
+            cpu_time / max(duration, 1e-9),
+        ),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
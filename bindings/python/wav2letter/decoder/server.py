@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Local decoding service: an asyncio HTTP server (over TCP or a Unix socket) in
+front of a BatchLexiconDecoder.
+
+Concurrent requests are gathered into micro-batches: a batch is sent to the
+decoder when it holds `max_batch_size` requests, or when its oldest request
+has waited `max_delay_ms`. Batches are decoded one at a time by the native
+threads of the BatchLexiconDecoder, each with its own decoder sharing the trie
+and the LM, while the event loop keeps accepting requests for the next batch.
+
+    python -m wav2letter.decoder.server \\
+        --tokens letters.lst --lexicon words.lst --lm lm.bin --port 8080
+
+Endpoints:
+
+- `POST /decode`: the body is float32 little-endian [T, N] emissions, the
+  response is `{"transcription", "words", "score", "latency_ms",
+  "queue_ms", "decode_ms", "batch_size"}`
+- `GET /stats`: queue depth, batch sizes and latency percentiles of the last
+  requests (see DecodeServer.stats())
+
+DecodeClient and generate_load() load-test a server from the same machine,
+see examples/decode_server_benchmark.py.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from wav2letter._decoder import BatchLexiconDecoder
+from wav2letter.decoder.run import add_decoder_arguments, load_decoder_resources
+
+
+_Request = namedtuple("_Request", ["emissions", "future", "arrival"])
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Server Error"}
+
+
+def percentiles(values):
+    """p50, p90, p99 and max of durations in seconds, in milliseconds"""
+    if len(values) == 0:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p90, p99, high = np.percentile(np.asarray(values) * 1000, [50, 90, 99, 100])
+    return {"p50": p50, "p90": p90, "p99": p99, "max": high}
+
+
+class DecodeServer:
+    """
+    Decode the requests with `batch_decoder` (a BatchLexiconDecoder) and
+    `num_threads` threads, in batches of at most `max_batch_size` requests
+    waiting at most `max_delay_ms` for the batch to fill. `n_tokens` is the
+    number of columns of the emissions, `word_dict` maps the words of the
+    results. Latencies of the last `window` requests are kept for stats().
+    """
+
+    def __init__(
+        self,
+        batch_decoder,
+        word_dict,
+        n_tokens,
+        max_batch_size=16,
+        max_delay_ms=5.0,
+        num_threads=1,
+        window=10000,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size should be at least 1")
+        self.batch_decoder = batch_decoder
+        self.word_dict = word_dict
+        self.n_tokens = n_tokens
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.num_threads = num_threads
+
+        # a single thread runs the batches, with native threads inside
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self._server = None
+        self._batcher = None
+
+        self._n_requests = 0
+        self._n_errors = 0
+        self._n_batches = 0
+        self._n_batched_requests = 0
+        self._max_queue_depth = 0
+        self._latencies = deque(maxlen=window)
+        self._queue_times = deque(maxlen=window)
+        self._decode_times = deque(maxlen=window)
+
+    async def start(self, host="127.0.0.1", port=8080, path=None):
+        """
+        Listen on `host`:`port` (port 0 picks a free one), or on the Unix
+        socket `path` if it is given; return the asyncio server
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=path
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, host, port
+            )
+        return self._server
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        self._executor.shutdown()
+
+    async def decode(self, emissions):
+        """Decode float32 [T, N] emissions with the next batch, return a dict"""
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait(_Request(emissions, future, time.perf_counter()))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    def stats(self):
+        """
+        Counters since the start of the server, and percentiles (in ms) of
+        the time spent by the last requests in total, waiting in the queue
+        and being decoded (with their whole batch)
+        """
+        return {
+            "requests": self._n_requests,
+            "errors": self._n_errors,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "batches": self._n_batches,
+            "avg_batch_size": self._n_batched_requests / max(self._n_batches, 1),
+            "latency_ms": percentiles(self._latencies),
+            "queue_ms": percentiles(self._queue_times),
+            "decode_ms": percentiles(self._decode_times),
+        }
+
+    async def _batch_loop(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = batch[0].arrival + self.max_delay
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor,
+                    self.batch_decoder.decode_batch,
+                    [request.emissions for request in batch],
+                    None,
+                    self.num_threads,
+                )
+            except Exception as error:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(error)
+                continue
+            end = time.perf_counter()
+
+            self._n_batches += 1
+            self._n_batched_requests += len(batch)
+            for request, result in zip(batch, results):
+                words = [
+                    self.word_dict.get_entry(w) for w in result[0].words if w >= 0
+                ]
+                self._latencies.append(end - request.arrival)
+                self._queue_times.append(start - request.arrival)
+                self._decode_times.append(end - start)
+                if not request.future.done():
+                    request.future.set_result(
+                        {
+                            "transcription": " ".join(words),
+                            "words": words,
+                            "score": result[0].score,
+                            "latency_ms": (end - request.arrival) * 1000,
+                            "queue_ms": (start - request.arrival) * 1000,
+                            "decode_ms": (end - start) * 1000,
+                            "batch_size": len(batch),
+                        }
+                    )
+
+    async def _route(self, method, target, body):
+        if target == "/stats" and method == "GET":
+            return 200, self.stats()
+        if target != "/decode" or method != "POST":
+            return 404, {"error": "unknown endpoint {} {}".format(method, target)}
+        if len(body) == 0 or len(body) % (4 * self.n_tokens) != 0:
+            self._n_errors += 1
+            return 400, {
+                "error": "the body should be float32 [T, {}] emissions".format(
+                    self.n_tokens
+                )
+            }
+        emissions = np.frombuffer(body, dtype="<f4").reshape(-1, self.n_tokens)
+        try:
+            result = await self.decode(emissions)
+        except Exception as error:
+            self._n_errors += 1
+            return 500, {"error": str(error)}
+        self._n_requests += 1
+        return 200, result
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, response = await self._route(method, target, body)
+                payload = json.dumps(response).encode()
+                writer.write(
+                    "HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n"
+                    "Content-Length: {}\r\n\r\n".format(
+                        status, _REASONS[status], len(payload)
+                    ).encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # client gone or malformed request: drop the connection
+        finally:
+            writer.close()
+
+
+class DecodeClient:
+    """HTTP client of a DecodeServer, over a persistent connection"""
+
+    def __init__(self, host="127.0.0.1", port=8080, path=None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        if self.path is not None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def request(self, method, target, body=b""):
+        """Send a request, return its status and its decoded JSON response"""
+        if self._writer is None:
+            await self.connect()
+        self._writer.write(
+            "{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n".format(
+                method, target, len(body)
+            ).encode("latin-1")
+            + body
+        )
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self._reader.readexactly(length))
+
+    async def decode(self, emissions):
+        """Transcription of float32 [T, N] emissions, see DecodeServer.decode()"""
+        body = np.ascontiguousarray(emissions, dtype="<f4").tobytes()
+        status, response = await self.request("POST", "/decode", body)
+        if status != 200:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def stats(self):
+        return (await self.request("GET", "/stats"))[1]
+
+
+async def generate_load(
+    emissions,
+    n_requests,
+    rate,
+    n_connections=16,
+    host="127.0.0.1",
+    port=8080,
+    path=None,
+    seed=0,
+):
+    """
+    Send `n_requests` decoding requests, cycling over the `emissions` arrays,
+    at Poisson arrival times of `rate` requests per second (all at once if
+    `rate` is 0), over at most `n_connections` connections. Return the
+    throughput and the percentiles (in ms) of the latencies seen by the client,
+    including the wait for a free connection.
+    """
+    clients = asyncio.Queue()
+    for _ in range(n_connections):
+        clients.put_nowait(DecodeClient(host, port, path))
+    rng = np.random.RandomState(seed)
+    latencies = []
+    errors = []
+
+    async def send(i, arrival):
+        client = await clients.get()
+        try:
+            await client.decode(emissions[i % len(emissions)])
+            latencies.append(time.perf_counter() - arrival)
+        except Exception as error:
+            errors.append(error)
+            client.close()
+        finally:
+            clients.put_nowait(client)
+
+    tasks = []
+    start = time.perf_counter()
+    arrival = start
+    for i in range(n_requests):
+        if rate > 0:
+            arrival += rng.exponential(1 / rate)
+            await asyncio.sleep(max(0, arrival - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(send(i, time.perf_counter())))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    while not clients.empty():
+        clients.get_nowait().close()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wav2letter.decoder.server",
+        description="Serve the lexicon decoder over HTTP with micro-batching",
+    )
+    add_decoder_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix_socket", help="listen on this Unix socket instead")
+    parser.add_argument("--max_batch_size", type=int, default=16)
+    parser.add_argument("--max_delay_ms", type=float, default=5.0)
+    parser.add_argument("--num_threads", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resources = load_decoder_resources(args, args.num_threads)
+    batch_decoder = BatchLexiconDecoder(
+        resources.options,
+        resources.trie,
+        resources.lm,
+        resources.sil_idx,
+        resources.blank_idx,
+        resources.unk_idx,
+        resources.transitions,
+        False,
+    )
+    server = DecodeServer(
+        batch_decoder,
+        resources.word_dict,
+        resources.token_dict.index_size(),
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms,
+        num_threads=args.num_threads,
+    )
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start(args.host, args.port, args.unix_socket))
+    print(
+        "listening on {}".format(
+            args.unix_socket or "{}:{}".format(args.host, args.port)
+        ),
+        file=sys.stderr,
+    )
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter sweep of a decoder on a dev set.
+
+The emissions, the trie and the LM are loaded once by the caller and shared by
+all the decoders: they run in a pool of threads of the same process, which is
+possible because the decoders release the GIL while decoding (the LM must
+support concurrent calls, as KenLM does; LMs implemented in Python are
+serialized by the GIL). Bad configurations are dropped early with successive
+halving: all of them are first evaluated on a small subset of the utterances,
+then only the best 1 / eta of them move on to a subset eta times larger, until
+the whole dev set.
+
+Sample usage:
+
+    sweep = Sweep(
+        emissions,  # list of float32 [T, N] arrays
+        references,  # list of lists of words
+        word_dict,
+        lambda options: LexiconDecoder(
+            options, trie, lm, sil_idx, -1, unk_idx, transitions, False
+        ),
+    )
+    results = sweep.run(
+        base_options, grid(lm_weight=[1, 2, 3], word_score=[-1, 0, 1])
+    )
+    print(format_report(results))
+"""
+
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from wav2letter._decoder import DecoderOptions
+from wav2letter.decoder.metrics import edit_distance
+
+
+# Fields of DecoderOptions, in the order of its constructor
+OPTION_NAMES = [
+    "beam_size",
+    "beam_size_token",
+    "beam_threshold",
+    "lm_weight",
+    "word_score",
+    "unk_score",
+    "sil_score",
+    "eos_score",
+    "log_add",
+    "criterion_type",
+]
+
+# Fields of DecoderOptions set after its construction
+EXTRA_OPTION_NAMES = [
+    "blank_score",
+    "blank_skip_threshold",
+    "adaptive_beam_min_ratio",
+    "adaptive_beam_entropy",
+]
+
+# `config` holds the options overridden in the sweep, the other fields are
+# measured on the `n_utterances` first utterances of the sweep order
+SweepResult = namedtuple(
+    "SweepResult", ["config", "wer", "rtf", "n_utterances", "n_words", "rung"]
+)
+
+
+def grid(**values):
+    """
+    All the combinations of the given option values, e.g.
+    `grid(lm_weight=[1, 2], word_score=[0])` is
+    `[{"lm_weight": 1, "word_score": 0}, {"lm_weight": 2, "word_score": 0}]`
+    """
+    names = list(values)
+    return [
+        dict(zip(names, combination))
+        for combination in itertools.product(*(values[name] for name in names))
+    ]
+
+
+def make_options(base_options, config):
+    """Copy of `base_options` with the fields of `config` replaced"""
+    unknown = set(config) - set(OPTION_NAMES) - set(EXTRA_OPTION_NAMES)
+    if unknown:
+        raise ValueError("unknown decoder options: " + ", ".join(sorted(unknown)))
+    options = DecoderOptions(
+        *(config.get(name, getattr(base_options, name)) for name in OPTION_NAMES)
+    )
+    for name in EXTRA_OPTION_NAMES:
+        setattr(options, name, config.get(name, getattr(base_options, name)))
+    return options
+
+
+class Sweep:
+    """
+    Decode the utterances (`emissions[i]`, `references[i]`) with the decoders
+    built by `decoder_factory(options)` for many options.
+
+    `frame_stride_ms` is the duration of an emission frame, used to compute
+    the real-time factor: the CPU time spent decoding divided by the duration
+    of the audio, as if the decoder ran on a single core. Utterances are
+    evaluated in a random order drawn with `seed`, so that the subsets of the
+    successive halving are representative of the dev set.
+    """
+
+    def __init__(
+        self,
+        emissions,
+        references,
+        word_dict,
+        decoder_factory,
+        frame_stride_ms=10.0,
+        num_threads=None,
+        seed=0,
+    ):
+        if len(emissions) != len(references):
+            raise ValueError("emissions and references should have the same length")
+        if len(emissions) == 0:
+            raise ValueError("no utterance to decode")
+        self.emissions = emissions
+        self.references = [list(reference) for reference in references]
+        self.word_dict = word_dict
+        self.decoder_factory = decoder_factory
+        self.frame_stride_ms = frame_stride_ms
+        self.num_threads = num_threads or os.cpu_count()
+
+        self.order = list(range(len(emissions)))
+        random.Random(seed).shuffle(self.order)
+        # (config key, utterance) -> (errors, CPU time), kept across rungs
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def evaluate(self, base_options, configs, n_utterances=None, rung=0):
+        """
+        Decode the `n_utterances` first utterances of the sweep order (all of
+        them by default) with each config, return their SweepResult
+        """
+        n_utterances = min(n_utterances or len(self.order), len(self.order))
+        utterances = self.order[:n_utterances]
+
+        # Jobs are chunks of utterances not decoded yet, several per thread to
+        # balance the load
+        jobs = []
+        for config in configs:
+            todo = [u for u in utterances if (_key(config), u) not in self._cache]
+            n_chunks = math.ceil(self.num_threads * 4 / len(configs))
+            chunk_size = max(1, math.ceil(len(todo) / n_chunks))
+            for start in range(0, len(todo), chunk_size):
+                jobs.append((config, todo[start : start + chunk_size]))
+
+        with ThreadPoolExecutor(max_workers=self.num_threads) as pool:
+            for _ in pool.map(lambda job: self._decode(base_options, *job), jobs):
+                pass
+
+        n_words = sum(len(self.references[u]) for u in utterances)
+        n_frames = sum(len(self.emissions[u]) for u in utterances)
+        duration = n_frames * self.frame_stride_ms / 1000
+        results = []
+        for config in configs:
+            values = [self._cache[(_key(config), u)] for u in utterances]
+            errors = sum(value[0] for value in values)
+            cpu_time = sum(value[1] for value in values)
+            results.append(
+                SweepResult(
+                    config=dict(config),
+                    wer=100.0 * errors / max(n_words, 1),
+                    rtf=cpu_time / duration,
+                    n_utterances=n_utterances,
+                    n_words=n_words,
+                    rung=rung,
+                )
+            )
+        return results
+
+    def run(self, base_options, configs, eta=3, min_utterances=1, max_wer=None):
+        """
+        Successive halving of `configs` (dicts of DecoderOptions fields
+        overriding `base_options`, see `grid()`), return the SweepResult of
+        each config on the largest subset it was evaluated on, the best first.
+
+        With n configs there are floor(log_eta(n)) + 1 rungs, the last one
+        decodes the whole dev set. Configs whose WER is above `max_wer` (in
+        percent) after a rung are stopped as well.
+        """
+        if eta < 2:
+            raise ValueError("eta should be at least 2")
+        configs = [dict(config) for config in configs]
+        for config in configs:
+            make_options(base_options, config)  # fail before decoding
+
+        n_rungs = int(math.log(max(len(configs), 1), eta) + 1e-9) + 1
+        final = {}
+        for rung in range(n_rungs):
+            n_utterances = max(
+                min_utterances,
+                math.ceil(len(self.order) / eta ** (n_rungs - 1 - rung)),
+            )
+            results = sorted(
+                self.evaluate(base_options, configs, n_utterances, rung),
+                key=lambda result: (result.wer, result.rtf),
+            )
+            for result in results:
+                final[_key(result.config)] = result
+            if max_wer is not None:
+                results = [result for result in results if result.wer <= max_wer]
+            n_kept = max(len(configs) // eta, 1)
+            configs = [result.config for result in results[:n_kept]]
+            if not results or n_utterances == len(self.order):
+                break
+
+        return sorted(
+            final.values(),
+            key=lambda result: (-result.n_utterances, result.wer, result.rtf),
+        )
+
+    def _decode(self, base_options, config, utterances):
+        decoder = self.decoder_factory(make_options(base_options, config))
+        for u in utterances:
+            start = time.thread_time()
+            result = decoder.decode(self.emissions[u])[0]
+            cpu_time = time.thread_time() - start
+            prediction = [self.word_dict.get_entry(w) for w in result.words if w >= 0]
+            errors = edit_distance(prediction, self.references[u])
+            with self._lock:
+                self._cache[(_key(config), u)] = (errors, cpu_time)
+
+
+def _key(config):
+    return tuple(sorted(config.items()))
+
+
+def pareto_front(results):
+    """Results for which no other one has both a lower WER and a lower RTF"""
+    return [
+        result
+        for result in results
+        if not any(
+            other.wer <= result.wer
+            and other.rtf <= result.rtf
+            and (other.wer, other.rtf) != (result.wer, result.rtf)
+            for other in results
+            if other.n_utterances == result.n_utterances
+        )
+    ]
+
+
+def format_report(results):
+    """
+    Table of the sweep results, one config per line with its WER and RTF;
+    configs of the WER / RTF Pareto front are marked with a *
+    """
+    front = {id(result) for result in pareto_front(results)}
+    names = sorted({name for result in results for name in result.config})
+    header = names + ["utterances", "WER", "RTF"]
+    rows = [
+        [str(result.config.get(name, "")) for name in names]
+        + [
+            str(result.n_utterances),
+            "{:.2f}".format(result.wer),
+            "{:.4f}".format(result.rtf) + (" *" if id(result) in front else ""),
+        ]
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    return "\n".join(
+        " | ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in [header] + rows
+    )
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of features: the features of a training or decoding list are
+computed once, and read at disk speed afterwards.
+
+    cache = FeatureCache("/data/feature_cache", max_bytes=100 * 2 ** 30)
+    mfcc = Mfcc(params)
+    features = cache.get(audio_path, mfcc, load_audio)  # [frames, feat_dim]
+
+Entries are keyed by the content of the audio file (SHA-1), the type of the
+extractor (Mfcc, Mfsc or PowerSpectrum), all its FeatureParams and the dtype of
+the cache (float32 or float16). Each entry is a .npy file, which is mapped in
+memory when it is read. The index is a SQLite database in the cache directory.
+It stores the hash of each audio file with the file's size and modification
+time, so a file is hashed again only if it changes. It also stores the size
+and last access of each entry. When the entries exceed `max_bytes`, the least
+recently used ones are removed.
+
+Several processes can read and write the same cache, including the forked
+workers of a data loader, which open their own SQLite connection. An entry is
+written to a temporary file, which is renamed in the SQLite transaction adding
+it to the index, and only files in the index are read. An entry removed by
+another process is computed again. The cache directory must be on a local
+file system, because SQLite locking is not reliable over NFS.
+
+To fill the cache with the lists written by recipes/data/*/prepare.py (one
+`<id> <path> <duration> <transcription>` line per utterance), with soundfile
+installed:
+
+    python -m wav2letter.feature.cache /data/feature_cache train-clean-100.lst \\
+        --features mfsc --num_filterbank_chans 40 --max_gb 100 --num_workers 16
+"""
+
+import argparse
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import weakref
+
+import numpy as np
+from wav2letter._feature import FeatureParams, Mfcc, Mfsc, PowerSpectrum
+
+
+# Changed when the features computed for the same parameters change
+_VERSION = 1
+
+_PARAM_NAMES = [
+    "sampling_freq",
+    "frame_size_ms",
+    "frame_stride_ms",
+    "num_filterbank_chans",
+    "low_freq_filterbank",
+    "high_freq_filterbank",
+    "num_cepstral_coeffs",
+    "lifter_params",
+    "delta_window",
+    "acc_window",
+    "window_type",
+    "preem_coef",
+    "mel_floor",
+    "dither_val",
+    "use_power",
+    "use_energy",
+    "raw_energy",
+    "zero_mean_frame",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, hash TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY, nbytes INTEGER, last_access REAL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS total (nbytes INTEGER);
+INSERT INTO total SELECT 0 WHERE NOT EXISTS (SELECT * FROM total);
+"""
+
+# Shared by the forked workers, see _init_worker()
+_shared = {}
+
+# SQLite connections must not be used or closed by a forked process: the ones
+# of the parent are kept here, unused, until the process exits
+_inherited_connections = []
+_caches = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for cache in _caches:
+        cache._drop_connection()
+
+
+if hasattr(os, "register_at_fork"):  # Python 3.7+
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def hash_file(path, block_size=1 << 20):
+    """SHA-1 of the content of a file"""
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def extractor_key(extractor):
+    """Type and FeatureParams of an extractor, as a string"""
+    params = extractor.get_feature_params()
+    values = ["{}={!r}".format(name, getattr(params, name)) for name in _PARAM_NAMES]
+    return "{}({})".format(type(extractor).__name__, ", ".join(values))
+
+
+def load_audio(path):
+    """float32 samples in [-1, 1] of a mono audio file, read with soundfile"""
+    import soundfile
+
+    samples, _ = soundfile.read(path, dtype="float32")
+    if samples.ndim != 1:
+        raise ValueError("expected a mono audio file: " + path)
+    return samples
+
+
+class FeatureCache(object):
+    """
+    Features cached in the directory `path` as `dtype` ("float32" or "float16"),
+    at most `max_bytes` of them (no limit if None). When the cache is full,
+    entries are removed until it is filled to `low_water` of `max_bytes`. The
+    last access of an entry is recorded at most once per `access_resolution`
+    seconds, and pending accesses are written by batches.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=None,
+        dtype="float32",
+        low_water=0.9,
+        access_resolution=60.0,
+    ):
+        if dtype not in ["float32", "float16"]:
+            raise ValueError("dtype must be float32 or float16")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self.low_water = low_water
+        self.access_resolution = access_resolution
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._pid = None
+        self._accesses = {}
+        self._last_flush = time.time()
+        os.makedirs(path, exist_ok=True)
+        _caches.add(self)
+        self._connect().executescript(_SCHEMA)
+
+    def _drop_connection(self):
+        if self._db is not None:
+            _inherited_connections.append(self._db)
+        self._db = None
+        self._pid = None
+        self._accesses = {}
+
+    def _connect(self):
+        if self._pid != os.getpid():  # new, or forked without register_at_fork
+            self._drop_connection()
+            self._db = sqlite3.connect(
+                os.path.join(self.path, "index.db"), timeout=600, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+        return self._db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key[:2], key + ".npy")
+
+    def audio_hash(self, audio_path):
+        """SHA-1 of an audio file, only computed again if the file changed"""
+        audio_path = os.path.abspath(audio_path)
+        stat = os.stat(audio_path)
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        db = self._connect()
+        row = db.execute(
+            "SELECT size, mtime_ns, inode, hash FROM audio WHERE path = ?",
+            (audio_path,),
+        ).fetchone()
+        if row is not None and tuple(row[:3]) == signature:
+            return row[3]
+        digest = hash_file(audio_path)
+        db.execute(
+            "INSERT OR REPLACE INTO audio VALUES (?, ?, ?, ?, ?)",
+            (audio_path,) + signature + (digest,),
+        )
+        return digest
+
+    def key(self, audio_path, extractor):
+        """Key of the features of an audio file computed by `extractor`"""
+        description = "{} {} {} {}".format(
+            _VERSION, self.audio_hash(audio_path), extractor_key(extractor), self.dtype
+        )
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def lookup(self, audio_path, extractor):
+        """Cached features [frames, feat_dim] (memory-mapped), None if missing"""
+        return self._lookup(self.key(audio_path, extractor))
+
+    def put(self, audio_path, extractor, features):
+        """Cache `features`, return them as stored (in the dtype of the cache)"""
+        return self._put(self.key(audio_path, extractor), features)
+
+    def get(self, audio_path, extractor, load_audio=load_audio):
+        """
+        Features [frames, feat_dim] of an audio file, computed with
+        `extractor.apply(load_audio(audio_path))` if they are not cached
+        """
+        key = self.key(audio_path, extractor)
+        features = self._lookup(key)
+        if features is None:
+            features = self._put(key, extractor.apply(load_audio(audio_path)))
+        return features
+
+    def _lookup(self, key):
+        # a file without its entry is being added, or was left by a crash
+        entry = (
+            self._connect()
+            .execute("SELECT 1 FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        try:
+            features = None
+            if entry is not None:
+                features = np.load(self._entry_path(key), mmap_mode="r")
+        except (OSError, ValueError):  # removed, or truncated
+            pass
+        if features is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._record_access(key)
+        return features
+
+    def _put(self, key, features):
+        features = np.ascontiguousarray(features, dtype=self.dtype)
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, features)
+                nbytes = f.tell()
+
+            # Files are renamed and removed while the index is locked, before
+            # the entries are committed: every file in the index is counted,
+            # and a crash can only leave a file without its entry (a miss)
+            with self._transaction() as db:
+                row = db.execute(
+                    "SELECT nbytes FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                    (key, nbytes, time.time()),
+                )
+                db.execute(
+                    "UPDATE total SET nbytes = nbytes + ?",
+                    (nbytes - (row[0] if row else 0),),
+                )
+                self._write_accesses(db)
+                evicted = self._evict(db)
+                if key not in evicted:
+                    os.replace(tmp_path, path)
+                for evicted_key in evicted:
+                    try:
+                        os.remove(self._entry_path(evicted_key))
+                    except FileNotFoundError:
+                        pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return features
+
+    def _evict(self, db):
+        """Remove the least recently used entries from the index if needed"""
+        (total,) = db.execute("SELECT nbytes FROM total").fetchone()
+        if self.max_bytes is None or total <= self.max_bytes:
+            return []
+        evicted = []
+        cursor = db.execute("SELECT key, nbytes FROM entries ORDER BY last_access")
+        for key, nbytes in cursor:
+            if total <= self.max_bytes * self.low_water:
+                break
+            evicted.append(key)
+            total -= nbytes
+        cursor.close()
+        db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted])
+        db.execute("UPDATE total SET nbytes = ?", (total,))
+        return evicted
+
+    def _record_access(self, key):
+        now = time.time()
+        self._accesses[key] = now
+        if (
+            len(self._accesses) >= 1000
+            or now > self._last_flush + self.access_resolution
+        ):
+            self.flush()
+
+    def _write_accesses(self, db):
+        db.executemany(
+            "UPDATE entries SET last_access = ? WHERE key = ? AND last_access < ?",
+            [
+                (access, key, access - self.access_resolution)
+                for key, access in self._accesses.items()
+            ],
+        )
+        self._accesses = {}
+        self._last_flush = time.time()
+
+    def flush(self):
+        """Write the pending accesses to the index"""
+        if self._accesses:
+            with self._transaction() as db:
+                self._write_accesses(db)
+
+    def stats(self):
+        """Number of entries and their size in bytes"""
+        db = self._connect()
+        (n_entries,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        (nbytes,) = db.execute("SELECT nbytes FROM total").fetchone()
+        return {"entries": n_entries, "nbytes": nbytes, "max_bytes": self.max_bytes}
+
+    def close(self):
+        if self._pid != os.getpid():
+            self._drop_connection()
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
+        self._pid = None
+
+
+def _init_worker(args):
+    params = FeatureParams(
+        sampling_freq=args.sampling_freq,
+        num_filterbank_chans=args.num_filterbank_chans,
+        num_cepstral_coeffs=args.num_cepstral_coeffs,
+        delta_window=args.delta_window,
+        acc_window=args.acc_window,
+    )
+    extractor_class = {"mfcc": Mfcc, "mfsc": Mfsc, "pow": PowerSpectrum}
+    _shared["extractor"] = extractor_class[args.features](params)
+    _shared["cache"] = FeatureCache(
+        args.cache_dir,
+        None if args.max_gb is None else int(args.max_gb * 2 ** 30),
+        args.dtype,
+    )
+
+
+def _fill(audio_path):
+    cache = _shared["cache"]
+    hits = cache.hits
+    features = cache.get(audio_path, _shared["extractor"])
+    cache.flush()
+    return len(features), cache.hits > hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wav2letter.feature.cache",
+        description="Compute the features of lists of audio files into a cache",
+    )
+    parser.add_argument("cache_dir")
+    parser.add_argument(
+        "lists", nargs="+", help="list files, `<id> <path> <duration> ...` per line"
+    )
+    parser.add_argument("--max_gb", type=float, help="maximum size of the cache")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--features", choices=["mfcc", "mfsc", "pow"], default="mfsc")
+    parser.add_argument("--sampling_freq", type=int, default=16000)
+    parser.add_argument("--num_filterbank_chans", type=int, default=40)
+    parser.add_argument("--num_cepstral_coeffs", type=int, default=13)
+    parser.add_argument("--delta_window", type=int, default=0)
+    parser.add_argument("--acc_window", type=int, default=0)
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    paths = []
+    for list_path in args.lists:
+        with open(list_path) as f:
+            paths.extend(line.split()[1] for line in f if line.strip())
+
+    start = time.perf_counter()
+    with multiprocessing.get_context("fork").Pool(
+        args.num_workers, initializer=_init_worker, initargs=(args,)
+    ) as pool:
+        results = pool.imap_unordered(_fill, paths, chunksize=16)
+        n_frames, n_hits = 0, 0
+        for frames, hit in results:
+            n_frames += frames
+            n_hits += hit
+    elapsed = time.perf_counter() - start
+
+    _init_worker(args)
+    stats = _shared["cache"].stats()
+    print(
+        "{} files ({} cached already, {} frames) in {:.1f} s, cache: {} entries, "
+        "{:.2f} GB".format(
+            len(paths),
+            n_hits,
+            n_frames,
+            elapsed,
+            stats["entries"],
+            stats["nbytes"] / 2 ** 30,
+        ),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
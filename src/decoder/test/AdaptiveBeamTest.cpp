@@ -0,0 +1,69 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/LexiconDecoder.h"
+
+using namespace w2l;
+
+TEST(AdaptiveBeamTest, BeamFollowsEntropy) {
+  auto lm = std::make_shared<UnigramLM>();
+  auto data = loadTestData(lm);
+  int N = data.N;
+  auto opt = testDecoderOptions(100, 25);
+  auto decode = [&](const DecoderOptions& opt, DecoderStats& stats) {
+    LexiconDecoder decoder(
+        opt,
+        data.trie,
+        lm,
+        data.silIdx,
+        -1,
+        data.unkIdx,
+        data.transitions,
+        false);
+    decoder.enableStats(true);
+    auto result = decoder.decode(data.emissions.data(), data.T, N).front();
+    stats = decoder.stats();
+    return result;
+  };
+
+  /* Disabled by default: the configured beam on every frame */
+  DecoderStats stats;
+  auto expected = decode(opt, stats);
+  ASSERT_EQ(stats.averageBeamSizeToken(), std::min(25, N));
+  ASSERT_EQ(stats.averageBeamThreshold(), 100.0);
+  int64_t nTrieNodes = stats.nTrieNodes;
+
+  /* Full beam as soon as the entropy is positive */
+  opt.adaptiveBeamMinRatio = 0.2;
+  opt.adaptiveBeamEntropy = 1e-9;
+  auto result = decode(opt, stats);
+  ASSERT_EQ(stats.averageBeamSizeToken(), std::min(25, N));
+  ASSERT_EQ(result.score, expected.score);
+
+  /* Smaller beam on the confident frames, never above the configured one
+   * (the entropy of the test emissions is between 1.2 and 2.7 nats) */
+  opt.adaptiveBeamEntropy = 2.5;
+  result = decode(opt, stats);
+  ASSERT_LT(stats.averageBeamSizeToken(), std::min(25, N));
+  ASSERT_GE(stats.averageBeamSizeToken(), 0.2 * std::min(25, N));
+  ASSERT_LT(stats.averageBeamThreshold(), 100.0);
+  ASSERT_GE(stats.averageBeamThreshold(), 20.0);
+  ASSERT_LT(stats.nTrieNodes, nTrieNodes);
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,111 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <cstdlib>
+#include <thread>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "libraries/decoder/BatchDecoder.h"
+
+using namespace w2l;
+
+namespace {
+
+/* Decoder keeping the best token of each frame */
+class GreedyDecoder : public Decoder {
+ public:
+  GreedyDecoder() : Decoder(DecoderOptions()) {}
+
+  void decodeBegin() override {
+    result_ = DecodeResult();
+  }
+
+  void decodeStep(const float* emissions, int T, int N) override {
+    for (int t = 0; t < T; t++) {
+      const float* frame = emissions + t * N;
+      auto best = std::max_element(frame, frame + N);
+      result_.tokens.push_back(best - frame);
+      result_.score += *best;
+      std::this_thread::yield(); // let the other calls interleave
+    }
+  }
+
+  void prune(int /* unused */) override {}
+
+  int nDecodedFramesInBuffer() const override {
+    return result_.tokens.size();
+  }
+
+  DecodeResult getBestHypothesis(int /* unused */) const override {
+    return result_;
+  }
+
+  std::vector<DecodeResult> getAllFinalHypothesis() const override {
+    return {result_};
+  }
+
+ private:
+  DecodeResult result_;
+};
+
+} // namespace
+
+TEST(BatchDecoderTest, ConcurrentDecode) {
+  int N = 10;
+  std::vector<std::vector<float>> emissions;
+  std::vector<const float*> emissionPtrs;
+  std::vector<int> T;
+  for (int i = 0; i < 50; i++) {
+    T.push_back(i % 7 + 1);
+    emissions.emplace_back(T.back() * N);
+    for (auto& value : emissions.back()) {
+      value = static_cast<float>(std::rand()) / RAND_MAX;
+    }
+    emissionPtrs.push_back(emissions.back().data());
+  }
+
+  BatchDecoder batchDecoder([]() { return std::make_shared<GreedyDecoder>(); });
+  auto expected = batchDecoder.decode(emissionPtrs, T, N, 1);
+  ASSERT_EQ(expected.size(), emissions.size());
+  for (int i = 0; i < emissions.size(); i++) {
+    GreedyDecoder decoder;
+    ASSERT_EQ(
+        expected[i][0].tokens,
+        decoder.decode(emissionPtrs[i], T[i], N)[0].tokens);
+  }
+
+  // Calls with more and more threads grow the pool during the other calls
+  std::vector<std::thread> threads;
+  std::vector<bool> ok(4, true);
+  for (int i = 0; i < ok.size(); i++) {
+    threads.emplace_back([&, i]() {
+      for (int nThreads = 1; nThreads <= 4; nThreads++) {
+        auto results = batchDecoder.decode(emissionPtrs, T, N, nThreads + i);
+        for (int j = 0; j < results.size(); j++) {
+          if (results[j][0].tokens != expected[j][0].tokens ||
+              results[j][0].score != expected[j][0].score) {
+            ok[i] = false;
+          }
+        }
+      }
+    });
+  }
+  for (auto& thread : threads) {
+    thread.join();
+  }
+  ASSERT_EQ(ok, std::vector<bool>(4, true));
+  ASSERT_EQ(batchDecoder.nDecoders(), 7);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
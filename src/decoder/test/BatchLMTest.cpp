@@ -0,0 +1,136 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/LexiconFreeDecoder.h"
+#include "libraries/lm/BatchLM.h"
+
+using namespace w2l;
+
+namespace {
+
+/* Same scores, queried in batches */
+class UnigramBatchLM : public BatchLM {
+ public:
+  int nBatches = 0;
+  int nQueries = 0;
+
+ protected:
+  void startState(int64_t /* unused */, bool /* unused */) override {}
+
+  void scoreStates(
+      const std::vector<int64_t>& stateIds,
+      const std::vector<int>& usrTokenIndices,
+      const std::vector<int64_t>& newStateIds,
+      std::vector<float>& scores) override {
+    nBatches++;
+    nQueries += usrTokenIndices.size();
+    for (size_t i = 0; i < usrTokenIndices.size(); i++) {
+      EXPECT_LT(stateIds[i], newStateIds[i]);
+      scores[i] = unigramScore(usrTokenIndices[i]);
+    }
+  }
+};
+
+} // namespace
+
+TEST(BatchLMTest, PrefetchScoresEachPairOnce) {
+  auto lm = std::make_shared<UnigramBatchLM>();
+  auto start = lm->start(false);
+  lm->prefetch({start, start, start}, {1, 2, 1});
+  ASSERT_EQ(lm->nBatches, 1);
+  ASSERT_EQ(lm->nQueries, 2);
+
+  auto first = lm->score(start, 1);
+  ASSERT_EQ(first.second, unigramScore(1));
+  ASSERT_EQ(first.first, lm->score(start, 1).first);
+  ASSERT_EQ(lm->nBatches, 1);
+
+  // Queries which were not prefetched are scored one by one
+  ASSERT_EQ(lm->finish(first.first).second, 0);
+  ASSERT_EQ(lm->nBatches, 2);
+  ASSERT_THROW(lm->prefetch({start}, {}), std::invalid_argument);
+}
+
+TEST(BatchLMTest, MatchesUnbatchedDecoding) {
+  auto lm = std::make_shared<UnigramLM>();
+  auto batchLm = std::make_shared<UnigramBatchLM>();
+  auto data = loadTestData(batchLm);
+  ASSERT_EQ(batchLm->nBatches, 1);
+  int T = data.T, N = data.N;
+  auto opt = testDecoderOptions(500, 25);
+
+  /* Lexicon decoder: one batch per frame, plus the end of sentence */
+  LexiconDecoder decoder(
+      opt,
+      data.trie,
+      lm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+  LexiconDecoder batchDecoder(
+      opt,
+      data.trie,
+      batchLm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+  auto expected = decoder.decode(data.emissions.data(), T, N).front();
+  batchLm->nBatches = 0;
+  auto result = batchDecoder.decode(data.emissions.data(), T, N).front();
+  ASSERT_LE(batchLm->nBatches, T + 1);
+  ASSERT_EQ(result.tokens, expected.tokens);
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+
+  /* CTC, the replabel standing for blank: repeated tokens query their words */
+  DecoderOptions ctcOpt = opt;
+  ctcOpt.criterionType = CriterionType::CTC;
+  int blankIdx = N - 1;
+  LexiconDecoder ctcDecoder(
+      ctcOpt, data.trie, lm, data.silIdx, blankIdx, data.unkIdx, {}, false);
+  LexiconDecoder batchCtcDecoder(
+      ctcOpt,
+      data.trie,
+      batchLm,
+      data.silIdx,
+      blankIdx,
+      data.unkIdx,
+      {},
+      false);
+  expected = ctcDecoder.decode(data.emissions.data(), T, N).front();
+  batchLm->nBatches = 0;
+  result = batchCtcDecoder.decode(data.emissions.data(), T, N).front();
+  ASSERT_LE(batchLm->nBatches, T + 1);
+  ASSERT_EQ(result.tokens, expected.tokens);
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+
+  /* Lexicon-free decoder */
+  LexiconFreeDecoder freeDecoder(opt, lm, data.silIdx, -1, data.transitions);
+  LexiconFreeDecoder batchFreeDecoder(
+      opt, batchLm, data.silIdx, -1, data.transitions);
+  expected = freeDecoder.decode(data.emissions.data(), T, N).front();
+  batchLm->nBatches = 0;
+  result = batchFreeDecoder.decode(data.emissions.data(), T, N).front();
+  ASSERT_LE(batchLm->nBatches, T + 1);
+  ASSERT_EQ(result.tokens, expected.tokens);
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
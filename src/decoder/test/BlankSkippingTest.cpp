@@ -0,0 +1,103 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/LexiconDecoder.h"
+
+using namespace w2l;
+
+namespace {
+
+/**
+ * CTC emissions with N + 1 tokens (blank last) from the ASG test emissions:
+ * frames are normalized and two frames where blank has a posterior of
+ * `blankProb` are inserted when the best token changes.
+ */
+std::vector<float>
+makeCtcEmissions(const std::vector<float>& emissions, int N, float blankProb) {
+  int T = emissions.size() / N;
+  std::vector<float> result;
+  int prevBest = -1;
+  for (int t = 0; t < T; t++) {
+    const float* frame = emissions.data() + t * N;
+    double logSum = 0;
+    for (int n = 0; n < N; n++) {
+      logSum += std::exp(frame[n]);
+    }
+    logSum = std::log(logSum);
+    int best = std::max_element(frame, frame + N) - frame;
+    int nFrames = prevBest >= 0 && best != prevBest ? 3 : 1;
+    for (int i = 0; i < nFrames; i++) {
+      double prob = i + 1 < nFrames ? blankProb : 0.01;
+      for (int n = 0; n < N; n++) {
+        result.push_back(frame[n] - logSum + std::log(1 - prob));
+      }
+      result.push_back(std::log(prob));
+    }
+    prevBest = best;
+  }
+  return result;
+}
+
+} // namespace
+
+TEST(BlankSkippingTest, SameResultsWithFewerExpandedFrames) {
+  auto lm = std::make_shared<UnigramLM>();
+  auto data = loadTestData(lm);
+  int N = data.N;
+  auto emissions = makeCtcEmissions(data.emissions, N, 0.999);
+  int blankIdx = N++;
+  int T = emissions.size() / N;
+  int silIdx = data.silIdx, unkIdx = data.unkIdx;
+  const auto& trie = data.trie;
+
+  auto opt = testDecoderOptions(100, 25, CriterionType::CTC);
+  LexiconDecoder decoder(opt, trie, lm, silIdx, blankIdx, unkIdx, {}, false);
+  decoder.enableStats(true);
+  auto expected = decoder.decode(emissions.data(), T, N).front();
+  ASSERT_EQ(decoder.stats().nSkippedFrames, 0);
+
+  opt.blankSkipThreshold = 0.99;
+  LexiconDecoder skippingDecoder(
+      opt, trie, lm, silIdx, blankIdx, unkIdx, {}, false);
+  skippingDecoder.enableStats(true);
+  auto result = skippingDecoder.decode(emissions.data(), T, N).front();
+  const auto& stats = skippingDecoder.stats();
+  ASSERT_GT(stats.nSkippedFrames, T / 2);
+  ASSERT_EQ(stats.nFrames, T);
+  ASSERT_LT(stats.nTrieNodes, decoder.stats().nTrieNodes);
+  ASSERT_EQ(result.tokens.size(), expected.tokens.size());
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+  ASSERT_NEAR(result.amScore, expected.amScore, 1e-3);
+
+  /* Only CTC skips frames */
+  opt.criterionType = CriterionType::ASG;
+  LexiconDecoder asgDecoder(
+      opt,
+      trie,
+      lm,
+      silIdx,
+      blankIdx,
+      unkIdx,
+      std::vector<float>(N * N),
+      false);
+  asgDecoder.enableStats(true);
+  asgDecoder.decode(emissions.data(), T, N);
+  ASSERT_EQ(asgDecoder.stats().nSkippedFrames, 0);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,205 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <thread>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/BatchDecoder.h"
+#include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/StreamingDecodeSession.h"
+#include "libraries/lm/CachedLM.h"
+
+using namespace w2l;
+
+TEST(CachedLMTest, LeastRecentlyUsedEviction) {
+  auto unigramLm = std::make_shared<UnigramLM>();
+  CachedLM lm(unigramLm, 2);
+  auto start = lm.start(false);
+
+  auto first = lm.score(start, 1);
+  ASSERT_EQ(first.second, unigramScore(1));
+  ASSERT_EQ(lm.score(start, 1).first, first.first);
+  lm.score(start, 2);
+  ASSERT_EQ(lm.hits(), 1);
+  ASSERT_EQ(lm.misses(), 2);
+  ASSERT_EQ(unigramLm->nQueries, 2);
+
+  // (start, 1) was used before (start, 2): it is evicted, but its state
+  // stays in the tree and scoring it again returns the same state
+  lm.finish(start);
+  ASSERT_EQ(lm.size(), 2);
+  ASSERT_EQ(start->children.count(1), 1);
+  ASSERT_EQ(start->children.count(2), 1);
+  lm.finish(start);
+  ASSERT_EQ(lm.hits(), 2);
+  ASSERT_EQ(lm.score(start, 1).first, first.first);
+  ASSERT_EQ(lm.misses(), 4);
+
+  // A new sentence keeps the entries of the others, clear() removes them
+  lm.start(false);
+  ASSERT_EQ(lm.size(), 2);
+  lm.clear();
+  ASSERT_EQ(lm.size(), 0);
+  lm.resetCounters();
+  ASSERT_EQ(lm.hits() + lm.misses(), 0);
+  ASSERT_THROW(lm.score(start, -1), std::out_of_range);
+  ASSERT_THROW(CachedLM(unigramLm, 0), std::invalid_argument);
+}
+
+TEST(CachedLMTest, ConcurrentQueries) {
+  auto unigramLm = std::make_shared<UnigramLM>();
+  CachedLM lm(unigramLm, 50);
+  int nThreads = 4, nQueries = 1000;
+  std::vector<LMStatePtr> starts;
+  for (int i = 0; i < nThreads; i++) {
+    starts.push_back(unigramLm->start(false));
+  }
+  std::vector<std::thread> threads;
+  for (int i = 0; i < nThreads; i++) {
+    threads.emplace_back([&, i]() {
+      for (int j = 0; j < nQueries; j++) {
+        auto result = lm.score(starts[i], j % 100);
+        ASSERT_EQ(result.first, starts[i]->children.at(j % 100));
+        ASSERT_EQ(result.second, unigramScore(j % 100));
+      }
+    });
+  }
+  for (auto& thread : threads) {
+    thread.join();
+  }
+  ASSERT_EQ(lm.hits() + lm.misses(), nThreads * nQueries);
+  ASSERT_LE(lm.size(), 50);
+}
+
+TEST(CachedLMTest, DecodingWithBoundedStateTree) {
+  auto unigramLm = std::make_shared<UnigramLM>();
+  auto data = loadTestData(unigramLm);
+  int T = data.T, N = data.N;
+  auto opt = testDecoderOptions(100, 25);
+  const auto& emissions = data.emissions;
+
+  /* Same results with fewer queries */
+  int capacity = 10000;
+  auto lm = std::make_shared<CachedLM>(unigramLm, capacity);
+  LexiconDecoder decoder(
+      opt,
+      data.trie,
+      unigramLm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+  auto cachedDecoder = std::make_shared<LexiconDecoder>(
+      opt,
+      data.trie,
+      lm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+  unigramLm->nQueries = 0;
+  auto expected = decoder.decode(emissions.data(), T, N).front();
+  int nQueries = unigramLm->nQueries;
+  unigramLm->nQueries = 0;
+  auto result = cachedDecoder->decode(emissions.data(), T, N).front();
+  ASSERT_EQ(result.tokens, expected.tokens);
+  ASSERT_NEAR(result.score, expected.score, 1e-3);
+  ASSERT_EQ(unigramLm->nQueries, lm->misses());
+  ASSERT_LT(lm->misses(), nQueries);
+  ASSERT_GT(lm->hits(), 0);
+
+  /* Same n-best lists with a tiny cache, evicting all the time */
+  auto expectedNBest = decoder.getAllFinalHypothesis();
+  auto tinyLm = std::make_shared<CachedLM>(unigramLm, 10);
+  LexiconDecoder tinyDecoder(
+      opt,
+      data.trie,
+      tinyLm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+  auto nbest = tinyDecoder.decode(emissions.data(), T, N);
+  ASSERT_GT(tinyLm->misses(), lm->misses());
+  ASSERT_EQ(nbest.size(), expectedNBest.size());
+  for (int i = 0; i < nbest.size(); i++) {
+    ASSERT_EQ(nbest[i].tokens, expectedNBest[i].tokens);
+    ASSERT_EQ(nbest[i].words, expectedNBest[i].words);
+    ASSERT_NEAR(nbest[i].score, expectedNBest[i].score, 1e-3);
+  }
+
+  /* The state tree doesn't grow with the length of a stream */
+  int nAlive = UnigramLMState::nAlive(); // mostly held by `decoder`
+  StreamingDecodeSession session(cachedDecoder, N, 20);
+  for (int i = 0; i < 20; i++) {
+    session.decodeChunk(emissions.data(), T);
+    int maxStates =
+        nAlive + capacity + (session.nFramesInBuffer() + 1) * opt.beamSize;
+    ASSERT_LE(UnigramLMState::nAlive(), maxStates);
+  }
+  session.finish();
+}
+
+TEST(CachedLMTest, SharedByBatchDecoding) {
+  auto unigramLm = std::make_shared<UnigramLM>();
+  auto data = loadTestData(unigramLm);
+  auto opt = testDecoderOptions(100, 25);
+  auto lm = std::make_shared<CachedLM>(unigramLm, 1000000);
+  auto createDecoder = [&]() {
+    return std::make_shared<LexiconDecoder>(
+        opt,
+        data.trie,
+        lm,
+        data.silIdx,
+        -1,
+        data.unkIdx,
+        data.transitions,
+        false);
+  };
+
+  /* One utterance decoded alone */
+  createDecoder()->decode(data.emissions.data(), data.T, data.N);
+  int64_t hits = lm->hits(), misses = lm->misses();
+  ASSERT_GT(hits, 0);
+
+  /* Tries built by several threads and utterances decoded at the same time
+   * never remove the entries of the others */
+  Trie::fromLexicon(
+      pathsConcat(dataDir(), "words.lst"),
+      data.tokenDict,
+      data.wordDict,
+      lm,
+      0,
+      SmearingMode::MAX,
+      4,
+      data.silIdx);
+  int64_t nEntries = lm->misses();
+  lm->resetCounters();
+  int nUtterances = 8;
+  BatchDecoder batchDecoder(createDecoder);
+  batchDecoder.decode(
+      std::vector<const float*>(nUtterances, data.emissions.data()),
+      std::vector<int>(nUtterances, data.T),
+      data.N,
+      4);
+  ASSERT_EQ(lm->hits(), nUtterances * hits);
+  ASSERT_EQ(lm->misses(), nUtterances * misses);
+  ASSERT_EQ(lm->size(), nEntries + nUtterances * misses);
+  ASSERT_LT(lm->size(), lm->capacity());
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
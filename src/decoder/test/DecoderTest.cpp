@@ -19,7 +19,9 @@
 #include "common/Transforms.h"
 #include "criterion/criterion.h"
 #include "libraries/common/Dictionary.h"
+#include "libraries/decoder/FlatTrie.h"
 #include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/NBestList.h"
 #include "libraries/decoder/Trie.h"
 #include "libraries/lm/KenLM.h"
 #include "module/module.h"
@@ -153,6 +155,25 @@ TEST(DecoderTest, run) {
     ASSERT_NEAR(node->maxScore, trieScoreTarget[i], 1e-5);
   }
 
+  // Same trie built natively from the lexicon file
+  for (int nThreads : {1, 4}) {
+    auto lexiconTrie = Trie::fromLexicon(
+        pathsConcat(dataDir, "words.lst"),
+        tokenDict,
+        wordDict,
+        lm,
+        FLAGS_replabel,
+        SmearingMode::MAX,
+        nThreads,
+        silIdx);
+    for (int i = 0; i < sentence.size(); i++) {
+      auto wordTensor = tokens2Tensor(sentence[i], tokenDict);
+      auto node = lexiconTrie->search(wordTensor);
+      ASSERT_EQ(node->maxScore, trie->search(wordTensor)->maxScore);
+      ASSERT_EQ(node->labels, trie->search(wordTensor)->labels);
+    }
+  }
+
   /* -------- Build Decoder --------*/
   DecoderOptions decoderOpt(
       2500, // FLAGS_beamsize
@@ -195,6 +216,95 @@ TEST(DecoderTest, run) {
   for (int i = 0; i < std::min(n_hyp, 5); i++) {
     ASSERT_NEAR(results[i].score, hypScoreTarget[i], 1e-3);
   }
+
+  /* -------- N-best list --------*/
+  NBestList nbest(results);
+  ASSERT_EQ(nbest.size(), n_hyp);
+  ASSERT_EQ(nbest.offsets.back(), nbest.tokens.size());
+  for (int i = 0; i < n_hyp; i++) {
+    auto result = nbest.get(i);
+    ASSERT_EQ(nbest.length(i), results[i].tokens.size());
+    ASSERT_EQ(result.tokens, results[i].tokens);
+    ASSERT_EQ(result.words, results[i].words);
+    ASSERT_EQ(nbest.score[i], results[i].score);
+  }
+  ASSERT_THROW(nbest.get(n_hyp), std::out_of_range);
+
+  /* -------- Statistics --------*/
+  ASSERT_EQ(decoder.stats().nFrames, 0); // disabled by default
+  decoder.enableStats(true, 10);
+  auto statsResults = decoder.decode(emission.data(), T, N);
+  ASSERT_EQ(statsResults.size(), results.size());
+  ASSERT_EQ(statsResults[0].score, results[0].score);
+  const auto& stats = decoder.stats();
+  ASSERT_EQ(stats.nFrames, T);
+  ASSERT_LE(stats.peakHypotheses, decoderOpt.beamSize);
+  ASSERT_LE(stats.nHypotheses, T * stats.peakHypotheses);
+  ASSERT_LT(stats.nPrunedCandidates, stats.nCandidates);
+  ASSERT_GT(stats.nLmQueries, 0);
+  ASSERT_EQ(stats.sampledHypotheses.size(), (T + 9) / 10);
+  // enableStats() only applies from the next decodeBegin()
+  decoder.decodeBegin();
+  decoder.enableStats(false);
+  decoder.decodeStep(emission.data(), T, N);
+  decoder.decodeEnd();
+  ASSERT_EQ(decoder.stats().nFrames, T);
+  ASSERT_EQ(decoder.stats().sampledHypotheses.size(), (T + 9) / 10);
+  decoder.decodeBegin();
+  decoder.enableStats(true);
+  decoder.decodeStep(emission.data(), T / 2, N);
+  decoder.decodeEnd();
+  ASSERT_EQ(decoder.stats().nFrames, T); // of the previous decoding
+  decoder.decode(emission.data(), T, N);
+  ASSERT_EQ(decoder.stats().nFrames, T);
+  ASSERT_TRUE(decoder.stats().sampledHypotheses.empty());
+  decoder.enableStats(false);
+
+  /* -------- Save / Load Trie --------*/
+  std::string triePath = "/tmp/DecoderTest.trie";
+  trie->save(triePath);
+  for (bool useMmap : {true, false}) {
+    auto loadedTrie = Trie::load(triePath, useMmap);
+    for (int i = 0; i < sentence.size(); i++) {
+      auto wordTensor = tokens2Tensor(sentence[i], tokenDict);
+      auto node = loadedTrie->search(wordTensor);
+      ASSERT_EQ(node->maxScore, trie->search(wordTensor)->maxScore);
+      ASSERT_EQ(node->labels, trie->search(wordTensor)->labels);
+    }
+
+    LexiconDecoder loadedDecoder(
+        decoderOpt,
+        loadedTrie,
+        lm,
+        silIdx,
+        blankIdx,
+        unkIdx,
+        transitions,
+        false);
+    auto loadedResults = loadedDecoder.decode(emission.data(), T, N);
+    ASSERT_EQ(loadedResults.size(), results.size());
+    for (int i = 0; i < results.size(); i++) {
+      ASSERT_EQ(loadedResults[i].score, results[i].score);
+    }
+  }
+
+  /* -------- Flat Trie --------*/
+  for (auto flatTrie :
+       {std::make_shared<FlatTrie>(*trie), FlatTrie::load(triePath)}) {
+    for (int i = 0; i < sentence.size(); i++) {
+      auto wordTensor = tokens2Tensor(sentence[i], tokenDict);
+      auto node = flatTrie->search(wordTensor);
+      ASSERT_EQ(node->maxScore, trie->search(wordTensor)->maxScore);
+    }
+
+    FlatLexiconDecoder flatDecoder(
+        decoderOpt, flatTrie, lm, silIdx, blankIdx, unkIdx, transitions, false);
+    auto flatResults = flatDecoder.decode(emission.data(), T, N);
+    ASSERT_EQ(flatResults.size(), results.size());
+    for (int i = 0; i < results.size(); i++) {
+      ASSERT_EQ(flatResults[i].score, results[i].score);
+    }
+  }
 }
 
 int main(int argc, char** argv) {
@@ -0,0 +1,145 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <atomic>
+#include <fstream>
+#include <limits>
+#include <string>
+#include <vector>
+
+#include "libraries/common/Defines.h"
+#include "libraries/common/Dictionary.h"
+#include "libraries/common/Utils.h"
+#include "libraries/common/WordUtils.h"
+#include "libraries/decoder/Decoder.h"
+#include "libraries/decoder/Trie.h"
+#include "libraries/lm/LM.h"
+
+namespace w2l {
+
+inline std::string dataDir() {
+#ifdef DECODER_TEST_DATADIR
+  return DECODER_TEST_DATADIR;
+#else
+  return "";
+#endif
+}
+
+/* Distinct for all the words, so that homophones are never tied */
+inline float unigramScore(int usrTokenIdx) {
+  return usrTokenIdx < 0 ? 0 : -(usrTokenIdx % 3) - 1e-4 * usrTokenIdx;
+}
+
+/* LM state counting the number of instances alive */
+struct UnigramLMState : LMState {
+  static std::atomic<int>& nAlive() {
+    static std::atomic<int> nAlive(0);
+    return nAlive;
+  }
+
+  UnigramLMState() {
+    nAlive()++;
+  }
+  ~UnigramLMState() {
+    nAlive()--;
+  }
+};
+
+/* Unigram LM scoring each token with unigramScore(), counting its queries */
+class UnigramLM : public LM {
+ public:
+  std::atomic<int> nQueries;
+
+  UnigramLM() : nQueries(0) {}
+
+  LMStatePtr start(bool /* unused */) override {
+    return std::make_shared<UnigramLMState>();
+  }
+
+  std::pair<LMStatePtr, float> score(
+      const LMStatePtr& state,
+      const int usrTokenIdx) override {
+    nQueries++;
+    return {
+        state->child<UnigramLMState>(usrTokenIdx), unigramScore(usrTokenIdx)};
+  }
+
+  std::pair<LMStatePtr, float> finish(const LMStatePtr& state) override {
+    return score(state, -1);
+  }
+};
+
+/* Dictionaries, trie and ASG emissions of the test data */
+struct DecoderTestData {
+  Dictionary tokenDict;
+  Dictionary wordDict;
+  TriePtr trie;
+  int silIdx;
+  int unkIdx;
+  int T;
+  int N;
+  std::vector<float> emissions; // T x N
+  std::vector<float> transitions; // N x N
+};
+
+/* Test data, the trie being smeared with `lm` */
+inline DecoderTestData loadTestData(const LMPtr& lm) {
+  DecoderTestData data;
+  data.tokenDict = Dictionary(pathsConcat(dataDir(), "letters.lst"));
+  data.tokenDict.addEntry("1"); // replabel
+  int N = data.N = data.tokenDict.indexSize();
+  auto lexicon = loadWords(pathsConcat(dataDir(), "words.lst"));
+  data.wordDict = createWordDict(lexicon);
+  data.silIdx = data.tokenDict.getIndex(kSilToken);
+  data.unkIdx = data.wordDict.getIndex(kUnkToken);
+  data.trie = Trie::fromLexicon(
+      pathsConcat(dataDir(), "words.lst"),
+      data.tokenDict,
+      data.wordDict,
+      lm,
+      0,
+      SmearingMode::MAX,
+      1,
+      data.silIdx);
+
+  int T;
+  std::ifstream tnStream(pathsConcat(dataDir(), "TN.bin"), std::ios::binary);
+  tnStream.read((char*)&T, sizeof(int));
+  data.T = T;
+  data.emissions.resize(T * N);
+  data.transitions.resize(N * N);
+  std::ifstream emStream(
+      pathsConcat(dataDir(), "emission.bin"), std::ios::binary);
+  emStream.read((char*)data.emissions.data(), T * N * sizeof(float));
+  std::ifstream trStream(
+      pathsConcat(dataDir(), "transition.bin"), std::ios::binary);
+  trStream.read((char*)data.transitions.data(), N * N * sizeof(float));
+  return data;
+}
+
+/* Options of the test decoders, without LM or word score */
+inline DecoderOptions testDecoderOptions(
+    int beamSize,
+    int beamSizeToken,
+    CriterionType criterionType = CriterionType::ASG) {
+  return DecoderOptions(
+      beamSize,
+      beamSizeToken,
+      100.0,
+      2.0,
+      2.0,
+      -std::numeric_limits<float>::infinity(),
+      -1,
+      0,
+      false,
+      criterionType);
+}
+
+} // namespace w2l
@@ -0,0 +1,68 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <fstream>
+#include <functional>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "libraries/decoder/FlatTrie.h"
+#include "libraries/decoder/Trie.h"
+
+using namespace w2l;
+
+TEST(FlatTrieTest, LoadRejectsCorruptedNodes) {
+  /* Root -> 0 -> {1, 2} and root -> 1 -> 0: nodes 1, 2 are the children of
+   * the root, nodes 3, 4 the ones of node 1 and node 5 the one of node 2 */
+  Trie trie(3, 0);
+  trie.insert({0, 1}, 0, -1);
+  trie.insert({0, 2}, 1, -2);
+  trie.insert({1, 0}, 2, -3);
+  trie.smear(SmearingMode::MAX);
+  FlatTrie flatTrie(trie);
+  ASSERT_EQ(flatTrie.nNodes(), 6);
+
+  std::string triePath = "/tmp/FlatTrieTest.trie";
+  flatTrie.save(triePath);
+  std::ifstream file(triePath, std::ios::binary);
+  std::vector<char> data(flatTrie.memorySize());
+  file.read(data.data(), data.size());
+  auto nodesOffset = data.size() - flatTrie.nNodes() * sizeof(FlatTrieNode) -
+      flatTrie.nLabels() * (sizeof(int32_t) + sizeof(float));
+
+  auto loadCorrupted = [&](std::function<void(FlatTrieNode*)> corrupt) {
+    auto copy = data;
+    corrupt(reinterpret_cast<FlatTrieNode*>(copy.data() + nodesOffset));
+    std::ofstream out(triePath, std::ios::binary);
+    out.write(copy.data(), copy.size());
+    out.close();
+    return Trie::load(triePath);
+  };
+  ASSERT_EQ(loadCorrupted([](FlatTrieNode*) {})->search({1, 0})->labels[0], 2);
+
+  // Node 2 has no parent
+  ASSERT_THROW(
+      loadCorrupted([](FlatTrieNode* nodes) { nodes[0].nChildren = 1; }),
+      std::invalid_argument);
+  // Node 4 is a child of nodes 1 and 2
+  ASSERT_THROW(
+      loadCorrupted([](FlatTrieNode* nodes) { nodes[2].firstChild = 4; }),
+      std::invalid_argument);
+  // Children of node 1 are not sorted
+  ASSERT_THROW(
+      loadCorrupted([](FlatTrieNode* nodes) { std::swap(nodes[3], nodes[4]); }),
+      std::invalid_argument);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,92 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <cstdio>
+#include <fstream>
+#include <string>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "libraries/decoder/NBestDump.h"
+
+using namespace w2l;
+
+namespace {
+
+DecodeResult
+makeResult(double score, std::vector<int> words, double lmScore = 0) {
+  DecodeResult result(words.size());
+  result.score = score;
+  result.amScore = score - lmScore;
+  result.lmScore = lmScore;
+  result.words = words;
+  return result;
+}
+
+} // namespace
+
+TEST(NBestDumpTest, Deduplication) {
+  // Same word sequence {3, 5} with different alignments
+  NBestList nbest;
+  nbest.add(makeResult(-3, {-1, 3, -1, 5}));
+  nbest.add(makeResult(-1, {3, -1, -1, 5}, -2));
+  nbest.add(makeResult(-2, {-1, -1, 4, -1}));
+
+  NBestDump dump;
+  dump.add("a", nbest);
+  dump.add("b", nbest, false);
+  ASSERT_EQ(dump.size(), 2);
+  ASSERT_EQ(dump.nHypotheses(), 5);
+  ASSERT_EQ(dump.hypOffsets, std::vector<int64_t>({0, 2, 5}));
+
+  // The best hypothesis of each sequence, by decreasing score
+  ASSERT_EQ(dump.offsets[2], 3);
+  ASSERT_EQ(
+      std::vector<int>(dump.words.begin(), dump.words.begin() + 3),
+      std::vector<int>({3, 5, 4}));
+  ASSERT_EQ(dump.score[0], -1);
+  ASSERT_EQ(dump.lmScore[0], -2);
+  ASSERT_EQ(dump.score[1], -2);
+  ASSERT_EQ(
+      std::vector<double>(dump.score.begin() + 2, dump.score.end()),
+      std::vector<double>({-1, -2, -3}));
+}
+
+TEST(NBestDumpTest, SaveLoad) {
+  NBestList nbest;
+  nbest.add(makeResult(-1.5, {-1, 7, 8}, -0.25));
+  nbest.add(makeResult(-2.5, {-1, -1, -1}));
+
+  NBestDump dump;
+  dump.add("dev-other/1", nbest);
+  dump.add("", NBestList());
+  dump.add("dev-other/2", nbest);
+
+  std::string path = "/tmp/NBestDumpTest.nbest";
+  dump.save(path);
+  auto loaded = NBestDump::load(path);
+  ASSERT_EQ(loaded.ids, dump.ids);
+  ASSERT_EQ(loaded.hypOffsets, dump.hypOffsets);
+  ASSERT_EQ(loaded.offsets, dump.offsets);
+  ASSERT_EQ(loaded.words, dump.words);
+  ASSERT_EQ(loaded.score, dump.score);
+  ASSERT_EQ(loaded.amScore, dump.amScore);
+  ASSERT_EQ(loaded.lmScore, dump.lmScore);
+
+  // Trailing data
+  std::ofstream(path, std::ios::binary | std::ios::app).write("x", 1);
+  ASSERT_THROW(NBestDump::load(path), std::runtime_error);
+  std::remove(path.c_str());
+  ASSERT_THROW(NBestDump::load(path), std::runtime_error);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
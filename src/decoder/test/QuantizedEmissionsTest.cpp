@@ -0,0 +1,87 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <cmath>
+#include <limits>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/QuantizedEmissions.h"
+
+using namespace w2l;
+
+TEST(QuantizedEmissionsTest, Dequantize) {
+  ASSERT_EQ(halfToFloat(0x3c00), 1.0);
+  ASSERT_EQ(halfToFloat(0xc000), -2.0);
+  ASSERT_EQ(halfToFloat(0x7bff), 65504.0);
+  ASSERT_EQ(halfToFloat(0x3555), 0.333251953125);
+  ASSERT_EQ(halfToFloat(0x0001), std::ldexp(1.0, -24));
+  ASSERT_EQ(halfToFloat(0x8000), 0.0);
+  ASSERT_EQ(halfToFloat(0xfc00), -std::numeric_limits<float>::infinity());
+  ASSERT_TRUE(std::isnan(halfToFloat(0x7e00)));
+
+  std::vector<int8_t> values = {-128, 0, 127, -128, -127, 1};
+  std::vector<float> scales = {0.5, 2}, offsets = {-10, 1};
+  QuantizedEmissions emissions(
+      EmissionsType::INT8, values.data(), 2, 3, scales.data(), offsets.data());
+  std::vector<float> output(3);
+  emissions.dequantize(1, 1, output.data());
+  ASSERT_EQ(output, std::vector<float>({1, 3, 259}));
+  ASSERT_THROW(emissions.dequantize(1, 2, output.data()), std::out_of_range);
+  ASSERT_THROW(
+      QuantizedEmissions(EmissionsType::INT8, values.data(), 2, 3),
+      std::invalid_argument);
+}
+
+TEST(QuantizedEmissionsTest, ChunkedDecoding) {
+  auto lm = std::make_shared<UnigramLM>();
+  auto data = loadTestData(lm);
+  int T = data.T, N = data.N;
+  auto& emissions = data.emissions;
+  LexiconDecoder decoder(
+      testDecoderOptions(100, 25),
+      data.trie,
+      lm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+
+  /* Emissions which are exact in int8: decoding them by chunks of frames
+   * gives the same results as decoding all the float32 emissions at once */
+  std::vector<int8_t> values(T * N);
+  std::vector<float> scales(T), offsets(T);
+  for (int t = 0; t < T; t++) {
+    scales[t] = 0.125;
+    offsets[t] = -20;
+    for (int n = 0; n < N; n++) {
+      float& value = emissions[t * N + n];
+      int level = std::round((value - offsets[t]) / scales[t]);
+      level = std::max(0, std::min(255, level));
+      values[t * N + n] = level - 128;
+      value = offsets[t] + scales[t] * level;
+    }
+  }
+  auto expected = decoder.decode(emissions.data(), T, N).front();
+  QuantizedEmissions quantized(
+      EmissionsType::INT8, values.data(), T, N, scales.data(), offsets.data());
+  for (int chunkSize : {1, 7, T}) {
+    auto result = quantized.decode(decoder, chunkSize).front();
+    ASSERT_EQ(result.score, expected.score);
+    ASSERT_EQ(result.tokens.size(), expected.tokens.size());
+  }
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,178 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <sys/wait.h>
+#include <unistd.h>
+#include <cstdint>
+#include <fstream>
+#include <random>
+#include <sstream>
+#include <string>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "libraries/decoder/FlatTrie.h"
+#include "libraries/decoder/Trie.h"
+
+using namespace w2l;
+
+namespace {
+
+const int kNumTokens = 30;
+const int kNumWorkers = 4;
+
+/* Random spellings of 4 to 12 tokens */
+std::vector<std::vector<int>> makeSpellings(int nSpellings) {
+  std::mt19937 rng(0);
+  std::uniform_int_distribution<int> length(4, 12), token(0, kNumTokens - 1);
+  std::vector<std::vector<int>> spellings(nSpellings);
+  for (auto& spelling : spellings) {
+    spelling.resize(length(rng));
+    for (auto& index : spelling) {
+      index = token(rng);
+    }
+  }
+  return spellings;
+}
+
+/* Rss and Pss (bytes) of the mapping of the process holding `address` */
+std::pair<int64_t, int64_t> mappingMemory(const void* address) {
+  std::ifstream smaps("/proc/self/smaps");
+  std::string line;
+  bool found = false;
+  int64_t rss = -1, pss = -1;
+  while (std::getline(smaps, line)) {
+    uintptr_t start, end;
+    char dash;
+    std::istringstream mapping(line);
+    if (mapping >> std::hex >> start >> dash >> end && dash == '-') {
+      if (found) {
+        break; // next mapping
+      }
+      auto value = reinterpret_cast<uintptr_t>(address);
+      found = start <= value && value < end;
+    } else if (found) {
+      std::istringstream field(line);
+      std::string name;
+      int64_t kb;
+      field >> name >> kb;
+      if (name == "Rss:") {
+        rss = kb * 1024;
+      } else if (name == "Pss:") {
+        pss = kb * 1024;
+      }
+    }
+  }
+  return {rss, pss};
+}
+
+} // namespace
+
+TEST(SharedFlatTrieTest, SameLookups) {
+  auto spellings = makeSpellings(1000);
+  Trie trie(kNumTokens, 0);
+  for (int i = 0; i < spellings.size(); i++) {
+    trie.insert(spellings[i], i, -(i % 7));
+  }
+  trie.smear(SmearingMode::MAX);
+  FlatTrie flatTrie(trie);
+  ASSERT_FALSE(flatTrie.isShared());
+
+  auto sharedTrie = flatTrie.share();
+  ASSERT_TRUE(sharedTrie->isShared());
+  ASSERT_EQ(sharedTrie->nNodes(), flatTrie.nNodes());
+  ASSERT_EQ(sharedTrie->memorySize(), flatTrie.memorySize());
+  ASSERT_NE(sharedTrie->getRoot(), flatTrie.getRoot());
+  for (const auto& spelling : spellings) {
+    const FlatTrieNode* node = sharedTrie->search(spelling);
+    ASSERT_NE(node, nullptr);
+    ASSERT_EQ(node->maxScore, flatTrie.search(spelling)->maxScore);
+    auto labels = sharedTrie->getLabels(node);
+    auto expected = flatTrie.getLabels(flatTrie.search(spelling));
+    ASSERT_EQ(
+        std::vector<int>(labels.begin(), labels.end()),
+        std::vector<int>(expected.begin(), expected.end()));
+  }
+}
+
+TEST(SharedFlatTrieTest, ForkedWorkersShareMemory) {
+  auto spellings = makeSpellings(200000);
+  std::shared_ptr<FlatTrie> sharedTrie;
+  {
+    Trie trie(kNumTokens, 0);
+    for (int i = 0; i < spellings.size(); i++) {
+      trie.insert(spellings[i], i, -(i % 7));
+    }
+    trie.smear(SmearingMode::MAX);
+    sharedTrie = FlatTrie(trie).share();
+  }
+  int64_t size = sharedTrie->memorySize();
+  ASSERT_GT(size, 8 << 20);
+
+  /* Workers look up all the words, then report their memory once all of them
+   * are running */
+  int ready[2], release[2], results[2], finish[2];
+  ASSERT_EQ(pipe(ready), 0);
+  ASSERT_EQ(pipe(release), 0);
+  ASSERT_EQ(pipe(results), 0);
+  ASSERT_EQ(pipe(finish), 0);
+  std::vector<pid_t> workers;
+  for (int w = 0; w < kNumWorkers; w++) {
+    pid_t pid = fork();
+    ASSERT_GE(pid, 0);
+    if (pid == 0) {
+      int64_t nFound = 0;
+      for (const auto& spelling : spellings) {
+        nFound += sharedTrie->search(spelling) != nullptr;
+      }
+      char byte = nFound == spellings.size();
+      if (write(ready[1], &byte, 1) != 1 || read(release[0], &byte, 1) != 1) {
+        _exit(1);
+      }
+      auto memory = mappingMemory(sharedTrie->getRoot());
+      if (write(results[1], &memory, sizeof(memory)) != sizeof(memory) ||
+          read(finish[0], &byte, 1) != 1) {
+        _exit(1);
+      }
+      _exit(0);
+    }
+    workers.push_back(pid);
+  }
+
+  for (int w = 0; w < kNumWorkers; w++) {
+    char found;
+    ASSERT_EQ(read(ready[0], &found, 1), 1);
+    ASSERT_TRUE(found);
+  }
+  std::string bytes(kNumWorkers, 'x');
+  ASSERT_EQ(write(release[1], bytes.data(), kNumWorkers), kNumWorkers);
+  int64_t totalPss = 0;
+  for (int w = 0; w < kNumWorkers; w++) {
+    std::pair<int64_t, int64_t> memory;
+    ASSERT_EQ(read(results[0], &memory, sizeof(memory)), sizeof(memory));
+    ASSERT_GE(memory.first, size * 9 / 10); // all the trie is resident...
+    totalPss += memory.second;
+  }
+  totalPss += mappingMemory(sharedTrie->getRoot()).second;
+  ASSERT_EQ(write(finish[1], bytes.data(), kNumWorkers), kNumWorkers);
+  for (pid_t pid : workers) {
+    int status;
+    ASSERT_EQ(waitpid(pid, &status, 0), pid);
+    ASSERT_TRUE(WIFEXITED(status) && WEXITSTATUS(status) == 0);
+  }
+
+  // ... but all the processes together cost a single copy of it
+  ASSERT_LE(totalPss, size + (kNumWorkers + 1) * 4096);
+  ASSERT_GE(totalPss, size * 9 / 10);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,138 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <unistd.h>
+#include <algorithm>
+#include <fstream>
+#include <random>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "DecoderTestUtils.h"
+#include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/decoder/StreamingDecodeSession.h"
+#include "libraries/lm/ZeroLM.h"
+
+using namespace w2l;
+
+namespace {
+
+/* Resident set size in bytes, -1 if it is not available */
+int64_t residentSetSize() {
+  std::ifstream statm("/proc/self/statm");
+  int64_t size, resident;
+  if (!(statm >> size >> resident)) {
+    return -1;
+  }
+  return resident * sysconf(_SC_PAGESIZE);
+}
+
+std::shared_ptr<LexiconDecoder> createDecoder(int beamSize, int& N) {
+  LMPtr lm = std::make_shared<ZeroLM>();
+  auto data = loadTestData(lm);
+  N = data.N;
+  return std::make_shared<LexiconDecoder>(
+      testDecoderOptions(beamSize, beamSize),
+      data.trie,
+      lm,
+      data.silIdx,
+      -1,
+      data.unkIdx,
+      data.transitions,
+      false);
+}
+
+std::vector<float> randomEmissions(int T, int N, std::mt19937& gen) {
+  std::normal_distribution<float> dist(0, 3);
+  std::vector<float> emissions(T * N);
+  for (auto& e : emissions) {
+    e = dist(gen);
+  }
+  return emissions;
+}
+
+} // namespace
+
+TEST(StreamingDecodeSessionTest, MatchesOfflineDecoding) {
+  int N;
+  auto decoder = createDecoder(50, N);
+  std::mt19937 gen(0);
+  int T = 300;
+  auto emissions = randomEmissions(T, N, gen);
+  auto offline = decoder->decode(emissions.data(), T, N).front();
+
+  // Nothing is pruned if lookBack covers the whole input
+  StreamingDecodeSession session(decoder, N, T);
+  for (int repeat = 0; repeat < 2; repeat++) {
+    for (int t = 0; t < T; t += 32) {
+      auto result =
+          session.decodeChunk(emissions.data() + t * N, std::min(32, T - t));
+      ASSERT_TRUE(result.stable.tokens.empty());
+      ASSERT_GE(result.latency, 0);
+    }
+    auto result = session.finish();
+    ASSERT_EQ(result.stable.tokens, offline.tokens);
+    ASSERT_EQ(result.stable.score, offline.score);
+    ASSERT_TRUE(session.isFinished());
+    ASSERT_THROW(session.finish(), std::runtime_error);
+    session.reset();
+  }
+
+  // With pruning, stable frames cover the whole input exactly once
+  StreamingDecodeSession prunedSession(decoder, N, 20);
+  std::vector<int> tokens;
+  for (int t = 0; t < T; t += 32) {
+    auto result = prunedSession.decodeChunk(
+        emissions.data() + t * N, std::min(32, T - t));
+    tokens.insert(
+        tokens.end(), result.stable.tokens.begin(), result.stable.tokens.end());
+    ASSERT_EQ(tokens.size(), prunedSession.nStableFrames());
+  }
+  ASSERT_GT(tokens.size(), 0);
+  auto result = prunedSession.finish();
+  tokens.insert(
+      tokens.end(), result.stable.tokens.begin(), result.stable.tokens.end());
+  ASSERT_EQ(prunedSession.nStableFrames(), T + 2); // with start and end frames
+  ASSERT_EQ(tokens.size(), offline.tokens.size());
+}
+
+TEST(StreamingDecodeSessionTest, BoundedMemoryOnOneHour) {
+  int N;
+  auto decoder = createDecoder(25, N);
+  int lookBack = 50, chunkSize = 100;
+  StreamingDecodeSession session(decoder, N, lookBack);
+
+  // One hour of 10ms frames, 10 different chunks are used in turn
+  std::mt19937 gen(0);
+  std::vector<std::vector<float>> chunks;
+  for (int i = 0; i < 10; i++) {
+    chunks.push_back(randomEmissions(chunkSize, N, gen));
+  }
+  int nChunks = 3600 * 100 / chunkSize;
+  int64_t warmRss = -1;
+  for (int i = 0; i < nChunks; i++) {
+    session.decodeChunk(chunks[i % chunks.size()].data(), chunkSize);
+    ASSERT_LE(
+        session.nFramesInBuffer(), chunkSize + lookBack + kLookBackLimit + 1);
+    if (i == nChunks / 10) {
+      warmRss = residentSetSize();
+    }
+  }
+  if (warmRss > 0) {
+    // Memory doesn't grow with the length of the stream
+    ASSERT_LT(residentSetSize() - warmRss, 16 << 20);
+  }
+  session.finish();
+  ASSERT_EQ(session.nStableFrames(), nChunks * chunkSize + 2);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,115 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <condition_variable>
+#include <functional>
+#include <future>
+#include <memory>
+#include <mutex>
+#include <queue>
+#include <stdexcept>
+#include <thread>
+#include <vector>
+
+namespace w2l {
+
+/**
+ * ThreadPool is a fixed-size pool of worker threads consuming a FIFO queue of
+ * tasks. It mirrors the interface of `fl::ThreadPool`, so that the standalone
+ * libraries (which do not depend on flashlight) can run work in parallel.
+ *
+ * Sample usage:
+ *
+ *   ThreadPool pool(4);
+ *   std::vector<std::future<int>> results;
+ *   for (int i = 0; i < 8; i++) {
+ *     results.emplace_back(pool.enqueue([](int x) { return x * x; }, i));
+ *   }
+ *   for (auto& r : results) {
+ *     r.get(); // rethrows the exception raised by the task, if any
+ *   }
+ *
+ * The destructor waits until all the enqueued tasks are finished.
+ */
+class ThreadPool {
+ public:
+  explicit ThreadPool(size_t nThreads) : stop_(false) {
+    if (nThreads == 0) {
+      throw std::invalid_argument("[ThreadPool] nThreads must be positive");
+    }
+    for (size_t i = 0; i < nThreads; ++i) {
+      workers_.emplace_back([this]() {
+        while (true) {
+          std::function<void()> task;
+          {
+            std::unique_lock<std::mutex> lock(mutex_);
+            condition_.wait(
+                lock, [this]() { return stop_ || !tasks_.empty(); });
+            if (stop_ && tasks_.empty()) {
+              return;
+            }
+            task = std::move(tasks_.front());
+            tasks_.pop();
+          }
+          task();
+        }
+      });
+    }
+  }
+
+  ThreadPool(const ThreadPool&) = delete;
+  ThreadPool& operator=(const ThreadPool&) = delete;
+
+  /* Add a new task to the queue, its result is returned through the future */
+  template <class F, class... Args>
+  std::future<typename std::result_of<F(Args...)>::type> enqueue(
+      F&& f,
+      Args&&... args) {
+    using ReturnType = typename std::result_of<F(Args...)>::type;
+    auto task = std::make_shared<std::packaged_task<ReturnType()>>(
+        std::bind(std::forward<F>(f), std::forward<Args>(args)...));
+    std::future<ReturnType> res = task->get_future();
+    {
+      std::unique_lock<std::mutex> lock(mutex_);
+      if (stop_) {
+        throw std::runtime_error("[ThreadPool] enqueue on a stopped pool");
+      }
+      tasks_.emplace([task]() { (*task)(); });
+    }
+    condition_.notify_one();
+    return res;
+  }
+
+  /* Number of worker threads */
+  size_t size() const {
+    return workers_.size();
+  }
+
+  ~ThreadPool() {
+    {
+      std::unique_lock<std::mutex> lock(mutex_);
+      stop_ = true;
+    }
+    condition_.notify_all();
+    for (auto& worker : workers_) {
+      worker.join();
+    }
+  }
+
+ private:
+  std::vector<std::thread> workers_;
+  std::queue<std::function<void()>> tasks_;
+
+  std::mutex mutex_;
+  std::condition_variable condition_;
+  bool stop_;
+};
+
+} // namespace w2l
@@ -0,0 +1,84 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <atomic>
+#include <exception>
+#include <stdexcept>
+
+#include "libraries/decoder/BatchDecoder.h"
+
+namespace w2l {
+
+std::vector<std::vector<DecodeResult>> BatchDecoder::decode(
+    const std::vector<const float*>& emissions,
+    const std::vector<int>& T,
+    int N,
+    int nThreads) {
+  if (emissions.size() != T.size()) {
+    throw std::invalid_argument(
+        "[BatchDecoder] emissions and T should have the same size");
+  }
+  if (nThreads <= 0) {
+    throw std::invalid_argument("[BatchDecoder] nThreads must be positive");
+  }
+  int nUtterances = emissions.size();
+  nThreads = std::max(1, std::min(nThreads, nUtterances));
+
+  std::vector<std::vector<DecodeResult>> results(nUtterances);
+  if (nUtterances == 0) {
+    return results;
+  }
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  while (decoders_.size() < static_cast<size_t>(nThreads)) {
+    decoders_.emplace_back(decoderFactory_());
+  }
+  if (!threadPool_ || threadPool_->size() < static_cast<size_t>(nThreads)) {
+    threadPool_.reset(new ThreadPool(nThreads));
+  }
+
+  // Threads pick the next utterance to decode until the batch is exhausted
+  std::atomic<int> next(0);
+  auto runDecoder =
+      [&emissions, &T, &results, &next, N, nUtterances](Decoder* decoder) {
+        int i;
+        while ((i = next++) < nUtterances) {
+          results[i] = decoder->decode(emissions[i], T[i], N);
+        }
+      };
+
+  std::vector<std::future<void>> futures;
+  for (int i = 0; i < nThreads; i++) {
+    futures.emplace_back(threadPool_->enqueue(runDecoder, decoders_[i].get()));
+  }
+
+  // All the tasks must be finished before leaving: they refer to local data
+  std::exception_ptr exception;
+  for (auto& future : futures) {
+    try {
+      future.get();
+    } catch (...) {
+      if (!exception) {
+        exception = std::current_exception();
+        next = nUtterances; // stop other threads
+      }
+    }
+  }
+  if (exception) {
+    std::rethrow_exception(exception);
+  }
+  return results;
+}
+
+int BatchDecoder::nDecoders() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return decoders_.size();
+}
+
+} // namespace w2l
@@ -0,0 +1,71 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <vector>
+
+#include "libraries/common/ThreadPool.h"
+#include "libraries/decoder/Decoder.h"
+
+namespace w2l {
+
+using DecoderFactory = std::function<DecoderPtr()>;
+
+/**
+ * BatchDecoder decodes a batch of independent utterances with a pool of native
+ * threads. Each thread owns its own decoder (and thus its own beam and
+ * hypothesis buffers) created with `decoderFactory`, while read-only resources
+ * captured by the factory (trie, LM) are shared between all of them.
+ *
+ * The shared LM must support concurrent calls on distinct states: this is the
+ * case for KenLM, while ConvLM keeps a mutable cache and cannot be shared.
+ * LMs implemented in Python are serialized by the GIL.
+ *
+ * Concurrent calls to decode() (e.g. from several Python threads, which
+ * release the GIL while decoding) are serialized: each call uses the decoders
+ * and threads of the pool, and may grow it.
+ *
+ * Sample usage:
+ *
+ *   BatchDecoder batchDecoder([&]() {
+ *     return std::make_shared<LexiconDecoder>(opt, trie, lm, ...);
+ *   });
+ *   auto results = batchDecoder.decode(emissions, T, N, nThreads);
+ *   // results[i] are the final hypothesis of utterance i (sorted)
+ */
+class BatchDecoder {
+ public:
+  explicit BatchDecoder(const DecoderFactory& decoderFactory)
+      : decoderFactory_(decoderFactory) {}
+
+  /**
+   * Decode `emissions[i]` (T[i] x N) for all i with `nThreads` threads, the
+   * results are returned in the input order.
+   */
+  std::vector<std::vector<DecodeResult>> decode(
+      const std::vector<const float*>& emissions,
+      const std::vector<int>& T,
+      int N,
+      int nThreads);
+
+  /* Number of decoders instantiated so far (one per thread) */
+  int nDecoders() const;
+
+ private:
+  DecoderFactory decoderFactory_;
+  std::vector<DecoderPtr> decoders_;
+  std::unique_ptr<ThreadPool> threadPool_;
+  // Guards decoders_ and threadPool_, held for a whole decode()
+  mutable std::mutex mutex_;
+};
+
+} // namespace w2l
@@ -8,6 +8,8 @@
 
 #pragma once
 
+#include <memory>
+
 #include "libraries/decoder/Utils.h"
 
 namespace w2l {
@@ -72,4 +74,6 @@ class Decoder {
   DecoderOptions opt_;
 };
 
+using DecoderPtr = std::shared_ptr<Decoder>;
+
 } // namespace w2l
@@ -0,0 +1,100 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <vector>
+
+namespace w2l {
+
+/**
+ * DecoderStats gathers counters on the work done by a decoder since the last
+ * decodeBegin(), to understand its speed and tune the beam options.
+ */
+struct DecoderStats {
+  // Number of frames decoded, and among them the blank frames skipped in CTC
+  int64_t nFrames;
+  int64_t nSkippedFrames;
+
+  // Hypotheses expanded, summed over frames
+  int64_t nHypotheses;
+
+  // Candidates proposed within beamThreshold of the best one, and among them
+  // the ones dropped because of beamSize or merged with another one
+  int64_t nCandidates;
+  int64_t nPrunedCandidates;
+
+  // Token beam and beam threshold used, summed over the frames expanded (not
+  // skipped): they vary with DecoderOptions.adaptiveBeamMinRatio
+  int64_t beamSizeTokenSum;
+  double beamThresholdSum;
+
+  // Trie nodes reached from the hypotheses
+  int64_t nTrieNodes;
+
+  // LM score() and finish() calls, and hits of a CachedLM among them
+  int64_t nLmQueries;
+  int64_t nLmCacheHits;
+
+  // Largest number of hypotheses and candidates in a frame
+  int64_t peakHypotheses;
+  int64_t peakCandidates;
+
+  // Wall time of each phase (seconds): expanding the hypotheses (including
+  // LM queries), batched LM prefetching, sorting and pruning the candidates,
+  // and decodeEnd()
+  double expandTime;
+  double lmPrefetchTime;
+  double storeTime;
+  double endTime;
+
+  // Number of hypotheses and candidates of one frame every `sampleRate`
+  // frames, none if `sampleRate` is 0
+  int sampleRate;
+  std::vector<int> sampledHypotheses;
+  std::vector<int> sampledCandidates;
+
+  explicit DecoderStats(int sampleRate = 0) : sampleRate(sampleRate) {
+    reset();
+  }
+
+  void reset() {
+    nFrames = 0;
+    nSkippedFrames = 0;
+    nHypotheses = 0;
+    nCandidates = 0;
+    nPrunedCandidates = 0;
+    beamSizeTokenSum = 0;
+    beamThresholdSum = 0;
+    nTrieNodes = 0;
+    nLmQueries = 0;
+    nLmCacheHits = 0;
+    peakHypotheses = 0;
+    peakCandidates = 0;
+    expandTime = 0;
+    lmPrefetchTime = 0;
+    storeTime = 0;
+    endTime = 0;
+    sampledHypotheses.clear();
+    sampledCandidates.clear();
+  }
+
+  /* Average token beam and beam threshold of the expanded frames */
+  double averageBeamSizeToken() const {
+    int64_t nExpanded = nFrames - nSkippedFrames;
+    return nExpanded > 0 ? (double)beamSizeTokenSum / nExpanded : 0;
+  }
+
+  double averageBeamThreshold() const {
+    int64_t nExpanded = nFrames - nSkippedFrames;
+    return nExpanded > 0 ? beamThresholdSum / nExpanded : 0;
+  }
+};
+
+} // namespace w2l
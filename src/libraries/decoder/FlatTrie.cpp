@@ -0,0 +1,322 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <cstring>
+#include <fstream>
+#include <queue>
+#include <stdexcept>
+
+#include "libraries/decoder/FlatTrie.h"
+
+namespace w2l {
+
+namespace {
+
+/* ===================== Binary format ===================== */
+
+const char kTrieMagic[8] = {'W', '2', 'L', 'T', 'R', 'I', 'E', '\0'};
+const int32_t kTrieVersion = 1;
+
+// Followed by the nodes, the labels and the scores arrays
+struct FlatTrieHeader {
+  char magic[8];
+  int32_t version;
+  int32_t maxChildren;
+  int64_t nNodes;
+  int64_t nLabels;
+};
+
+size_t dataSize(int64_t nNodes, int64_t nLabels) {
+  return sizeof(FlatTrieHeader) + nNodes * sizeof(FlatTrieNode) +
+      nLabels * (sizeof(int32_t) + sizeof(float));
+}
+
+} // namespace
+
+FlatTrie::FlatTrie(const Trie& trie) {
+  std::vector<FlatTrieNode> nodes;
+  std::vector<int32_t> labels;
+  std::vector<float> scores;
+
+  // BFS, children of a node are pushed together sorted by index
+  std::queue<const TrieNode*> queue;
+  queue.push(trie.getRoot());
+  int32_t nQueued = 1;
+  while (!queue.empty()) {
+    const TrieNode* node = queue.front();
+    queue.pop();
+
+    std::vector<int> childIndices;
+    childIndices.reserve(node->children.size());
+    for (const auto& child : node->children) {
+      childIndices.push_back(child.first);
+    }
+    std::sort(childIndices.begin(), childIndices.end());
+
+    nodes.push_back(
+        {node->idx,
+         nQueued,
+         static_cast<int32_t>(childIndices.size()),
+         static_cast<int32_t>(labels.size()),
+         static_cast<int32_t>(node->labels.size()),
+         node->maxScore});
+    labels.insert(labels.end(), node->labels.begin(), node->labels.end());
+    scores.insert(scores.end(), node->scores.begin(), node->scores.end());
+    for (int idx : childIndices) {
+      queue.push(node->children.find(idx)->second.get());
+    }
+    nQueued += childIndices.size();
+  }
+
+  FlatTrieHeader header;
+  std::memcpy(header.magic, kTrieMagic, sizeof(kTrieMagic));
+  header.version = kTrieVersion;
+  header.maxChildren = trie.maxChildren();
+  header.nNodes = nodes.size();
+  header.nLabels = labels.size();
+
+  size_t size = dataSize(header.nNodes, header.nLabels);
+  std::shared_ptr<char> data(new char[size], std::default_delete<char[]>());
+  char* ptr = data.get();
+  std::memcpy(ptr, &header, sizeof(header));
+  ptr += sizeof(header);
+  std::memcpy(ptr, nodes.data(), nodes.size() * sizeof(FlatTrieNode));
+  ptr += nodes.size() * sizeof(FlatTrieNode);
+  std::memcpy(ptr, labels.data(), labels.size() * sizeof(int32_t));
+  ptr += labels.size() * sizeof(int32_t);
+  std::memcpy(ptr, scores.data(), scores.size() * sizeof(float));
+  setData(data, size, false);
+}
+
+std::shared_ptr<FlatTrie> FlatTrie::fromSpellings(
+    int maxChildren,
+    int rootIdx,
+    const int* indices,
+    const int64_t* offsets,
+    const int* labels,
+    const float* scores,
+    int nSpellings,
+    SmearingMode smearMode) {
+  Trie trie(maxChildren, rootIdx);
+  for (int i = 0; i < nSpellings; i++) {
+    if (offsets[i] > offsets[i + 1]) {
+      throw std::invalid_argument(
+          "[FlatTrie] offsets should be non-decreasing");
+    }
+    trie.insert(
+        std::vector<int>(indices + offsets[i], indices + offsets[i + 1]),
+        labels[i],
+        scores[i]);
+  }
+  trie.smear(smearMode);
+  return std::make_shared<FlatTrie>(trie);
+}
+
+void FlatTrie::setData(
+    std::shared_ptr<const char> data,
+    size_t size,
+    bool shared) {
+  FlatTrieHeader header;
+  if (size < sizeof(header)) {
+    throw std::runtime_error("[FlatTrie] Invalid trie data: too small");
+  }
+  std::memcpy(&header, data.get(), sizeof(header));
+  if (std::memcmp(header.magic, kTrieMagic, sizeof(kTrieMagic)) != 0) {
+    throw std::runtime_error("[FlatTrie] Invalid trie data: bad magic");
+  }
+  if (header.version != kTrieVersion) {
+    throw std::runtime_error(
+        "[FlatTrie] Unsupported trie format version " +
+        std::to_string(header.version));
+  }
+  if (header.nNodes <= 0 || header.nLabels < 0 ||
+      size != dataSize(header.nNodes, header.nLabels)) {
+    throw std::runtime_error("[FlatTrie] Invalid trie data: bad size");
+  }
+
+  nodes_ = reinterpret_cast<const FlatTrieNode*>(data.get() + sizeof(header));
+  labels_ = reinterpret_cast<const int32_t*>(nodes_ + header.nNodes);
+  scores_ = reinterpret_cast<const float*>(labels_ + header.nLabels);
+  nNodes_ = header.nNodes;
+  nLabels_ = header.nLabels;
+  maxChildren_ = header.maxChildren;
+
+  // Children must come after their parent, so that the trie is acyclic
+  for (int64_t i = 0; i < nNodes_; i++) {
+    const FlatTrieNode& node = nodes_[i];
+    if (node.nChildren < 0 || node.nLabels < 0 || node.firstLabel < 0 ||
+        (node.nChildren > 0 &&
+         (node.firstChild <= i ||
+          node.firstChild + (int64_t)node.nChildren > nNodes_)) ||
+        node.firstLabel + (int64_t)node.nLabels > nLabels_) {
+      throw std::runtime_error(
+          "[FlatTrie] Invalid trie data: bad node " + std::to_string(i));
+    }
+  }
+
+  // Every node but the root is the child of exactly one node: the children
+  // ranges follow each other in the order of their parents, and the children
+  // of a node are sorted by token
+  int64_t nChildren = 1;
+  for (int64_t i = 0; i < nNodes_; i++) {
+    const FlatTrieNode& node = nodes_[i];
+    if (node.nChildren == 0) {
+      continue;
+    }
+    if (node.firstChild != nChildren) {
+      throw std::invalid_argument(
+          "[FlatTrie] Invalid trie data: children of node " +
+          std::to_string(i) + " are not contiguous");
+    }
+    for (int32_t c = node.firstChild + 1; c < node.firstChild + node.nChildren;
+         c++) {
+      if (nodes_[c].idx <= nodes_[c - 1].idx) {
+        throw std::invalid_argument(
+            "[FlatTrie] Invalid trie data: children of node " +
+            std::to_string(i) + " are not sorted");
+      }
+    }
+    nChildren += node.nChildren;
+  }
+  if (nChildren != nNodes_) {
+    throw std::invalid_argument(
+        "[FlatTrie] Invalid trie data: " + std::to_string(nNodes_ - nChildren) +
+        " nodes have no parent");
+  }
+
+  data_ = std::move(data);
+  size_ = size;
+  shared_ = shared;
+}
+
+std::shared_ptr<FlatTrie> FlatTrie::load(const std::string& path, bool mmap) {
+  std::shared_ptr<FlatTrie> trie(new FlatTrie());
+  size_t size;
+  std::shared_ptr<const char> data;
+
+  if (!mmap) {
+    std::ifstream file(path, std::ios::binary | std::ios::in | std::ios::ate);
+    if (!file.is_open()) {
+      throw std::runtime_error("[FlatTrie] Cannot open file: " + path);
+    }
+    size = file.tellg();
+    std::shared_ptr<char> buffer(new char[size], std::default_delete<char[]>());
+    file.seekg(0);
+    if (!file.read(buffer.get(), size)) {
+      throw std::runtime_error("[FlatTrie] Cannot read file: " + path);
+    }
+    data = buffer;
+  } else {
+    int fd = ::open(path.c_str(), O_RDONLY);
+    if (fd < 0) {
+      throw std::runtime_error("[FlatTrie] Cannot open file: " + path);
+    }
+    struct stat st;
+    if (::fstat(fd, &st) != 0 || st.st_size == 0) {
+      ::close(fd);
+      throw std::runtime_error("[FlatTrie] Cannot read file: " + path);
+    }
+    size = st.st_size;
+    void* ptr = ::mmap(nullptr, size, PROT_READ, MAP_SHARED, fd, 0);
+    ::close(fd);
+    if (ptr == MAP_FAILED) {
+      throw std::runtime_error("[FlatTrie] Cannot mmap file: " + path);
+    }
+    data.reset(static_cast<const char*>(ptr), [size](const char* ptr) {
+      ::munmap(const_cast<char*>(ptr), size);
+    });
+  }
+
+  try {
+    trie->setData(data, size, mmap);
+  } catch (const std::runtime_error& e) {
+    throw std::runtime_error(std::string(e.what()) + " in " + path);
+  } catch (const std::invalid_argument& e) {
+    throw std::invalid_argument(std::string(e.what()) + " in " + path);
+  }
+  return trie;
+}
+
+void FlatTrie::save(const std::string& path) const {
+  std::ofstream file(path, std::ios::binary | std::ios::out);
+  if (!file.is_open()) {
+    throw std::runtime_error(
+        "[FlatTrie] Cannot open file for writing: " + path);
+  }
+  file.write(data_.get(), size_);
+  if (!file.good()) {
+    throw std::runtime_error("[FlatTrie] Failed to write trie to: " + path);
+  }
+}
+
+std::shared_ptr<FlatTrie> FlatTrie::share() const {
+  void* ptr = ::mmap(
+      nullptr,
+      size_,
+      PROT_READ | PROT_WRITE,
+      MAP_SHARED | MAP_ANONYMOUS,
+      -1,
+      0);
+  if (ptr == MAP_FAILED) {
+    throw std::runtime_error("[FlatTrie] Cannot allocate shared memory");
+  }
+  std::memcpy(ptr, data_.get(), size_);
+  size_t size = size_;
+  std::shared_ptr<const char> data(
+      static_cast<const char*>(ptr),
+      [size](const char* ptr) { ::munmap(const_cast<char*>(ptr), size); });
+  if (::mprotect(ptr, size_, PROT_READ) != 0) {
+    throw std::runtime_error("[FlatTrie] Cannot protect shared memory");
+  }
+
+  std::shared_ptr<FlatTrie> trie(new FlatTrie());
+  trie->setData(data, size_, true);
+  return trie;
+}
+
+TriePtr FlatTrie::toTrie() const {
+  auto trie = std::make_shared<Trie>(maxChildren_, nodes_[0].idx);
+  std::vector<TrieNode*> trieNodes(nNodes_);
+  trieNodes[0] = trie->search({}).get();
+  for (int64_t i = 0; i < nNodes_; i++) {
+    const FlatTrieNode& node = nodes_[i];
+    TrieNode* trieNode = trieNodes[i];
+    trieNode->maxScore = node.maxScore;
+    auto labels = getLabels(&node);
+    trieNode->labels.assign(labels.begin(), labels.end());
+    trieNode->scores.assign(getScores(&node), getScores(&node) + node.nLabels);
+    for (int32_t c = node.firstChild; c < node.firstChild + node.nChildren;
+         c++) {
+      auto child = std::make_shared<TrieNode>(nodes_[c].idx);
+      trieNodes[c] = child.get();
+      trieNode->children[nodes_[c].idx] = child;
+    }
+  }
+  return trie;
+}
+
+const FlatTrieNode* FlatTrie::search(const std::vector<int>& indices) const {
+  const FlatTrieNode* node = getRoot();
+  for (auto idx : indices) {
+    if (idx < 0 || idx >= maxChildren_) {
+      throw std::out_of_range(
+          "[FlatTrie] Invalid letter index: " + std::to_string(idx));
+    }
+    node = getChild(node, idx);
+    if (!node) {
+      return nullptr;
+    }
+  }
+  return node;
+}
+
+} // namespace w2l
@@ -0,0 +1,196 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <algorithm>
+#include <cstdint>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include "libraries/decoder/Trie.h"
+
+namespace w2l {
+
+/**
+ * FlatTrieNode is the node structure of FlatTrie. Instead of pointers, it
+ * refers to ranges of the node, label and score arrays of the trie.
+ */
+struct FlatTrieNode {
+  // Node index
+  int32_t idx;
+
+  // Children are the nodes [firstChild, firstChild + nChildren), sorted by idx
+  int32_t firstChild;
+  int32_t nChildren;
+
+  // Labels (and scores) are [firstLabel, firstLabel + nLabels)
+  int32_t firstLabel;
+  int32_t nLabels;
+
+  // Maximum score of all the labels if this node is a leaf,
+  // otherwise it will be the value after trie smearing.
+  float maxScore;
+};
+
+/* Contiguous range of labels of a FlatTrieNode */
+struct FlatTrieLabels {
+  const int32_t* first;
+  const int32_t* last;
+
+  const int32_t* begin() const {
+    return first;
+  }
+  const int32_t* end() const {
+    return last;
+  }
+  size_t size() const {
+    return last - first;
+  }
+  bool empty() const {
+    return first == last;
+  }
+};
+
+/**
+ * FlatTrie is a read-only, array-backed version of an already smeared Trie.
+ * Nodes are stored in breadth-first order in a single array where the
+ * children of each node are contiguous and sorted by index (CSR layout), and
+ * the labels and scores of all the nodes are stored in two other arrays.
+ *
+ * A node takes 24 bytes, instead of several hundreds for a TrieNode with its
+ * hash map and vectors, and a lookup is a binary search in a small contiguous
+ * range. The in-memory layout is the one of the files written by `save()`
+ * (and `Trie::save()`), so `load()` can use a file mapped in memory as is.
+ *
+ * Sample usage:
+ *
+ *   auto flatTrie = std::make_shared<FlatTrie>(*trie); // after trie->smear()
+ *   FlatLexiconDecoder decoder(opt, flatTrie, lm, sil, blank, unk, ...);
+ */
+class FlatTrie {
+ public:
+  using Node = FlatTrieNode;
+
+  /* Flatten a trie, node scores are copied as they are */
+  explicit FlatTrie(const Trie& trie);
+
+  /**
+   * Build a trie from `nSpellings` spellings given in bulk: spelling i is
+   * `indices[offsets[i]:offsets[i + 1]]`, with label `labels[i]` and score
+   * `scores[i]`. The trie is smeared with `smearMode` before flattening.
+   */
+  static std::shared_ptr<FlatTrie> fromSpellings(
+      int maxChildren,
+      int rootIdx,
+      const int* indices,
+      const int64_t* offsets,
+      const int* labels,
+      const float* scores,
+      int nSpellings,
+      SmearingMode smearMode);
+
+  /**
+   * Load a trie saved with `save()` or `Trie::save()`. If `mmap` is true the
+   * file is mapped in memory and used without copy. Throws
+   * std::invalid_argument if its nodes do not form a trie.
+   */
+  static std::shared_ptr<FlatTrie> load(
+      const std::string& path,
+      bool mmap = true);
+
+  void save(const std::string& path) const;
+
+  /**
+   * Copy of the trie in an anonymous shared memory segment, read only. Its
+   * pages are never copied on write: processes forked after share() all map
+   * the same physical memory, and writing to it crashes instead of silently
+   * duplicating the pages.
+   */
+  std::shared_ptr<FlatTrie> share() const;
+
+  /* Whether the trie is in memory shared between processes (share() or load()
+   * with mmap) */
+  bool isShared() const {
+    return shared_;
+  }
+
+  /* Rebuild the pointer-based trie */
+  TriePtr toTrie() const;
+
+  /* Return the root node pointer */
+  const FlatTrieNode* getRoot() const {
+    return nodes_;
+  }
+
+  /* Return the child of `node` with index `idx`, nullptr if there is none */
+  const FlatTrieNode* getChild(const FlatTrieNode* node, int idx) const {
+    const FlatTrieNode* first = nodes_ + node->firstChild;
+    const FlatTrieNode* last = first + node->nChildren;
+    const FlatTrieNode* child = std::lower_bound(
+        first, last, idx, [](const FlatTrieNode& child, int idx) {
+          return child.idx < idx;
+        });
+    return child != last && child->idx == idx ? child : nullptr;
+  }
+
+  bool hasChildren(const FlatTrieNode* node) const {
+    return node->nChildren > 0;
+  }
+
+  FlatTrieLabels getLabels(const FlatTrieNode* node) const {
+    return {
+        labels_ + node->firstLabel, labels_ + node->firstLabel + node->nLabels};
+  }
+
+  const float* getScores(const FlatTrieNode* node) const {
+    return scores_ + node->firstLabel;
+  }
+
+  /* Get the node for a given token, nullptr if there is none */
+  const FlatTrieNode* search(const std::vector<int>& indices) const;
+
+  int maxChildren() const {
+    return maxChildren_;
+  }
+
+  int64_t nNodes() const {
+    return nNodes_;
+  }
+
+  int64_t nLabels() const {
+    return nLabels_;
+  }
+
+  /* Size of the node, label and score arrays in bytes */
+  int64_t memorySize() const {
+    return size_;
+  }
+
+ private:
+  FlatTrie() {}
+
+  void setData(std::shared_ptr<const char> data, size_t size, bool shared);
+
+  // Holds the file-formatted data: either an owned buffer or a mapped file
+  std::shared_ptr<const char> data_;
+  size_t size_;
+  bool shared_;
+
+  const FlatTrieNode* nodes_;
+  const int32_t* labels_;
+  const float* scores_;
+  int64_t nNodes_;
+  int64_t nLabels_;
+  int maxChildren_;
+};
+
+using FlatTriePtr = std::shared_ptr<FlatTrie>;
+
+} // namespace w2l
@@ -8,63 +8,163 @@
 
 #include <stdlib.h>
 #include <algorithm>
+#include <chrono>
 #include <cmath>
 #include <functional>
 #include <numeric>
 #include <unordered_map>
 
 #include "libraries/decoder/LexiconDecoder.h"
+#include "libraries/lm/CachedLM.h"
 
 namespace w2l {
 
-void LexiconDecoder::decodeBegin() {
+namespace {
+
+using Clock = std::chrono::steady_clock;
+
+double secondsSince(Clock::time_point start) {
+  return std::chrono::duration<double>(Clock::now() - start).count();
+}
+
+} // namespace
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::enableStats(bool enable, int sampleRate) {
+  if (sampleRate < 0) {
+    throw std::invalid_argument("[LexiconDecoder] sampleRate must be >= 0");
+  }
+  statsRequested_ = enable;
+  statsSampleRate_ = sampleRate;
+}
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::updateLmCacheHits() {
+  auto cachedLm = dynamic_cast<const CachedLM*>(lm_.get());
+  if (cachedLm) {
+    stats_.nLmCacheHits = cachedLm->hits() - lmCacheHitsAtBegin_;
+  }
+}
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::decodeBegin() {
   hyp_.clear();
-  hyp_.emplace(0, std::vector<LexiconDecoderState>());
+  hyp_.emplace(0, std::vector<State>());
 
   /* note: the lm reset itself with :start() */
   hyp_[0].emplace_back(
       0.0, lm_->start(0), lexicon_->getRoot(), nullptr, sil_, -1);
   nDecodedFrames_ = 0;
   nPrunedFrames_ = 0;
+
+  statsEnabled_ = statsRequested_;
+  if (statsEnabled_) {
+    stats_ = DecoderStats(statsSampleRate_);
+    auto cachedLm = dynamic_cast<const CachedLM*>(lm_.get());
+    lmCacheHitsAtBegin_ = cachedLm ? cachedLm->hits() : 0;
+  }
+}
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::decodeStep(
+    const float* emissions,
+    int T,
+    int N) {
+  if (statsEnabled_) {
+    decodeStepImpl<true>(emissions, T, N);
+    updateLmCacheHits();
+  } else {
+    decodeStepImpl<false>(emissions, T, N);
+  }
 }
 
-void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
+template <class Lexicon>
+template <bool kStats>
+void LexiconDecoderT<Lexicon>::decodeStepImpl(
+    const float* emissions,
+    int T,
+    int N) {
   int startFrame = nDecodedFrames_ - nPrunedFrames_;
   // Extend hyp_ buffer
   if (hyp_.size() < startFrame + T + 2) {
     for (int i = hyp_.size(); i < startFrame + T + 2; i++) {
-      hyp_.emplace(i, std::vector<LexiconDecoderState>());
+      hyp_.emplace(i, std::vector<State>());
     }
   }
 
   std::vector<size_t> idx(N);
   for (int t = 0; t < T; t++) {
+    Clock::time_point start;
+    if (kStats) {
+      int64_t nHyps = hyp_[startFrame + t].size();
+      stats_.nHypotheses += nHyps;
+      stats_.peakHypotheses = std::max(stats_.peakHypotheses, nHyps);
+      start = Clock::now();
+    }
+
+    double blankAmScore;
+    if (isBlankFrame(emissions + t * N, N, blankAmScore)) {
+      skipBlankFrame(startFrame + t, blankAmScore);
+      if (kStats) {
+        stats_.expandTime += secondsSince(start);
+        stats_.nSkippedFrames++;
+        stats_.nFrames++;
+      }
+      continue;
+    }
+
+    /* Beam of this frame */
+    double ratio = beamRatio(emissions + t * N, N);
+    double beamThreshold = opt_.beamThreshold * ratio;
+    int nTokens = std::min(opt_.beamSizeToken, N);
+    if (ratio < 1) {
+      nTokens = std::max(1, (int)std::ceil(nTokens * ratio));
+    }
+    if (kStats) {
+      stats_.beamSizeTokenSum += nTokens;
+      stats_.beamThresholdSum += beamThreshold;
+    }
+
     std::iota(idx.begin(), idx.end(), 0);
-    if (N > opt_.beamSizeToken) {
+    if (N > nTokens) {
       std::partial_sort(
           idx.begin(),
-          idx.begin() + opt_.beamSizeToken,
+          idx.begin() + nTokens,
           idx.end(),
           [&t, &N, &emissions](const size_t& l, const size_t& r) {
             return emissions[t * N + l] > emissions[t * N + r];
           });
     }
 
+    if (lm_->hasPrefetch()) {
+      if (kStats) {
+        stats_.expandTime += secondsSince(start);
+        start = Clock::now();
+      }
+      prefetchLMScores(hyp_[startFrame + t], idx, nTokens);
+      if (kStats) {
+        stats_.lmPrefetchTime += secondsSince(start);
+        start = Clock::now();
+      }
+    }
+
     candidatesReset(candidatesBestScore_, candidates_, candidatePtrs_);
-    for (const LexiconDecoderState& prevHyp : hyp_[startFrame + t]) {
-      const TrieNode* prevLex = prevHyp.lex;
+    for (const State& prevHyp : hyp_[startFrame + t]) {
+      const LexiconNode* prevLex = prevHyp.lex;
       const int prevIdx = prevHyp.token;
       const float lexMaxScore =
           prevLex == lexicon_->getRoot() ? 0 : prevLex->maxScore;
 
       /* (1) Try children */
-      for (int r = 0; r < std::min(opt_.beamSizeToken, N); ++r) {
+      for (int r = 0; r < nTokens; ++r) {
         int n = idx[r];
-        auto iter = prevLex->children.find(n);
-        if (iter == prevLex->children.end()) {
+        const LexiconNode* lex = lexicon_->getChild(prevLex, n);
+        if (!lex) {
           continue;
         }
-        const TrieNodePtr& lex = iter->second;
+        if (kStats) {
+          stats_.nTrieNodes++;
+        }
         double amScore = emissions[t * N + n];
         if (nDecodedFrames_ + t > 0 &&
             opt_.criterionType == CriterionType::ASG) {
@@ -79,6 +179,9 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         double lmScore = 0.;
 
         if (isLmToken_) {
+          if (kStats) {
+            stats_.nLmQueries++;
+          }
           auto lmStateScorePair = lm_->score(prevHyp.lmState, n);
           lmState = lmStateScorePair.first;
           lmScore = lmStateScorePair.second;
@@ -87,7 +190,7 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         // We eat-up a new token
         if (opt_.criterionType != CriterionType::CTC || prevHyp.prevBlank ||
             n != prevIdx) {
-          if (!lex->children.empty()) {
+          if (lexicon_->hasChildren(lex)) {
             if (!isLmToken_) {
               lmState = prevHyp.lmState;
               lmScore = lex->maxScore - lexMaxScore;
@@ -95,10 +198,10 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
             candidatesAdd(
                 candidates_,
                 candidatesBestScore_,
-                opt_.beamThreshold,
+                beamThreshold,
                 score + opt_.lmWeight * lmScore,
                 lmState,
-                lex.get(),
+                lex,
                 &prevHyp,
                 n,
                 -1,
@@ -109,8 +212,12 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         }
 
         // If we got a true word
-        for (auto label : lex->labels) {
+        const auto& labels = lexicon_->getLabels(lex);
+        for (auto label : labels) {
           if (!isLmToken_) {
+            if (kStats) {
+              stats_.nLmQueries++;
+            }
             auto lmStateScorePair = lm_->score(prevHyp.lmState, label);
             lmState = lmStateScorePair.first;
             lmScore = lmStateScorePair.second - lexMaxScore;
@@ -118,7 +225,7 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
           candidatesAdd(
               candidates_,
               candidatesBestScore_,
-              opt_.beamThreshold,
+              beamThreshold,
               score + opt_.lmWeight * lmScore + opt_.wordScore,
               lmState,
               lexicon_->getRoot(),
@@ -131,8 +238,11 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         }
 
         // If we got an unknown word
-        if (lex->labels.empty() && (opt_.unkScore > kNegativeInfinity)) {
+        if (labels.empty() && (opt_.unkScore > kNegativeInfinity)) {
           if (!isLmToken_) {
+            if (kStats) {
+              stats_.nLmQueries++;
+            }
             auto lmStateScorePair = lm_->score(prevHyp.lmState, unk_);
             lmState = lmStateScorePair.first;
             lmScore = lmStateScorePair.second - lexMaxScore;
@@ -140,7 +250,7 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
           candidatesAdd(
               candidates_,
               candidatesBestScore_,
-              opt_.beamThreshold,
+              beamThreshold,
               score + opt_.lmWeight * lmScore + opt_.unkScore,
               lmState,
               lexicon_->getRoot(),
@@ -169,7 +279,7 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         candidatesAdd(
             candidates_,
             candidatesBestScore_,
-            opt_.beamThreshold,
+            beamThreshold,
             score,
             prevHyp.lmState,
             prevLex,
@@ -194,7 +304,7 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
         candidatesAdd(
             candidates_,
             candidatesBestScore_,
-            opt_.beamThreshold,
+            beamThreshold,
             prevHyp.score + amScore,
             prevHyp.lmState,
             prevLex,
@@ -208,36 +318,67 @@ void LexiconDecoder::decodeStep(const float* emissions, int T, int N) {
       // finish proposing
     }
 
+    if (kStats) {
+      stats_.expandTime += secondsSince(start);
+      start = Clock::now();
+    }
+
     candidatesStore(
         candidates_,
         candidatePtrs_,
         hyp_[startFrame + t + 1],
         opt_.beamSize,
-        candidatesBestScore_ - opt_.beamThreshold,
+        candidatesBestScore_ - beamThreshold,
         opt_.logAdd,
         false);
     updateLMCache(lm_, hyp_[startFrame + t + 1]);
+
+    if (kStats) {
+      stats_.storeTime += secondsSince(start);
+      int64_t nCandidates = candidates_.size();
+      stats_.nCandidates += nCandidates;
+      stats_.nPrunedCandidates += nCandidates - hyp_[startFrame + t + 1].size();
+      stats_.peakCandidates = std::max(stats_.peakCandidates, nCandidates);
+      if (stats_.sampleRate > 0 &&
+          (nDecodedFrames_ + t) % stats_.sampleRate == 0) {
+        stats_.sampledHypotheses.push_back(hyp_[startFrame + t].size());
+        stats_.sampledCandidates.push_back(nCandidates);
+      }
+      stats_.nFrames++;
+    }
   }
 
   nDecodedFrames_ += T;
 }
 
-void LexiconDecoder::decodeEnd() {
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::decodeEnd() {
+  auto start = Clock::now();
   candidatesReset(candidatesBestScore_, candidates_, candidatePtrs_);
   bool hasNiceEnding = false;
-  for (const LexiconDecoderState& prevHyp :
-       hyp_[nDecodedFrames_ - nPrunedFrames_]) {
+  for (const State& prevHyp : hyp_[nDecodedFrames_ - nPrunedFrames_]) {
     if (prevHyp.lex == lexicon_->getRoot()) {
       hasNiceEnding = true;
       break;
     }
   }
-  for (const LexiconDecoderState& prevHyp :
-       hyp_[nDecodedFrames_ - nPrunedFrames_]) {
-    const TrieNode* prevLex = prevHyp.lex;
+  if (lm_->hasPrefetch()) {
+    std::vector<LMStatePtr> states;
+    for (const State& prevHyp : hyp_[nDecodedFrames_ - nPrunedFrames_]) {
+      if (!hasNiceEnding || prevHyp.lex == lexicon_->getRoot()) {
+        states.push_back(prevHyp.lmState);
+      }
+    }
+    lm_->prefetch(states, std::vector<int>(states.size(), -1));
+  }
+  for (const State& prevHyp : hyp_[nDecodedFrames_ - nPrunedFrames_]) {
+    const LexiconNode* prevLex = prevHyp.lex;
     const LMStatePtr& prevLmState = prevHyp.lmState;
 
     if (!hasNiceEnding || prevHyp.lex == lexicon_->getRoot()) {
+      if (statsEnabled_) {
+        stats_.nLmQueries++;
+      }
       auto lmStateScorePair = lm_->finish(prevLmState);
       auto lmScore = lmStateScorePair.second;
       candidatesAdd(
@@ -265,9 +406,160 @@ void LexiconDecoder::decodeEnd() {
       opt_.logAdd,
       true);
   ++nDecodedFrames_;
+
+  if (statsEnabled_) {
+    stats_.endTime += secondsSince(start);
+    updateLmCacheHits();
+  }
+}
+
+template <class Lexicon>
+bool LexiconDecoderT<Lexicon>::isBlankFrame(
+    const float* emissions,
+    int N,
+    double& amScore) const {
+  if (opt_.criterionType != CriterionType::CTC || blank_ < 0 ||
+      opt_.blankSkipThreshold >= 1) {
+    return false;
+  }
+  float maxScore = *std::max_element(emissions, emissions + N);
+  if (opt_.blankSkipThreshold >= 0.5 && emissions[blank_] < maxScore) {
+    return false; // the posterior of blank is at most 0.5
+  }
+  double sum = 0;
+  for (int n = 0; n < N; n++) {
+    sum += std::exp(emissions[n] - maxScore);
+  }
+  double posterior = std::exp(emissions[blank_] - maxScore) / sum;
+  if (posterior <= opt_.blankSkipThreshold) {
+    return false;
+  }
+
+  /* Same score as the blank candidates of decodeStep() */
+  amScore = emissions[blank_];
+  if (maxScore > amScore) {
+    amScore -= opt_.blankScore;
+  }
+  return true;
+}
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::skipBlankFrame(int frame, double amScore) {
+  const std::vector<State>& prevHyps = hyp_[frame];
+  std::vector<State>& hyps = hyp_[frame + 1];
+
+  /* If they all end with blank, the hypotheses are only shifted: nothing to
+   * merge or prune, and the LM states are the same */
+  bool allBlank = std::all_of(
+      prevHyps.begin(), prevHyps.end(), [this](const State& prevHyp) {
+        return prevHyp.prevBlank && prevHyp.token == blank_;
+      });
+  if (allBlank) {
+    hyps.clear();
+    hyps.reserve(prevHyps.size());
+    for (const State& prevHyp : prevHyps) {
+      hyps.emplace_back(
+          prevHyp.score + amScore,
+          prevHyp.lmState,
+          prevHyp.lex,
+          &prevHyp,
+          blank_,
+          -1,
+          true, // prevBlank
+          prevHyp.amScore + amScore,
+          prevHyp.lmScore);
+    }
+    return;
+  }
+
+  candidatesReset(candidatesBestScore_, candidates_, candidatePtrs_);
+  for (const State& prevHyp : prevHyps) {
+    candidatesAdd(
+        candidates_,
+        candidatesBestScore_,
+        opt_.beamThreshold,
+        prevHyp.score + amScore,
+        prevHyp.lmState,
+        prevHyp.lex,
+        &prevHyp,
+        blank_,
+        -1,
+        true, // prevBlank
+        prevHyp.amScore + amScore,
+        prevHyp.lmScore);
+  }
+  candidatesStore(
+      candidates_,
+      candidatePtrs_,
+      hyps,
+      opt_.beamSize,
+      candidatesBestScore_ - opt_.beamThreshold,
+      opt_.logAdd,
+      false);
+  updateLMCache(lm_, hyps);
+}
+
+template <class Lexicon>
+double LexiconDecoderT<Lexicon>::beamRatio(const float* emissions, int N)
+    const {
+  if (opt_.adaptiveBeamMinRatio >= 1) {
+    return 1;
+  }
+  /* Entropy of the softmax of the emissions */
+  float maxScore = *std::max_element(emissions, emissions + N);
+  double sum = 0, weightedSum = 0;
+  for (int n = 0; n < N; n++) {
+    double shifted = emissions[n] - maxScore;
+    double weight = std::exp(shifted);
+    sum += weight;
+    weightedSum += weight * shifted;
+  }
+  double entropy = std::log(sum) - weightedSum / sum;
+  double fullness = opt_.adaptiveBeamEntropy > 0
+      ? std::min(1.0, entropy / opt_.adaptiveBeamEntropy)
+      : 1.0;
+  double minRatio = std::max(0.0, opt_.adaptiveBeamMinRatio);
+  return minRatio + (1 - minRatio) * fullness;
+}
+
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::prefetchLMScores(
+    const std::vector<State>& hypothesis,
+    const std::vector<size_t>& idx,
+    int nTokens) {
+  // Same queries as in decodeStep(): a CTC token repeated without blank in
+  // between only skips the new-token candidate, its words are still scored
+  std::vector<LMStatePtr> states;
+  std::vector<int> tokens;
+  for (const State& prevHyp : hypothesis) {
+    for (int r = 0; r < nTokens; ++r) {
+      int n = idx[r];
+      const LexiconNode* lex = lexicon_->getChild(prevHyp.lex, n);
+      if (!lex) {
+        continue;
+      }
+      if (isLmToken_) {
+        states.push_back(prevHyp.lmState);
+        tokens.push_back(n);
+        continue;
+      }
+      const auto& labels = lexicon_->getLabels(lex);
+      for (auto label : labels) {
+        states.push_back(prevHyp.lmState);
+        tokens.push_back(label);
+      }
+      if (labels.empty() && (opt_.unkScore > kNegativeInfinity)) {
+        states.push_back(prevHyp.lmState);
+        tokens.push_back(unk_);
+      }
+    }
+  }
+  lm_->prefetch(states, tokens);
 }
 
-std::vector<DecodeResult> LexiconDecoder::getAllFinalHypothesis() const {
+template <class Lexicon>
+std::vector<DecodeResult> LexiconDecoderT<Lexicon>::getAllFinalHypothesis()
+    const {
   int finalFrame = nDecodedFrames_ - nPrunedFrames_;
   if (finalFrame < 1) {
     return std::vector<DecodeResult>{};
@@ -276,32 +568,36 @@ std::vector<DecodeResult> LexiconDecoder::getAllFinalHypothesis() const {
   return getAllHypothesis(hyp_.find(finalFrame)->second, finalFrame);
 }
 
-DecodeResult LexiconDecoder::getBestHypothesis(int lookBack) const {
+template <class Lexicon>
+DecodeResult LexiconDecoderT<Lexicon>::getBestHypothesis(int lookBack) const {
   if (nDecodedFrames_ - nPrunedFrames_ - lookBack < 1) {
     return DecodeResult();
   }
 
-  const LexiconDecoderState* bestNode = findBestAncestor(
+  const State* bestNode = findBestAncestor(
       hyp_.find(nDecodedFrames_ - nPrunedFrames_)->second, lookBack);
   return getHypothesis(bestNode, nDecodedFrames_ - nPrunedFrames_ - lookBack);
 }
 
-int LexiconDecoder::nHypothesis() const {
+template <class Lexicon>
+int LexiconDecoderT<Lexicon>::nHypothesis() const {
   int finalFrame = nDecodedFrames_ - nPrunedFrames_;
   return hyp_.find(finalFrame)->second.size();
 }
 
-int LexiconDecoder::nDecodedFramesInBuffer() const {
+template <class Lexicon>
+int LexiconDecoderT<Lexicon>::nDecodedFramesInBuffer() const {
   return nDecodedFrames_ - nPrunedFrames_ + 1;
 }
 
-void LexiconDecoder::prune(int lookBack) {
+template <class Lexicon>
+void LexiconDecoderT<Lexicon>::prune(int lookBack) {
   if (nDecodedFrames_ - nPrunedFrames_ - lookBack < 1) {
     return; // Not enough decoded frames to prune
   }
 
   /* (1) Find the last emitted word in the best path */
-  const LexiconDecoderState* bestNode = findBestAncestor(
+  const State* bestNode = findBestAncestor(
       hyp_.find(nDecodedFrames_ - nPrunedFrames_)->second, lookBack);
   if (!bestNode) {
     return; // Not enough decoded frames to prune
@@ -318,4 +614,7 @@ void LexiconDecoder::prune(int lookBack) {
   nPrunedFrames_ = nDecodedFrames_ - lookBack;
 }
 
+template class LexiconDecoderT<Trie>;
+template class LexiconDecoderT<FlatTrie>;
+
 } // namespace w2l
@@ -11,18 +11,22 @@
 #include <unordered_map>
 
 #include "libraries/decoder/Decoder.h"
+#include "libraries/decoder/DecoderStats.h"
+#include "libraries/decoder/FlatTrie.h"
 #include "libraries/decoder/Trie.h"
 #include "libraries/lm/LM.h"
 
 namespace w2l {
 /**
  * LexiconDecoderState stores information for each hypothesis in the beam.
+ * `LexiconNode` is the node type of the lexicon trie.
  */
-struct LexiconDecoderState {
+template <class LexiconNode>
+struct LexiconDecoderStateT {
   double score; // Accumulated total score so far
   LMStatePtr lmState; // Language model state
-  const TrieNode* lex; // Trie node in the lexicon
-  const LexiconDecoderState* parent; // Parent hypothesis
+  const LexiconNode* lex; // Trie node in the lexicon
+  const LexiconDecoderStateT* parent; // Parent hypothesis
   int token; // Label of token
   int word; // Label of word (-1 if incomplete)
   bool prevBlank; // If previous hypothesis is blank (for CTC only)
@@ -30,11 +34,11 @@ struct LexiconDecoderState {
   double amScore; // Accumulated AM score so far
   double lmScore; // Accumulated LM score so far
 
-  LexiconDecoderState(
+  LexiconDecoderStateT(
       const double score,
       const LMStatePtr& lmState,
-      const TrieNode* lex,
-      const LexiconDecoderState* parent,
+      const LexiconNode* lex,
+      const LexiconDecoderStateT* parent,
       const int token,
       const int word,
       const bool prevBlank = false,
@@ -50,7 +54,7 @@ struct LexiconDecoderState {
         amScore(amScore),
         lmScore(lmScore) {}
 
-  LexiconDecoderState()
+  LexiconDecoderStateT()
       : score(0.),
         lmState(nullptr),
         lex(nullptr),
@@ -61,7 +65,7 @@ struct LexiconDecoderState {
         amScore(0.),
         lmScore(0.) {}
 
-  int compareNoScoreStates(const LexiconDecoderState* node) const {
+  int compareNoScoreStates(const LexiconDecoderStateT* node) const {
     int lmCmp = lmState->compare(node->lmState);
     if (lmCmp != 0) {
       return lmCmp > 0 ? 1 : -1;
@@ -84,6 +88,8 @@ struct LexiconDecoderState {
   }
 };
 
+using LexiconDecoderState = LexiconDecoderStateT<TrieNode>;
+
 /**
  * Decoder implements a beam seach decoder that finds the word transcription
  * W maximizing:
@@ -96,12 +102,19 @@ struct LexiconDecoderState {
  * score of the transcription W. Note that the lexicon is used to limit the
  * search space and all candidate words are generated from it if unkScore is
  * -inf, otherwise <UNK> will be generated for OOVs.
+ *
+ * The lexicon can be either a Trie (LexiconDecoder) or a FlatTrie
+ * (FlatLexiconDecoder), both produce the same results.
  */
-class LexiconDecoder : public Decoder {
+template <class Lexicon>
+class LexiconDecoderT : public Decoder {
  public:
-  LexiconDecoder(
+  using LexiconNode = typename Lexicon::Node;
+  using State = LexiconDecoderStateT<LexiconNode>;
+
+  LexiconDecoderT(
       const DecoderOptions& opt,
-      const TriePtr& lexicon,
+      const std::shared_ptr<Lexicon>& lexicon,
       const LMPtr& lm,
       const int sil,
       const int blank,
@@ -115,7 +128,11 @@ class LexiconDecoder : public Decoder {
         blank_(blank),
         unk_(unk),
         transitions_(transitions),
-        isLmToken_(isLmToken) {}
+        isLmToken_(isLmToken),
+        statsRequested_(false),
+        statsSampleRate_(0),
+        statsEnabled_(false),
+        lmCacheHitsAtBegin_(0) {}
 
   void decodeBegin() override;
 
@@ -133,9 +150,22 @@ class LexiconDecoder : public Decoder {
 
   std::vector<DecodeResult> getAllFinalHypothesis() const override;
 
+  /**
+   * Collect DecoderStats from the next decodeBegin() on, a decoding in
+   * progress keeps its setting. If `sampleRate` is positive, the beam size of
+   * one frame every `sampleRate` is also recorded. When disabled, decodeStep()
+   * runs a version compiled without the counters.
+   */
+  void enableStats(bool enable, int sampleRate = 0);
+
+  /* Statistics since the last decodeBegin() */
+  const DecoderStats& stats() const {
+    return stats_;
+  }
+
  protected:
   // Lexicon trie to restrict beam-search decoder
-  TriePtr lexicon_;
+  std::shared_ptr<Lexicon> lexicon_;
   LMPtr lm_;
   // Index of silence label
   int sil_;
@@ -151,21 +181,67 @@ class LexiconDecoder : public Decoder {
 
   // All the hypothesis new candidates (can be larger than beamsize) proposed
   // based on the ones from previous frame
-  std::vector<LexiconDecoderState> candidates_;
+  std::vector<State> candidates_;
 
   // This vector is designed for efficient sorting and merging the candidates_,
   // so instead of moving around objects, we only need to sort pointers
-  std::vector<LexiconDecoderState*> candidatePtrs_;
+  std::vector<State*> candidatePtrs_;
 
   // Best candidate score of current frame
   double candidatesBestScore_;
 
   // Vector of hypothesis for all the frames so far
-  std::unordered_map<int, std::vector<LexiconDecoderState>> hyp_;
+  std::unordered_map<int, std::vector<State>> hyp_;
 
   // These 2 variables are used for online decoding, for hypothesis pruning
   int nDecodedFrames_; // Total number of decoded frames.
   int nPrunedFrames_; // Total number of pruned frames from hyp_.
+
+  // Statistics, only updated if statsEnabled_, which is latched from
+  // statsRequested_ (set by enableStats()) at decodeBegin()
+  bool statsRequested_;
+  int statsSampleRate_;
+  bool statsEnabled_;
+  DecoderStats stats_;
+  int64_t lmCacheHitsAtBegin_;
+
+  template <bool kStats>
+  void decodeStepImpl(const float* emissions, int T, int N);
+
+  /**
+   * Score at once the LM queries of a frame, `idx` being its tokens sorted by
+   * score of which the `nTokens` first are expanded
+   */
+  void prefetchLMScores(
+      const std::vector<State>& hypothesis,
+      const std::vector<size_t>& idx,
+      int nTokens);
+
+  /* Update the number of hits of lm_ if it is a CachedLM */
+  void updateLmCacheHits();
+
+  /**
+   * Whether the frame `emissions` (N scores) can be skipped in CTC, i.e. its
+   * blank posterior is above opt_.blankSkipThreshold. If so, `amScore` is the
+   * score of blank, as in the beam expansion.
+   */
+  bool isBlankFrame(const float* emissions, int N, double& amScore) const;
+
+  /* Extend all the hypotheses of `frame` with blank */
+  void skipBlankFrame(int frame, double amScore);
+
+  /**
+   * Ratio applied to opt_.beamSizeToken and opt_.beamThreshold for the frame
+   * `emissions` (N scores), depending on the entropy of its posteriors. It is
+   * 1 unless opt_.adaptiveBeamMinRatio is below 1.
+   */
+  double beamRatio(const float* emissions, int N) const;
 };
 
+using LexiconDecoder = LexiconDecoderT<Trie>;
+using FlatLexiconDecoder = LexiconDecoderT<FlatTrie>;
+
+extern template class LexiconDecoderT<Trie>;
+extern template class LexiconDecoderT<FlatTrie>;
+
 } // namespace w2l
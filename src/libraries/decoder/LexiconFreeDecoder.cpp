@@ -49,6 +49,10 @@ void LexiconFreeDecoder::decodeStep(const float* emissions, int T, int N) {
           });
     }
 
+    if (lm_->hasPrefetch()) {
+      prefetchLMScores(hyp_[startFrame + t], idx, N);
+    }
+
     candidatesReset(candidatesBestScore_, candidates_, candidatePtrs_);
     for (const LexiconFreeDecoderState& prevHyp : hyp_[startFrame + t]) {
       const int prevIdx = prevHyp.token;
@@ -125,6 +129,14 @@ void LexiconFreeDecoder::decodeStep(const float* emissions, int T, int N) {
 
 void LexiconFreeDecoder::decodeEnd() {
   candidatesReset(candidatesBestScore_, candidates_, candidatePtrs_);
+  if (lm_->hasPrefetch()) {
+    std::vector<LMStatePtr> states;
+    for (const LexiconFreeDecoderState& prevHyp :
+         hyp_[nDecodedFrames_ - nPrunedFrames_]) {
+      states.push_back(prevHyp.lmState);
+    }
+    lm_->prefetch(states, std::vector<int>(states.size(), -1));
+  }
   for (const LexiconFreeDecoderState& prevHyp :
        hyp_[nDecodedFrames_ - nPrunedFrames_]) {
     const LMStatePtr& prevLmState = prevHyp.lmState;
@@ -156,6 +168,27 @@ void LexiconFreeDecoder::decodeEnd() {
   ++nDecodedFrames_;
 }
 
+void LexiconFreeDecoder::prefetchLMScores(
+    const std::vector<LexiconFreeDecoderState>& hypothesis,
+    const std::vector<size_t>& idx,
+    int N) {
+  // Same queries as in decodeStep()
+  std::vector<LMStatePtr> states;
+  std::vector<int> tokens;
+  for (const LexiconFreeDecoderState& prevHyp : hypothesis) {
+    for (int r = 0; r < std::min(opt_.beamSizeToken, N); ++r) {
+      int n = idx[r];
+      if ((opt_.criterionType == CriterionType::ASG && n != prevHyp.token) ||
+          (opt_.criterionType == CriterionType::CTC && n != blank_ &&
+           (n != prevHyp.token || prevHyp.prevBlank))) {
+        states.push_back(prevHyp.lmState);
+        tokens.push_back(n);
+      }
+    }
+  }
+  lm_->prefetch(states, tokens);
+}
+
 std::vector<DecodeResult> LexiconFreeDecoder::getAllFinalHypothesis() const {
   int finalFrame = nDecodedFrames_ - nPrunedFrames_;
   return getAllHypothesis(hyp_.find(finalFrame)->second, finalFrame);
@@ -141,6 +141,12 @@ class LexiconFreeDecoder : public Decoder {
   // These 2 variables are used for online decoding, for hypothesis pruning
   int nDecodedFrames_; // Total number of decoded frames.
   int nPrunedFrames_; // Total number of pruned frames from hyp_.
+
+  /* Score at once the LM queries of a frame, `idx` being its sorted tokens */
+  void prefetchLMScores(
+      const std::vector<LexiconFreeDecoderState>& hypothesis,
+      const std::vector<size_t>& idx,
+      int N);
 };
 
 } // namespace w2l
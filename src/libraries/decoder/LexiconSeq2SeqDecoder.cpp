@@ -15,8 +15,6 @@
 #include <numeric>
 
 #include "libraries/decoder/LexiconSeq2SeqDecoder.h"
-#include "libraries/lm/KenLM.h"
-#include "libraries/lm/ZeroLM.h"
 
 namespace w2l {
 
@@ -0,0 +1,186 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <cstring>
+#include <fstream>
+#include <numeric>
+#include <set>
+#include <stdexcept>
+
+#include "libraries/decoder/NBestDump.h"
+
+namespace w2l {
+
+namespace {
+
+/* ===================== Binary format ===================== */
+
+const char kNBestMagic[8] = {'W', '2', 'L', 'N', 'B', 'E', 'S', 'T'};
+const int32_t kNBestVersion = 1;
+
+// Followed by the arrays, in order:
+//  - int64 idOffsets[nUtterances + 1] and char ids[nIdChars]
+//  - int64 hypOffsets[nUtterances + 1]
+//  - int64 offsets[nHypotheses + 1] and int32 words[nWords]
+//  - float64 score, amScore and lmScore[nHypotheses]
+struct NBestDumpHeader {
+  char magic[8];
+  int32_t version;
+  int32_t reserved;
+  int64_t nUtterances;
+  int64_t nHypotheses;
+  int64_t nWords;
+  int64_t nIdChars;
+};
+
+int64_t dataSize(const NBestDumpHeader& header) {
+  return sizeof(NBestDumpHeader) +
+      (2 * header.nUtterances + header.nHypotheses + 3) * sizeof(int64_t) +
+      header.nIdChars + header.nWords * sizeof(int32_t) +
+      3 * header.nHypotheses * sizeof(double);
+}
+
+template <class T>
+void writeArray(std::ofstream& file, const std::vector<T>& values) {
+  file.write(
+      reinterpret_cast<const char*>(values.data()), values.size() * sizeof(T));
+}
+
+template <class T>
+void readArray(std::ifstream& file, std::vector<T>& values, int64_t size) {
+  values.resize(size);
+  file.read(reinterpret_cast<char*>(values.data()), size * sizeof(T));
+}
+
+bool isValidIndex(const std::vector<int64_t>& offsets, int64_t last) {
+  return offsets.front() == 0 && offsets.back() == last &&
+      std::is_sorted(offsets.begin(), offsets.end());
+}
+
+} // namespace
+
+void NBestDump::add(
+    const std::string& id,
+    const NBestList& nbest,
+    bool unique) {
+  std::vector<int> order(nbest.size());
+  std::iota(order.begin(), order.end(), 0);
+  std::stable_sort(order.begin(), order.end(), [&nbest](int a, int b) {
+    return nbest.score[a] > nbest.score[b];
+  });
+
+  std::set<std::vector<int>> seen;
+  std::vector<int> sentence;
+  for (int i : order) {
+    sentence.clear();
+    for (int64_t j = nbest.offsets[i]; j < nbest.offsets[i + 1]; j++) {
+      if (nbest.words[j] >= 0) {
+        sentence.push_back(nbest.words[j]);
+      }
+    }
+    if (unique && !seen.insert(sentence).second) {
+      continue;
+    }
+    words.insert(words.end(), sentence.begin(), sentence.end());
+    offsets.push_back(words.size());
+    score.push_back(nbest.score[i]);
+    amScore.push_back(nbest.amScore[i]);
+    lmScore.push_back(nbest.lmScore[i]);
+  }
+  ids.push_back(id);
+  hypOffsets.push_back(score.size());
+}
+
+void NBestDump::save(const std::string& path) const {
+  std::ofstream file(path, std::ios::binary | std::ios::out);
+  if (!file.is_open()) {
+    throw std::runtime_error(
+        "[NBestDump] Cannot open file for writing: " + path);
+  }
+
+  std::vector<int64_t> idOffsets(1, 0);
+  idOffsets.reserve(ids.size() + 1);
+  for (const auto& id : ids) {
+    idOffsets.push_back(idOffsets.back() + id.size());
+  }
+
+  NBestDumpHeader header;
+  std::memcpy(header.magic, kNBestMagic, sizeof(kNBestMagic));
+  header.version = kNBestVersion;
+  header.reserved = 0;
+  header.nUtterances = ids.size();
+  header.nHypotheses = score.size();
+  header.nWords = words.size();
+  header.nIdChars = idOffsets.back();
+  file.write(reinterpret_cast<const char*>(&header), sizeof(header));
+
+  writeArray(file, idOffsets);
+  for (const auto& id : ids) {
+    file.write(id.data(), id.size());
+  }
+  writeArray(file, hypOffsets);
+  writeArray(file, offsets);
+  writeArray(file, words);
+  writeArray(file, score);
+  writeArray(file, amScore);
+  writeArray(file, lmScore);
+  if (!file.good()) {
+    throw std::runtime_error("[NBestDump] Failed to write n-best to: " + path);
+  }
+}
+
+NBestDump NBestDump::load(const std::string& path) {
+  std::ifstream file(path, std::ios::binary | std::ios::in | std::ios::ate);
+  if (!file.is_open()) {
+    throw std::runtime_error("[NBestDump] Cannot open file: " + path);
+  }
+
+  int64_t size = file.tellg();
+  file.seekg(0);
+  NBestDumpHeader header;
+  if (!file.read(reinterpret_cast<char*>(&header), sizeof(header)) ||
+      std::memcmp(header.magic, kNBestMagic, sizeof(kNBestMagic)) != 0) {
+    throw std::runtime_error("[NBestDump] Invalid n-best file: " + path);
+  }
+  if (header.version != kNBestVersion) {
+    throw std::runtime_error(
+        "[NBestDump] Unsupported n-best format version " +
+        std::to_string(header.version) + " in " + path);
+  }
+  if (header.nUtterances < 0 || header.nHypotheses < 0 || header.nWords < 0 ||
+      header.nIdChars < 0 || size != dataSize(header)) {
+    throw std::runtime_error("[NBestDump] Invalid n-best file: " + path);
+  }
+
+  NBestDump dump;
+  std::vector<int64_t> idOffsets;
+  readArray(file, idOffsets, header.nUtterances + 1);
+  std::string idChars(header.nIdChars, '\0');
+  file.read(&idChars[0], header.nIdChars);
+  readArray(file, dump.hypOffsets, header.nUtterances + 1);
+  readArray(file, dump.offsets, header.nHypotheses + 1);
+  readArray(file, dump.words, header.nWords);
+  readArray(file, dump.score, header.nHypotheses);
+  readArray(file, dump.amScore, header.nHypotheses);
+  readArray(file, dump.lmScore, header.nHypotheses);
+  if (!file || !isValidIndex(idOffsets, header.nIdChars) ||
+      !isValidIndex(dump.hypOffsets, header.nHypotheses) ||
+      !isValidIndex(dump.offsets, header.nWords)) {
+    throw std::runtime_error("[NBestDump] Invalid n-best file: " + path);
+  }
+
+  dump.ids.reserve(header.nUtterances);
+  for (int64_t u = 0; u < header.nUtterances; u++) {
+    dump.ids.push_back(
+        idChars.substr(idOffsets[u], idOffsets[u + 1] - idOffsets[u]));
+  }
+  return dump;
+}
+
+} // namespace w2l
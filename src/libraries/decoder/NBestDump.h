@@ -0,0 +1,69 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+#include "libraries/decoder/NBestList.h"
+
+namespace w2l {
+
+/**
+ * NBestDump gathers the n-best lists of many utterances for a second-pass
+ * rescoring, in the arrays written to disk by `save()`:
+ *  - utterance u is `ids[u]` and owns the hypotheses
+ *    `hypOffsets[u]:hypOffsets[u + 1]`
+ *  - hypothesis i is the word sequence `words[offsets[i]:offsets[i + 1]]`
+ *    (without the -1 of frames ending no word), with scores `score[i]`,
+ *    `amScore[i]` and `lmScore[i]`
+ *
+ * Hypotheses of an utterance are sorted by decreasing score and, unless
+ * asked otherwise, only the best one of each word sequence is kept.
+ *
+ * Sample usage:
+ *
+ *   NBestDump dump;
+ *   for (...) {
+ *     dump.add(id, NBestList(decoder.decode(emissions, T, N)));
+ *   }
+ *   dump.save("dev-other.nbest");
+ */
+struct NBestDump {
+  std::vector<std::string> ids;
+  std::vector<int64_t> hypOffsets;
+  std::vector<int64_t> offsets;
+  std::vector<int> words;
+  std::vector<double> score;
+  std::vector<double> amScore;
+  std::vector<double> lmScore;
+
+  NBestDump() : hypOffsets(1, 0), offsets(1, 0) {}
+
+  /* Number of utterances */
+  int size() const {
+    return ids.size();
+  }
+
+  /* Number of hypotheses, over all the utterances */
+  int64_t nHypotheses() const {
+    return score.size();
+  }
+
+  /* Append the hypotheses of an utterance, one per word sequence if unique */
+  void add(const std::string& id, const NBestList& nbest, bool unique = true);
+
+  /* Write to a binary file, which `load()` reads back */
+  void save(const std::string& path) const;
+
+  static NBestDump load(const std::string& path);
+};
+
+} // namespace w2l
@@ -0,0 +1,61 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <stdexcept>
+#include <string>
+
+#include "libraries/decoder/NBestList.h"
+
+namespace w2l {
+
+NBestList::NBestList(const std::vector<DecodeResult>& results) : offsets(1, 0) {
+  size_t length = 0;
+  for (const auto& result : results) {
+    length += result.tokens.size();
+  }
+  tokens.reserve(length);
+  words.reserve(length);
+  offsets.reserve(results.size() + 1);
+  score.reserve(results.size());
+  amScore.reserve(results.size());
+  lmScore.reserve(results.size());
+  for (const auto& result : results) {
+    add(result);
+  }
+}
+
+void NBestList::add(const DecodeResult& result) {
+  if (result.words.size() != result.tokens.size()) {
+    throw std::invalid_argument(
+        "[NBestList] words and tokens should have the same length");
+  }
+  tokens.insert(tokens.end(), result.tokens.begin(), result.tokens.end());
+  words.insert(words.end(), result.words.begin(), result.words.end());
+  offsets.push_back(tokens.size());
+  score.push_back(result.score);
+  amScore.push_back(result.amScore);
+  lmScore.push_back(result.lmScore);
+}
+
+DecodeResult NBestList::get(int i) const {
+  if (i < 0 || i >= size()) {
+    throw std::out_of_range(
+        "[NBestList] Invalid hypothesis index: " + std::to_string(i));
+  }
+  DecodeResult result;
+  result.score = score[i];
+  result.amScore = amScore[i];
+  result.lmScore = lmScore[i];
+  result.tokens.assign(
+      tokens.begin() + offsets[i], tokens.begin() + offsets[i + 1]);
+  result.words.assign(
+      words.begin() + offsets[i], words.begin() + offsets[i + 1]);
+  return result;
+}
+
+} // namespace w2l
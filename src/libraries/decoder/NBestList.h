@@ -0,0 +1,61 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <vector>
+
+#include "libraries/decoder/Utils.h"
+
+namespace w2l {
+
+/**
+ * NBestList holds the hypotheses of an utterance in contiguous arrays instead
+ * of one DecodeResult each: the tokens and words of hypothesis i are
+ * `tokens[offsets[i]:offsets[i + 1]]` and `words[offsets[i]:offsets[i + 1]]`
+ * (frame-aligned, -1 if there is none), its scores are `score[i]`,
+ * `amScore[i]` and `lmScore[i]`.
+ *
+ * Sample usage:
+ *
+ *   NBestList nbest(decoder.getAllFinalHypothesis());
+ *   for (int i = 0; i < nbest.size(); i++) {
+ *     rescore(nbest.tokens.data() + nbest.offsets[i], nbest.length(i));
+ *   }
+ */
+struct NBestList {
+  std::vector<int> tokens;
+  std::vector<int> words;
+  std::vector<int64_t> offsets;
+  std::vector<double> score;
+  std::vector<double> amScore;
+  std::vector<double> lmScore;
+
+  NBestList() : offsets(1, 0) {}
+
+  explicit NBestList(const std::vector<DecodeResult>& results);
+
+  /* Number of hypotheses */
+  int size() const {
+    return score.size();
+  }
+
+  /* Number of frames of hypothesis i */
+  int length(int i) const {
+    return offsets[i + 1] - offsets[i];
+  }
+
+  /* Append a hypothesis */
+  void add(const DecodeResult& result);
+
+  /* Hypothesis i as a DecodeResult */
+  DecodeResult get(int i) const;
+};
+
+} // namespace w2l
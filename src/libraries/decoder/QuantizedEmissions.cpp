@@ -0,0 +1,123 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <stdexcept>
+
+#include "libraries/decoder/QuantizedEmissions.h"
+
+namespace w2l {
+
+float halfToFloat(uint16_t value) {
+  uint32_t sign = static_cast<uint32_t>(value & 0x8000) << 16;
+  uint32_t exponent = (value >> 10) & 0x1f;
+  uint32_t mantissa = value & 0x3ff;
+  uint32_t bits;
+  if (exponent == 0x1f) {
+    bits = sign | 0x7f800000 | (mantissa << 13); // inf or nan
+  } else if (exponent != 0) {
+    bits = sign | ((exponent + 112) << 23) | (mantissa << 13);
+  } else {
+    // zero or subnormal: mantissa * 2^-24
+    float result = std::ldexp(static_cast<float>(mantissa), -24);
+    return sign ? -result : result;
+  }
+  float result;
+  std::memcpy(&result, &bits, sizeof(result));
+  return result;
+}
+
+QuantizedEmissions::QuantizedEmissions(
+    EmissionsType type,
+    const void* data,
+    int T,
+    int N,
+    const float* scales,
+    const float* offsets)
+    : type_(type),
+      data_(data),
+      T_(T),
+      N_(N),
+      scales_(scales),
+      offsets_(offsets) {
+  if (T_ < 0 || N_ <= 0) {
+    throw std::invalid_argument("[QuantizedEmissions] Invalid T or N");
+  }
+  if (type_ == EmissionsType::INT8 && (!scales_ || !offsets_)) {
+    throw std::invalid_argument(
+        "[QuantizedEmissions] int8 emissions need scales and offsets");
+  }
+}
+
+void QuantizedEmissions::dequantize(int start, int nFrames, float* output)
+    const {
+  if (start < 0 || nFrames < 0 || start + nFrames > T_) {
+    throw std::out_of_range("[QuantizedEmissions] Invalid frame range");
+  }
+  int64_t begin = static_cast<int64_t>(start) * N_;
+  int64_t size = static_cast<int64_t>(nFrames) * N_;
+  switch (type_) {
+    case EmissionsType::FLOAT32: {
+      const float* input = static_cast<const float*>(data_) + begin;
+      std::copy(input, input + size, output);
+      break;
+    }
+    case EmissionsType::FLOAT16: {
+      const uint16_t* input = static_cast<const uint16_t*>(data_) + begin;
+      for (int64_t i = 0; i < size; i++) {
+        output[i] = halfToFloat(input[i]);
+      }
+      break;
+    }
+    case EmissionsType::INT8: {
+      const int8_t* input = static_cast<const int8_t*>(data_) + begin;
+      for (int t = start; t < start + nFrames; t++) {
+        float scale = scales_[t];
+        float offset = offsets_[t];
+        for (int n = 0; n < N_; n++) {
+          *output++ = offset + scale * (*input++ + 128);
+        }
+      }
+      break;
+    }
+  }
+}
+
+void QuantizedEmissions::decodeStep(Decoder& decoder, int chunkSize) const {
+  if (chunkSize <= 0) {
+    throw std::invalid_argument(
+        "[QuantizedEmissions] chunkSize must be positive");
+  }
+  if (type_ == EmissionsType::FLOAT32) {
+    decoder.decodeStep(static_cast<const float*>(data_), T_, N_);
+    return;
+  }
+  chunkSize = std::min(chunkSize, T_);
+  std::vector<float> buffer(static_cast<int64_t>(chunkSize) * N_);
+  for (int start = 0; start < T_; start += chunkSize) {
+    int nFrames = std::min(chunkSize, T_ - start);
+    dequantize(start, nFrames, buffer.data());
+    decoder.decodeStep(buffer.data(), nFrames, N_);
+  }
+}
+
+std::vector<DecodeResult> QuantizedEmissions::decode(
+    Decoder& decoder,
+    int chunkSize) const {
+  if (type_ == EmissionsType::FLOAT32) {
+    return decoder.decode(static_cast<const float*>(data_), T_, N_);
+  }
+  decoder.decodeBegin();
+  decodeStep(decoder, chunkSize);
+  decoder.decodeEnd();
+  return decoder.getAllFinalHypothesis();
+}
+
+} // namespace w2l
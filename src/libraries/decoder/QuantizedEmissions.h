@@ -0,0 +1,76 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <vector>
+
+#include "libraries/decoder/Decoder.h"
+
+namespace w2l {
+
+enum class EmissionsType { FLOAT32 = 0, FLOAT16 = 1, INT8 = 2 };
+
+/**
+ * QuantizedEmissions is a read-only view on [T, N] emissions stored with a
+ * reduced precision, to save disk space and memory bandwidth:
+ *  - FLOAT16: IEEE half-precision floats (as uint16_t bits)
+ *  - INT8: the emission (t, n) is `offsets[t] + scales[t] * (q + 128)`,
+ *    with one scale and offset per frame
+ *
+ * Decoders only read float32 emissions: `decodeStep()` converts them
+ * `chunkSize` frames at a time into a small buffer which stays in cache.
+ *
+ * Sample usage:
+ *
+ *   QuantizedEmissions emissions(EmissionsType::FLOAT16, data, T, N);
+ *   decoder.decodeBegin();
+ *   emissions.decodeStep(decoder);
+ *   decoder.decodeEnd();
+ */
+class QuantizedEmissions {
+ public:
+  QuantizedEmissions(
+      EmissionsType type,
+      const void* data,
+      int T,
+      int N,
+      const float* scales = nullptr,
+      const float* offsets = nullptr);
+
+  int T() const {
+    return T_;
+  }
+
+  int N() const {
+    return N_;
+  }
+
+  /* Convert frames [start, start + nFrames) to float32 */
+  void dequantize(int start, int nFrames, float* output) const;
+
+  /* Feed all the frames to `decoder.decodeStep()`, chunkSize at a time */
+  void decodeStep(Decoder& decoder, int chunkSize = 64) const;
+
+  /* decodeBegin(), decodeStep() and decodeEnd(), as Decoder::decode() */
+  std::vector<DecodeResult> decode(Decoder& decoder, int chunkSize = 64) const;
+
+ private:
+  EmissionsType type_;
+  const void* data_;
+  int T_;
+  int N_;
+  const float* scales_;
+  const float* offsets_;
+};
+
+/* IEEE half-precision to single-precision conversion */
+float halfToFloat(uint16_t value);
+
+} // namespace w2l
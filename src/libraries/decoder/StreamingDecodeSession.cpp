@@ -0,0 +1,102 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <algorithm>
+#include <chrono>
+#include <stdexcept>
+
+#include "libraries/decoder/StreamingDecodeSession.h"
+
+namespace w2l {
+
+namespace {
+
+double secondsSince(std::chrono::steady_clock::time_point start) {
+  return std::chrono::duration<double>(std::chrono::steady_clock::now() - start)
+      .count();
+}
+
+} // namespace
+
+StreamingDecodeSession::StreamingDecodeSession(
+    const DecoderPtr& decoder,
+    int N,
+    int lookBack)
+    : decoder_(decoder), N_(N), lookBack_(lookBack) {
+  if (!decoder_) {
+    throw std::invalid_argument("[StreamingDecodeSession] decoder is null");
+  }
+  if (N_ <= 0 || lookBack_ < 0) {
+    throw std::invalid_argument(
+        "[StreamingDecodeSession] N must be positive and lookBack >= 0");
+  }
+  reset();
+}
+
+void StreamingDecodeSession::reset() {
+  decoder_->decodeBegin();
+  nDecodedFrames_ = 0;
+  nStableFrames_ = 0;
+  finished_ = false;
+}
+
+StreamingDecodeResult StreamingDecodeSession::decodeChunk(
+    const float* emissions,
+    int T) {
+  if (finished_) {
+    throw std::runtime_error(
+        "[StreamingDecodeSession] The stream is finished, call reset()");
+  }
+  auto start = std::chrono::steady_clock::now();
+  StreamingDecodeResult result;
+  decoder_->decodeStep(emissions, T, N_);
+  nDecodedFrames_ += T;
+
+  // The best path up to the pruning point becomes stable. Its last frame is
+  // the first one kept in the buffer by `prune`, so it is left to the
+  // partial results to be returned only once.
+  result.stable = decoder_->getBestHypothesis(lookBack_);
+  decoder_->prune(lookBack_);
+  if (!result.stable.tokens.empty()) {
+    result.stable.words.pop_back();
+    result.stable.tokens.pop_back();
+    nStableFrames_ += result.stable.tokens.size();
+  }
+
+  result.partial = decoder_->getBestHypothesis(0);
+  result.latency = secondsSince(start);
+  return result;
+}
+
+StreamingDecodeResult StreamingDecodeSession::finish() {
+  if (finished_) {
+    throw std::runtime_error(
+        "[StreamingDecodeSession] The stream is finished, call reset()");
+  }
+  auto start = std::chrono::steady_clock::now();
+  StreamingDecodeResult result;
+  decoder_->decodeEnd();
+  finished_ = true;
+
+  // All the frames up to the end of the stream, including the trailing ones
+  // after the last word
+  auto hyps = decoder_->getAllFinalHypothesis();
+  if (!hyps.empty()) {
+    result.stable = *std::max_element(
+        hyps.begin(),
+        hyps.end(),
+        [](const DecodeResult& a, const DecodeResult& b) {
+          return a.score < b.score;
+        });
+  }
+  nStableFrames_ += result.stable.tokens.size();
+  result.latency = secondsSince(start);
+  return result;
+}
+
+} // namespace w2l
@@ -0,0 +1,97 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include "libraries/decoder/Decoder.h"
+
+namespace w2l {
+
+struct StreamingDecodeResult {
+  // Frames of the best path which became stable with the last chunk: they
+  // will not change any more. Concatenating `stable` over all the chunks and
+  // `finish()` gives the transcription of the whole stream.
+  DecodeResult stable;
+
+  // Frames of the current best path following all the stable ones, up to its
+  // last complete word. They can still change with the next chunks.
+  DecodeResult partial;
+
+  // Time spent to process the chunk (seconds)
+  double latency;
+
+  StreamingDecodeResult() : latency(0) {}
+};
+
+/**
+ * StreamingDecodeSession decodes a stream of emissions chunk by chunk with an
+ * online decoder (LexiconDecoder, LexiconFreeDecoder). After each chunk, the
+ * best path is committed up to `lookBack` frames before the last one (or to
+ * the end of the last complete word before that) and the decoder is pruned,
+ * so that memory stays bounded whatever the length of the stream.
+ *
+ * Scores of the results are relative to the last pruning, words and tokens
+ * are frame-aligned as in DecodeResult (-1 if there is no word).
+ *
+ * Sample usage:
+ *
+ *   StreamingDecodeSession session(decoder, N);
+ *   while (stream) {
+ *     auto result = session.decodeChunk(emissions, T);
+ *     // use result.stable, result.partial
+ *   }
+ *   auto result = session.finish(); // remaining frames, all stable
+ */
+class StreamingDecodeSession {
+ public:
+  StreamingDecodeSession(const DecoderPtr& decoder, int N, int lookBack = 50);
+
+  /* Decode a T x N chunk of emissions */
+  StreamingDecodeResult decodeChunk(const float* emissions, int T);
+
+  /* End the stream: all the remaining frames become stable */
+  StreamingDecodeResult finish();
+
+  /* Start a new stream with the same decoder */
+  void reset();
+
+  /* Total number of frames consumed since the beginning of the stream */
+  int nDecodedFrames() const {
+    return nDecodedFrames_;
+  }
+
+  /* Total number of stable frames returned since the beginning of the stream */
+  int nStableFrames() const {
+    return nStableFrames_;
+  }
+
+  /* Number of frames currently held by the decoder */
+  int nFramesInBuffer() const {
+    return decoder_->nDecodedFramesInBuffer();
+  }
+
+  /* Number of tokens N of the emissions */
+  int nTokens() const {
+    return N_;
+  }
+
+  bool isFinished() const {
+    return finished_;
+  }
+
+ private:
+  DecoderPtr decoder_;
+  int N_;
+  int lookBack_;
+
+  int nDecodedFrames_;
+  int nStableFrames_;
+  bool finished_;
+};
+
+} // namespace w2l
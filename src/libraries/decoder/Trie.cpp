@@ -8,9 +8,14 @@
 
 #include <math.h>
 #include <stdlib.h>
+#include <algorithm>
+#include <future>
 #include <iostream>
 #include <limits>
 
+#include "libraries/common/ThreadPool.h"
+#include "libraries/common/WordUtils.h"
+#include "libraries/decoder/FlatTrie.h"
 #include "libraries/decoder/Trie.h"
 
 namespace w2l {
@@ -98,4 +103,83 @@ void Trie::smear(SmearingMode smearMode) {
   }
 }
 
+void Trie::save(const std::string& path) const {
+  FlatTrie(*this).save(path);
+}
+
+TriePtr Trie::load(const std::string& path, bool mmap) {
+  return FlatTrie::load(path, mmap)->toTrie();
+}
+
+TriePtr Trie::fromLexicon(
+    const std::string& lexiconPath,
+    const Dictionary& tokenDict,
+    const Dictionary& wordDict,
+    const LMPtr& lm,
+    int maxReps,
+    SmearingMode smearMode,
+    int nThreads,
+    int rootIdx) {
+  if (nThreads <= 0) {
+    throw std::invalid_argument("[Trie] nThreads must be positive");
+  }
+  auto lexicon = loadWords(lexiconPath);
+  std::vector<const LexiconMap::value_type*> words;
+  words.reserve(lexicon.size());
+  for (const auto& it : lexicon) {
+    words.push_back(&it);
+  }
+
+  /* (1) Score words and map spellings to indices in parallel */
+  int nWords = words.size();
+  std::vector<int> labels(nWords);
+  std::vector<float> scores(nWords, 0);
+  std::vector<std::vector<std::vector<int>>> spellings(nWords);
+  auto processWords = [&](int begin, int end) {
+    LMStatePtr startState = lm ? lm->start(false) : nullptr;
+    for (int i = begin; i < end; i++) {
+      labels[i] = wordDict.getIndex(words[i]->first);
+    }
+    if (lm && lm->hasPrefetch()) {
+      lm->prefetch(
+          std::vector<LMStatePtr>(end - begin, startState),
+          std::vector<int>(labels.begin() + begin, labels.begin() + end));
+    }
+    for (int i = begin; i < end; i++) {
+      if (lm) {
+        scores[i] = lm->score(startState, labels[i]).second;
+      }
+      for (const auto& spelling : words[i]->second) {
+        spellings[i].push_back(tkn2Idx(spelling, tokenDict, maxReps));
+      }
+    }
+  };
+
+  nThreads = std::max(1, std::min(nThreads, nWords));
+  if (nThreads == 1) {
+    processWords(0, nWords);
+  } else {
+    ThreadPool threadPool(nThreads);
+    std::vector<std::future<void>> futures;
+    int chunkSize = (nWords + nThreads - 1) / nThreads;
+    for (int begin = 0; begin < nWords; begin += chunkSize) {
+      futures.emplace_back(threadPool.enqueue(
+          processWords, begin, std::min(begin + chunkSize, nWords)));
+    }
+    for (auto& future : futures) {
+      future.get();
+    }
+  }
+
+  /* (2) Insert and smear */
+  auto trie = std::make_shared<Trie>(tokenDict.indexSize(), rootIdx);
+  for (int i = 0; i < nWords; i++) {
+    for (const auto& spelling : spellings[i]) {
+      trie->insert(spelling, labels[i], scores[i]);
+    }
+  }
+  trie->smear(smearMode);
+  return trie;
+}
+
 } // namespace w2l
@@ -8,9 +8,13 @@
 
 #pragma once
 #include <memory>
+#include <string>
 #include <unordered_map>
 #include <vector>
 
+#include "libraries/common/Dictionary.h"
+#include "libraries/lm/LM.h"
+
 namespace w2l {
 
 constexpr int kTrieMaxLabel = 6;
@@ -63,9 +67,29 @@ class Trie {
   Trie(int maxChildren, int rootIdx)
       : root_(std::make_shared<TrieNode>(rootIdx)), maxChildren_(maxChildren) {}
 
+  using Node = TrieNode;
+
   /* Return the root node pointer */
   const TrieNode* getRoot() const;
 
+  /* Return the child of `node` with index `idx`, nullptr if there is none */
+  const TrieNode* getChild(const TrieNode* node, int idx) const {
+    auto iter = node->children.find(idx);
+    return iter == node->children.end() ? nullptr : iter->second.get();
+  }
+
+  bool hasChildren(const TrieNode* node) const {
+    return !node->children.empty();
+  }
+
+  const std::vector<int>& getLabels(const TrieNode* node) const {
+    return node->labels;
+  }
+
+  int maxChildren() const {
+    return maxChildren_;
+  }
+
   /* Insert a token into trie with label */
   TrieNodePtr insert(const std::vector<int>& indices, int label, float score);
 
@@ -82,6 +106,41 @@ class Trie {
    */
   void smear(const SmearingMode smear_mode);
 
+  /**
+   * Save the trie in a compact flat binary format: nodes are stored in
+   * breadth-first order with the children of each node contiguous and sorted
+   * by index, followed by the labels and scores of all the nodes. Node scores
+   * are saved as they are, so a smeared trie is loaded already smeared.
+   * The file can also be loaded as a FlatTrie.
+   */
+  void save(const std::string& path) const;
+
+  /**
+   * Load a trie saved with `save()`. If `mmap` is true the file is mapped in
+   * memory and parsed in place, otherwise it is read into a buffer first.
+   */
+  static std::shared_ptr<Trie> load(const std::string& path, bool mmap = true);
+
+  /**
+   * Build and smear a trie from a lexicon file (one "word token token ..."
+   * spelling per line). Spellings are mapped to indices with `tokenDict` and
+   * `maxReps` replabels, and each word is scored with the unigram score of
+   * `lm` (0 if `lm` is null). The file is read by the calling thread, then
+   * the spellings are mapped and the words scored with `nThreads` threads,
+   * each one scoring from its own LM start state, so the LM must support
+   * concurrent calls if `nThreads` > 1 (KenLM does). Insertion and smearing
+   * are sequential.
+   */
+  static std::shared_ptr<Trie> fromLexicon(
+      const std::string& lexiconPath,
+      const Dictionary& tokenDict,
+      const Dictionary& wordDict,
+      const LMPtr& lm,
+      int maxReps,
+      SmearingMode smearMode,
+      int nThreads = 1,
+      int rootIdx = -1);
+
  private:
   TrieNodePtr root_;
   int maxChildren_; // The maximum number of childern for each node. It is
@@ -36,6 +36,15 @@ struct DecoderOptions {
   double blankScore; // Score for blank token
   bool logAdd; // If or not use logadd when merging hypothesis
   CriterionType criterionType; // CTC or ASG
+  // CTC only: frames whose blank posterior is above it only extend the
+  // hypotheses with blank, skipping the beam expansion (1 to disable)
+  double blankSkipThreshold;
+  // LexiconDecoder only: beamSizeToken and beamThreshold of a frame are
+  // scaled by a ratio growing linearly with the entropy of its posteriors,
+  // from adaptiveBeamMinRatio (entropy 0) to 1 (entropy above
+  // adaptiveBeamEntropy, in nats). A min ratio of 1 disables it.
+  double adaptiveBeamMinRatio;
+  double adaptiveBeamEntropy;
 
   DecoderOptions(
       const int beamSize,
@@ -56,10 +65,18 @@ struct DecoderOptions {
         unkScore(unkScore),
         silScore(silScore),
         eosScore(eosScore),
+        blankScore(0),
         logAdd(logAdd),
-        criterionType(criterionType) {}
-
-  DecoderOptions() {}
+        criterionType(criterionType),
+        blankSkipThreshold(1),
+        adaptiveBeamMinRatio(1),
+        adaptiveBeamEntropy(1) {}
+
+  DecoderOptions()
+      : blankScore(0),
+        blankSkipThreshold(1),
+        adaptiveBeamMinRatio(1),
+        adaptiveBeamEntropy(1) {}
 };
 
 struct DecodeResult {
@@ -0,0 +1,124 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include "BatchFeatures.h"
+
+#include <algorithm>
+#include <atomic>
+#include <exception>
+#include <numeric>
+#include <stdexcept>
+
+namespace w2l {
+
+BatchFeatures::BatchFeatures(const FeatureFactory& featureFactory)
+    : featureFactory_(featureFactory) {
+  extractors_.emplace_back(featureFactory_());
+  featParams_ = extractors_[0]->getFeatureParams();
+  // a signal of one frame
+  featureSize_ = extractors_[0]->outputSize(featParams_.numFrameSizeSamples());
+}
+
+std::vector<float> BatchFeatures::apply(
+    const std::vector<const float*>& inputs,
+    const std::vector<int64_t>& inputSizes,
+    int nThreads,
+    std::vector<int64_t>& frameOffsets) {
+  if (inputs.size() != inputSizes.size()) {
+    throw std::invalid_argument(
+        "BatchFeatures: inputs and inputSizes should have the same size");
+  }
+  if (nThreads <= 0) {
+    throw std::invalid_argument("BatchFeatures: nThreads must be positive");
+  }
+  int nSignals = inputs.size();
+  frameOffsets.assign(nSignals + 1, 0);
+  for (int i = 0; i < nSignals; i++) {
+    if (inputSizes[i] < 0) {
+      throw std::invalid_argument("BatchFeatures: negative input size");
+    }
+    frameOffsets[i + 1] =
+        frameOffsets[i] + featParams_.numFrames(inputSizes[i]);
+  }
+  std::vector<float> features(frameOffsets.back() * featureSize_);
+  if (nSignals == 0) {
+    return features;
+  }
+  nThreads = std::min(nThreads, nSignals);
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  while (extractors_.size() < static_cast<size_t>(nThreads)) {
+    extractors_.emplace_back(featureFactory_());
+  }
+  if (!threadPool_ || threadPool_->size() < static_cast<size_t>(nThreads)) {
+    threadPool_.reset(new ThreadPool(nThreads));
+  }
+
+  // Longest signals first, so that the threads finish at the same time
+  std::vector<int> order(nSignals);
+  std::iota(order.begin(), order.end(), 0);
+  std::stable_sort(order.begin(), order.end(), [&inputSizes](int a, int b) {
+    return inputSizes[a] > inputSizes[b];
+  });
+
+  // Threads pick the next signal until the batch is exhausted, and write its
+  // features at their offset
+  std::atomic<int> next(0);
+  int64_t featSz = featureSize_;
+  auto runExtractor = [&inputs,
+                       &inputSizes,
+                       &frameOffsets,
+                       &features,
+                       &order,
+                       &next,
+                       featSz,
+                       nSignals](PowerSpectrum* extractor) {
+    int k;
+    while ((k = next++) < nSignals) {
+      int i = order[k];
+      auto curFeat = extractor->apply(inputs[i], inputSizes[i]);
+      if (curFeat.size() != (frameOffsets[i + 1] - frameOffsets[i]) * featSz) {
+        throw std::logic_error("BatchFeatures: apply() returned wrong size");
+      }
+      std::copy(
+          curFeat.begin(),
+          curFeat.end(),
+          features.begin() + frameOffsets[i] * featSz);
+    }
+  };
+
+  std::vector<std::future<void>> futures;
+  for (int i = 0; i < nThreads; i++) {
+    futures.emplace_back(
+        threadPool_->enqueue(runExtractor, extractors_[i].get()));
+  }
+
+  // All the tasks must be finished before leaving: they refer to local data
+  std::exception_ptr exception;
+  for (auto& future : futures) {
+    try {
+      future.get();
+    } catch (...) {
+      if (!exception) {
+        exception = std::current_exception();
+        next = nSignals; // stop other threads
+      }
+    }
+  }
+  if (exception) {
+    std::rethrow_exception(exception);
+  }
+  return features;
+}
+
+int BatchFeatures::nExtractors() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return extractors_.size();
+}
+
+} // namespace w2l
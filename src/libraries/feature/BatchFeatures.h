@@ -0,0 +1,77 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <vector>
+
+#include "PowerSpectrum.h"
+#include "libraries/common/ThreadPool.h"
+
+namespace w2l {
+
+using FeatureFactory = std::function<std::shared_ptr<PowerSpectrum>()>;
+
+/**
+ * BatchFeatures computes the features of a batch of signals of various
+ * lengths with a pool of native threads. Each thread owns its own extractor
+ * (PowerSpectrum, Mfsc or Mfcc) created with `featureFactory`, and thus its
+ * own FFT buffers, while the FFTW plans and the tables are shared by all the
+ * extractors of the process (see FftPlan): threads never wait for each other.
+ * The features of all the signals are written to a single array. Concurrent
+ * calls to apply() are serialized, as they share the extractors and threads
+ * of the pool.
+ *
+ * Sample usage:
+ *
+ *   BatchFeatures batchFeatures(
+ *       [&]() { return std::make_shared<Mfcc>(params); });
+ *   std::vector<int64_t> frameOffsets;
+ *   auto features =
+ *       batchFeatures.apply(inputs, inputSizes, nThreads, frameOffsets);
+ *   // frames frameOffsets[i] to frameOffsets[i + 1] - 1 of `features` (of
+ *   // featureSize() values each) are the features of signal i
+ */
+class BatchFeatures {
+ public:
+  explicit BatchFeatures(const FeatureFactory& featureFactory);
+
+  /**
+   * Features of `inputs[i]` (inputSizes[i] samples) for all i with `nThreads`
+   * threads, concatenated in the input order (Col Major : FEAT X FRAMES).
+   * `frameOffsets` is set to the inputs.size() + 1 offsets of the signals
+   * in the features, in frames.
+   */
+  std::vector<float> apply(
+      const std::vector<const float*>& inputs,
+      const std::vector<int64_t>& inputSizes,
+      int nThreads,
+      std::vector<int64_t>& frameOffsets);
+
+  /* Number of features of each frame */
+  int64_t featureSize() const {
+    return featureSize_;
+  }
+
+  /* Number of extractors instantiated so far (one per thread) */
+  int nExtractors() const;
+
+ private:
+  FeatureFactory featureFactory_;
+  std::vector<std::shared_ptr<PowerSpectrum>> extractors_;
+  std::unique_ptr<ThreadPool> threadPool_;
+  // Guards extractors_ and threadPool_, held for a whole apply()
+  mutable std::mutex mutex_;
+  FeatureParams featParams_;
+  int64_t featureSize_;
+};
+
+} // namespace w2l
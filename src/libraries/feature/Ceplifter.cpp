@@ -12,15 +12,23 @@
 #include <cstddef>
 #include <numeric>
 #include <stdexcept>
+#include <utility>
+
+#include "SpeechUtils.h"
 
 namespace w2l {
 
 Ceplifter::Ceplifter(int numfilters, int lifterparam)
-    : numFilters_(numfilters), lifterParam_(lifterparam), coefs_(numFilters_) {
-  std::iota(coefs_.begin(), coefs_.end(), 0.0);
-  for (auto& c : coefs_) {
-    c = 1.0 + 0.5 * lifterParam_ * std::sin(M_PI * c / lifterParam_);
-  }
+    : numFilters_(numfilters), lifterParam_(lifterparam) {
+  coefs_ = sharedTable<Ceplifter>(
+      std::make_pair(numfilters, lifterparam), [numfilters, lifterparam]() {
+        std::vector<float> coefs(numfilters);
+        std::iota(coefs.begin(), coefs.end(), 0.0);
+        for (auto& c : coefs) {
+          c = 1.0 + 0.5 * lifterparam * std::sin(M_PI * c / lifterparam);
+        }
+        return coefs;
+      });
 }
 
 std::vector<float> Ceplifter::apply(const std::vector<float>& input) const {
@@ -34,9 +42,10 @@ void Ceplifter::applyInPlace(std::vector<float>& input) const {
     throw std::invalid_argument(
         "Ceplifter: input size is not divisible by numFilters");
   }
+  const auto& coefs = *coefs_;
   size_t n = 0;
   for (auto& in : input) {
-    in *= coefs_[n++];
+    in *= coefs[n++];
     if (n == numFilters_) {
       n = 0;
     }
@@ -9,6 +9,7 @@
 #pragma once
 
 #include <stdint.h>
+#include <memory>
 #include <vector>
 
 namespace w2l {
@@ -27,6 +28,7 @@ class Ceplifter {
  private:
   int numFilters_; // number of filterbank channels
   int lifterParam_; // liftering parameter
-  std::vector<float> coefs_; // coefficients to scale cepstral coefficients
+  std::shared_ptr<const std::vector<float>>
+      coefs_; // coefficients to scale cepstral coefficients
 };
 } // namespace w2l
@@ -11,24 +11,31 @@
 #include <cmath>
 #include <cstddef>
 #include <numeric>
+#include <utility>
 
 #include "SpeechUtils.h"
 
 namespace w2l {
 
 Dct::Dct(int numfilters, int numceps)
-    : numFilters_(numfilters),
-      numCeps_(numceps),
-      dctMat_(numfilters * numceps) {
-  for (size_t f = 0; f < numFilters_; ++f) {
-    for (size_t c = 0; c < numCeps_; ++c) {
-      dctMat_[f * numCeps_ + c] = std::sqrt(2.0 / numFilters_) *
-          std::cos(M_PI * c * (f + 0.5) / numFilters_);
-    }
-  }
+    : numFilters_(numfilters), numCeps_(numceps) {
+  dctMat_ = sharedTable<Dct>(
+      std::make_pair(numfilters, numceps), [numfilters, numceps]() {
+        std::vector<float> dctMat(numfilters * numceps);
+        for (size_t f = 0; f < numfilters; ++f) {
+          for (size_t c = 0; c < numceps; ++c) {
+            dctMat[f * numceps + c] = std::sqrt(2.0 / numfilters) *
+                std::cos(M_PI * c * (f + 0.5) / numfilters);
+          }
+        }
+        return dctMat;
+      });
 }
 
-std::vector<float> Dct::apply(const std::vector<float>& input) const {
-  return cblasGemm(input, dctMat_, numCeps_, numFilters_);
+std::vector<float> Dct::apply(
+    const std::vector<float>& input,
+    bool frameIndependent /* = false */) const {
+  return frameIndependent ? rowGemm(input, *dctMat_, numCeps_, numFilters_)
+                          : cblasGemm(input, *dctMat_, numCeps_, numFilters_);
 }
 } // namespace w2l
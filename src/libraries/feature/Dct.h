@@ -9,6 +9,7 @@
 #pragma once
 
 #include <stdint.h>
+#include <memory>
 #include <vector>
 
 namespace w2l {
@@ -21,11 +22,14 @@ class Dct {
  public:
   Dct(int numfilters, int numceps);
 
-  std::vector<float> apply(const std::vector<float>& input) const;
+  // frameIndependent - fixed order product (rowGemm), see Mfsc
+  std::vector<float> apply(
+      const std::vector<float>& input,
+      bool frameIndependent = false) const;
 
  private:
   int numFilters_; // Number of filterbank channels
   int numCeps_; // Number of cepstral coefficients
-  std::vector<float> dctMat_; // Dct matrix
+  std::shared_ptr<const std::vector<float>> dctMat_; // Dct matrix
 };
 } // namespace w2l
@@ -0,0 +1,87 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include "FftPlan.h"
+
+#include <mutex>
+#include <stdexcept>
+#include <unordered_map>
+
+namespace w2l {
+
+namespace {
+
+// Only the execution of the plans is thread-safe in FFTW: the planner and the
+// wisdom are guarded by this mutex. Never destroyed, as the cached plans.
+std::mutex& plannerMutex() {
+  static auto mutex = new std::mutex();
+  return *mutex;
+}
+
+} // namespace
+
+FftPlan::FftPlan(int nFft) : nFft_(nFft) {
+  if (nFft <= 0) {
+    throw std::invalid_argument("FftPlan: nFft must be positive");
+  }
+  // FFTW_MEASURE overwrites the buffers while planning
+  auto in = allocFftBuffer(nFft);
+  auto out = allocFftBuffer(2 * (nFft / 2 + 1));
+  std::lock_guard<std::mutex> lock(plannerMutex());
+  plan_ = fftw_plan_dft_r2c_1d(
+      nFft, in.get(), reinterpret_cast<fftw_complex*>(out.get()), FFTW_MEASURE);
+  if (!plan_) {
+    throw std::runtime_error("FftPlan: could not create the FFTW plan");
+  }
+}
+
+FftPlan::~FftPlan() {
+  std::lock_guard<std::mutex> lock(plannerMutex());
+  fftw_destroy_plan(plan_);
+}
+
+std::shared_ptr<const FftPlan> FftPlan::get(int nFft) {
+  // Never destroyed, not to run FFTW at exit after its own static data
+  static auto mutex = new std::mutex();
+  static auto plans =
+      new std::unordered_map<int, std::shared_ptr<const FftPlan>>();
+  std::lock_guard<std::mutex> lock(*mutex);
+  auto& plan = (*plans)[nFft];
+  if (!plan) {
+    plan = std::make_shared<const FftPlan>(nFft);
+  }
+  return plan;
+}
+
+void FftPlan::execute(double* in, double* out) const {
+  fftw_execute_dft_r2c(plan_, in, reinterpret_cast<fftw_complex*>(out));
+}
+
+int FftPlan::size() const {
+  return nFft_;
+}
+
+FftBuffer allocFftBuffer(size_t size) {
+  auto buffer = fftw_alloc_real(size);
+  if (!buffer) {
+    throw std::bad_alloc();
+  }
+  return FftBuffer(buffer);
+}
+
+bool importFftWisdom(const std::string& path) {
+  std::lock_guard<std::mutex> lock(plannerMutex());
+  return fftw_import_wisdom_from_filename(path.c_str()) != 0;
+}
+
+bool exportFftWisdom(const std::string& path) {
+  std::lock_guard<std::mutex> lock(plannerMutex());
+  return fftw_export_wisdom_to_filename(path.c_str()) != 0;
+}
+
+} // namespace w2l
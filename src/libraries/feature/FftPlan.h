@@ -0,0 +1,65 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <memory>
+#include <string>
+
+#include <fftw3.h>
+
+namespace w2l {
+
+// FFTW plan of the real-to-complex DFT of nFft points (FFTW_MEASURE). A plan
+// is only created once per size and process, see get(), and is shared by all
+// the feature extractors: execute() can be called from several threads at
+// once, on buffers allocated with allocFftBuffer().
+
+class FftPlan {
+ public:
+  explicit FftPlan(int nFft);
+
+  ~FftPlan();
+
+  FftPlan(const FftPlan&) = delete;
+  FftPlan& operator=(const FftPlan&) = delete;
+
+  // Returns the plan of nFft points, created at the first call
+  static std::shared_ptr<const FftPlan> get(int nFft);
+
+  // in - nFft real values, out - nFft / 2 + 1 complex values (interleaved)
+  void execute(double* in, double* out) const;
+
+  int size() const;
+
+ private:
+  int nFft_;
+  fftw_plan plan_;
+};
+
+struct FftBufferDeleter {
+  void operator()(double* buffer) const {
+    fftw_free(buffer);
+  }
+};
+
+using FftBuffer = std::unique_ptr<double[], FftBufferDeleter>;
+
+// Buffer of size doubles, aligned as the buffers of the plans
+FftBuffer allocFftBuffer(size_t size);
+
+// FFTW wisdom: the plans measured by previous runs. Importing it before
+// creating the extractors makes their plans immediate, exporting it after
+// saves the plans of this run (with the imported ones). Both return false if
+// the file could not be read or written.
+
+bool importFftWisdom(const std::string& path);
+
+bool exportFftWisdom(const std::string& path);
+
+} // namespace w2l
@@ -14,16 +14,24 @@
 
 namespace w2l {
 
-Mfcc::Mfcc(const FeatureParams& params)
-    : Mfsc(params),
+Mfcc::Mfcc(const FeatureParams& params, bool frameIndependent /* = false */)
+    : Mfsc(params, frameIndependent),
       dct_(params.numFilterbankChans, params.numCepstralCoeffs),
       ceplifter_(params.numCepstralCoeffs, params.lifterParam),
       derivatives_(params.deltaWindow, params.accWindow) {
   validateMfccParams();
 }
 
-std::vector<float> Mfcc::apply(const std::vector<float>& input) {
-  auto frames = frameSignal(input, this->featParams_);
+std::vector<float> Mfcc::apply(const float* input, int64_t inputSz) {
+  auto cep = Mfcc::staticFeatures(input, inputSz);
+  if (cep.empty()) {
+    return {};
+  }
+  return derivatives_.apply(cep, Mfcc::staticFeatureSize());
+}
+
+std::vector<float> Mfcc::staticFeatures(const float* input, int64_t inputSz) {
+  auto frames = frameSignal(input, inputSz, this->featParams_);
   if (frames.empty()) {
     return {};
   }
@@ -40,7 +48,7 @@ std::vector<float> Mfcc::apply(const std::vector<float>& input) {
     }
   }
   auto mfscfeat = this->mfscImpl(frames);
-  auto cep = dct_.apply(mfscfeat);
+  auto cep = dct_.apply(mfscfeat, frameIndependent_);
   ceplifter_.applyInPlace(cep);
 
   auto nFeat = this->featParams_.numCepstralCoeffs;
@@ -57,7 +65,11 @@ std::vector<float> Mfcc::apply(const std::vector<float>& input) {
       cep[f * nFeat] = energy[f];
     }
   }
-  return derivatives_.apply(cep, nFeat);
+  return cep;
+}
+
+int64_t Mfcc::staticFeatureSize() const {
+  return this->featParams_.numCepstralCoeffs;
 }
 
 int Mfcc::outputSize(int inputSz) {
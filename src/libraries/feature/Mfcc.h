@@ -52,13 +52,24 @@ namespace w2l {
 
 class Mfcc : public Mfsc {
  public:
-  explicit Mfcc(const FeatureParams& params);
+  // frameIndependent - filterbank and DCT in a fixed order, see Mfsc
+  explicit Mfcc(const FeatureParams& params, bool frameIndependent = false);
 
   virtual ~Mfcc() {}
 
   // input - input speech signal (T)
   // Returns - MFCC features (Col Major : FEAT X FRAMESZ)
-  std::vector<float> apply(const std::vector<float>& input) override;
+  std::vector<float> apply(const float* input, int64_t inputSz) override;
+  using Mfsc::apply;
+
+  // input - input speech signal (T)
+  // Returns - MFCC features without their derivatives
+  // (Col Major : FEAT X FRAMESZ), each frame only depends on its own samples
+  std::vector<float> staticFeatures(const float* input, int64_t inputSz)
+      override;
+
+  // Number of features of each frame returned by staticFeatures()
+  int64_t staticFeatureSize() const override;
 
   int outputSize(int inputSz) override;
 
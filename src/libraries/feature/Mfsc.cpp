@@ -16,8 +16,9 @@
 
 namespace w2l {
 
-Mfsc::Mfsc(const FeatureParams& params)
+Mfsc::Mfsc(const FeatureParams& params, bool frameIndependent /* = false */)
     : PowerSpectrum(params),
+      frameIndependent_(frameIndependent),
       triFltBank_(
           params.numFilterbankChans,
           params.filterFreqResponseLen(),
@@ -29,8 +30,17 @@ Mfsc::Mfsc(const FeatureParams& params)
   validateMfscParams();
 }
 
-std::vector<float> Mfsc::apply(const std::vector<float>& input) {
-  auto frames = frameSignal(input, this->featParams_);
+std::vector<float> Mfsc::apply(const float* input, int64_t inputSz) {
+  auto mfscFeat = Mfsc::staticFeatures(input, inputSz);
+  if (mfscFeat.empty()) {
+    return {};
+  }
+  // Derivatives will not be computed if windowsize < 0
+  return derivatives_.apply(mfscFeat, Mfsc::staticFeatureSize());
+}
+
+std::vector<float> Mfsc::staticFeatures(const float* input, int64_t inputSz) {
+  auto frames = frameSignal(input, inputSz, this->featParams_);
   if (frames.empty()) {
     return {};
   }
@@ -70,10 +80,13 @@ std::vector<float> Mfsc::apply(const std::vector<float>& input) {
           newMfscFeat.data() + start + f + 1);
     }
     std::swap(mfscFeat, newMfscFeat);
-    ++numFeat;
   }
-  // Derivatives will not be computed if windowsize < 0
-  return derivatives_.apply(mfscFeat, numFeat);
+  return mfscFeat;
+}
+
+int64_t Mfsc::staticFeatureSize() const {
+  return this->featParams_.numFilterbankChans +
+      (this->featParams_.useEnergy ? 1 : 0);
 }
 
 std::vector<float> Mfsc::mfscImpl(std::vector<float>& frames) {
@@ -85,7 +98,8 @@ std::vector<float> Mfsc::mfscImpl(std::vector<float>& frames) {
         powspectrum.begin(),
         [](float x) { return x * x; });
   }
-  auto triflt = triFltBank_.apply(powspectrum, this->featParams_.melFloor);
+  auto triflt = triFltBank_.apply(
+      powspectrum, this->featParams_.melFloor, frameIndependent_);
   std::transform(triflt.begin(), triflt.end(), triflt.begin(), [](float x) {
     return std::log(x);
   });
@@ -17,20 +17,43 @@
 namespace w2l {
 
 // Computes MFSC features for a speech signal.
+//
+// If frameIndependent, the filterbank is applied frame by frame in a fixed
+// order (rowGemm), so that the features of a frame are the same whether it is
+// computed alone or with others, as StreamingFeatures needs. The default
+// cblas product is faster, and its sums depend on the number of frames (the
+// features differ by a few ulps).
 
 class Mfsc : public PowerSpectrum {
  public:
-  explicit Mfsc(const FeatureParams& params);
+  explicit Mfsc(const FeatureParams& params, bool frameIndependent = false);
 
   virtual ~Mfsc() {}
 
   // input - input speech signal (T)
   // Returns - MFSC feature (Col Major : FEAT X FRAMESZ)
-  std::vector<float> apply(const std::vector<float>& input) override;
+  std::vector<float> apply(const float* input, int64_t inputSz) override;
+  using PowerSpectrum::apply;
+
+  // input - input speech signal (T)
+  // Returns - MFSC features without their derivatives
+  // (Col Major : FEAT X FRAMESZ), each frame only depends on its own samples
+  virtual std::vector<float> staticFeatures(
+      const float* input,
+      int64_t inputSz);
+
+  // Number of features of each frame returned by staticFeatures()
+  virtual int64_t staticFeatureSize() const;
 
   int outputSize(int inputSz) override;
 
+  bool frameIndependent() const {
+    return frameIndependent_;
+  }
+
  protected:
+  bool frameIndependent_;
+
   // Helper function which takes input as signal after dividing the signal into
   // frames. Main purpose of this function is to reuse it in MFCC code
   std::vector<float> mfscImpl(std::vector<float>& frames);
@@ -23,14 +23,18 @@ PowerSpectrum::PowerSpectrum(const FeatureParams& params)
       windowing_(params.numFrameSizeSamples(), params.windowType) {
   validatePowSpecParams();
   auto nFFt = featParams_.nFft();
-  inFftBuf_.resize(nFFt, 0.0);
-  outFftBuf_.resize(2 * nFFt);
-  fftPlan_ = fftw_plan_dft_r2c_1d(
-      nFFt, inFftBuf_.data(), (fftw_complex*)outFftBuf_.data(), FFTW_MEASURE);
+  fftPlan_ = FftPlan::get(nFFt);
+  inFftBuf_ = allocFftBuffer(nFFt);
+  outFftBuf_ = allocFftBuffer(2 * nFFt);
+  std::fill(inFftBuf_.get(), inFftBuf_.get() + nFFt, 0.0);
 }
 
 std::vector<float> PowerSpectrum::apply(const std::vector<float>& input) {
-  auto frames = frameSignal(input, featParams_);
+  return apply(input.data(), input.size());
+}
+
+std::vector<float> PowerSpectrum::apply(const float* input, int64_t inputSz) {
+  auto frames = frameSignal(input, inputSz, featParams_);
   if (frames.empty()) {
     return {};
   }
@@ -64,9 +68,9 @@ std::vector<float> PowerSpectrum::powSpectrumImpl(std::vector<float>& frames) {
     auto begin = frames.data() + f * nSamples;
     {
       std::lock_guard<std::mutex> lock(fftMutex_);
-      std::copy(begin, begin + nSamples, inFftBuf_.data());
-      std::fill(outFftBuf_.begin(), outFftBuf_.end(), 0.0);
-      fftw_execute(fftPlan_);
+      std::copy(begin, begin + nSamples, inFftBuf_.get());
+      std::fill(outFftBuf_.get(), outFftBuf_.get() + 2 * nFft, 0.0);
+      fftPlan_->execute(inFftBuf_.get(), outFftBuf_.get());
 
       // Copy stuff to the redundant part
       for (size_t i = K; i < nFft; ++i) {
@@ -87,21 +91,24 @@ std::vector<float> PowerSpectrum::powSpectrumImpl(std::vector<float>& frames) {
 std::vector<float> PowerSpectrum::batchApply(
     const std::vector<float>& input,
     int batchSz) {
+  return batchApply(input.data(), input.size(), batchSz);
+}
+
+std::vector<float>
+PowerSpectrum::batchApply(const float* input, int64_t inputSz, int batchSz) {
   if (batchSz <= 0) {
     throw std::invalid_argument("PowerSpectrum: negative batchSz");
-  } else if (input.size() % batchSz != 0) {
+  } else if (inputSz % batchSz != 0) {
     throw std::invalid_argument(
         "PowerSpectrum: input size is not divisible by batchSz");
   }
-  int N = input.size() / batchSz;
+  int N = inputSz / batchSz;
   int outputSz = outputSize(N);
   std::vector<float> feat(outputSz * batchSz);
 
 #pragma omp parallel for num_threads(batchSz)
   for (int b = 0; b < batchSz; ++b) {
-    auto start = input.begin() + b * N;
-    std::vector<float> inputBuf(start, start + N);
-    auto curFeat = apply(inputBuf);
+    auto curFeat = apply(input + b * N, N);
     if (outputSz != curFeat.size()) {
       throw std::logic_error("PowerSpectrum: apply() returned wrong size");
     }
@@ -133,8 +140,4 @@ void PowerSpectrum::validatePowSpecParams() const {
   }
 }
 
-PowerSpectrum::~PowerSpectrum() {
-  fftw_destroy_plan(fftPlan_);
-}
-
 } // namespace w2l
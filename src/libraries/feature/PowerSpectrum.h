@@ -8,12 +8,12 @@
 
 #pragma once
 
+#include <memory>
 #include <mutex>
 
-#include <fftw3.h>
-
 #include "Dither.h"
 #include "FeatureParams.h"
+#include "FftPlan.h"
 #include "PreEmphasis.h"
 #include "Windowing.h"
 
@@ -25,16 +25,23 @@ class PowerSpectrum {
  public:
   explicit PowerSpectrum(const FeatureParams& params);
 
-  virtual ~PowerSpectrum();
+  virtual ~PowerSpectrum() = default;
 
   // input - input speech signal (T)
   // Returns - Power spectrum (Col Major : FEAT X FRAMESZ)
-  virtual std::vector<float> apply(const std::vector<float>& input);
+  std::vector<float> apply(const std::vector<float>& input);
+
+  // Same as above, input - pointer to the inputSz samples of the signal
+  virtual std::vector<float> apply(const float* input, int64_t inputSz);
 
   // input - input speech signal (Col Major : T X BATCHSZ)
   // Returns - Output features (Col Major : FEAT X FRAMESZ X BATCHSZ)
   std::vector<float> batchApply(const std::vector<float>& input, int batchSz);
 
+  // Same as above, input - pointer to the inputSz samples of the signals
+  std::vector<float>
+  batchApply(const float* input, int64_t inputSz, int batchSz);
+
   virtual int outputSize(int inputSz);
 
   FeatureParams getFeatureParams() const;
@@ -54,8 +61,8 @@ class PowerSpectrum {
   PreEmphasis preEmphasis_;
   Windowing windowing_;
 
-  fftw_plan fftPlan_;
-  std::vector<double> inFftBuf_, outFftBuf_;
+  std::shared_ptr<const FftPlan> fftPlan_;
+  FftBuffer inFftBuf_, outFftBuf_;
   std::mutex fftMutex_;
 };
 } // namespace w2l
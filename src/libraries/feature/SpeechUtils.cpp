@@ -25,9 +25,14 @@ namespace w2l {
 std::vector<float> frameSignal(
     const std::vector<float>& input,
     const FeatureParams& params) {
+  return frameSignal(input.data(), input.size(), params);
+}
+
+std::vector<float>
+frameSignal(const float* input, int64_t inputSz, const FeatureParams& params) {
   auto frameSize = params.numFrameSizeSamples();
   auto frameStride = params.numFrameStrideSamples();
-  int numframes = params.numFrames(input.size());
+  int numframes = params.numFrames(inputSz);
   // HTK: Values coming out of rasta treat samples as integers,
   // not range -1..1, hence scale up here to match (approx)
   float scale = 32768.0;
@@ -85,4 +90,30 @@ std::vector<float> cblasGemm(
 
   return matC;
 };
+
+std::vector<float> rowGemm(
+    const std::vector<float>& matA,
+    const std::vector<float>& matB,
+    int n,
+    int k) {
+  if (n <= 0 || k <= 0 || matA.empty() || (matA.size() % k != 0) ||
+      (matB.size() != n * k)) {
+    throw std::invalid_argument("rowGemm: invalid arguments");
+  }
+
+  int m = matA.size() / k;
+
+  std::vector<float> matC(m * n, 0.0);
+  for (size_t i = 0; i < m; ++i) {
+    float* rowC = matC.data() + i * n;
+    for (size_t l = 0; l < k; ++l) {
+      float a = matA[i * k + l];
+      const float* rowB = matB.data() + l * n;
+      for (size_t j = 0; j < n; ++j) {
+        rowC[j] += a * rowB[j];
+      }
+    }
+  }
+  return matC;
+}
 } // namespace w2l
@@ -8,6 +8,10 @@
 
 #pragma once
 
+#include <functional>
+#include <map>
+#include <memory>
+#include <mutex>
 #include <vector>
 
 #include "FeatureParams.h"
@@ -20,6 +24,10 @@ std::vector<float> frameSignal(
     const std::vector<float>& input,
     const FeatureParams& params);
 
+// input - pointer to the inputSz samples of the signal
+std::vector<float>
+frameSignal(const float* input, int64_t inputSz, const FeatureParams& params);
+
 // row major;  matA - m x k , matB - k x n
 
 std::vector<float> cblasGemm(
@@ -28,4 +36,36 @@ std::vector<float> cblasGemm(
     int n,
     int k);
 
+// Same product, computed row by row in a fixed order: each row of the output
+// only depends on the same row of matA, whatever m (cblas kernels sum in a
+// different order for different m). Features of a frame are thus the same
+// whether it is computed alone or with others (see StreamingFeatures).
+
+std::vector<float> rowGemm(
+    const std::vector<float>& matA,
+    const std::vector<float>& matB,
+    int n,
+    int k);
+
+// Returns the table computed by compute() for key, only computed once per
+// process for each Owner (the class using the table) and key. The tables of
+// the extractors (window, filterbank, DCT, lifter coefficients) are thus
+// shared by all the extractors with the same parameters.
+
+template <typename Owner, typename Key>
+std::shared_ptr<const std::vector<float>> sharedTable(
+    const Key& key,
+    const std::function<std::vector<float>()>& compute) {
+  // Never destroyed, the tables are used until the process exits
+  static auto mutex = new std::mutex();
+  static auto tables =
+      new std::map<Key, std::shared_ptr<const std::vector<float>>>();
+  std::lock_guard<std::mutex> lock(*mutex);
+  auto& table = (*tables)[key];
+  if (!table) {
+    table = std::make_shared<const std::vector<float>>(compute());
+  }
+  return table;
+}
+
 } // namespace w2l
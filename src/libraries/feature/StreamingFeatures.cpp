@@ -0,0 +1,107 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include "StreamingFeatures.h"
+
+#include <algorithm>
+#include <stdexcept>
+
+namespace w2l {
+
+StreamingFeatures::StreamingFeatures(std::shared_ptr<Mfsc> extractor)
+    : extractor_(extractor),
+      featParams_(extractor->getFeatureParams()),
+      derivatives_(featParams_.deltaWindow, featParams_.accWindow),
+      staticFeatureSize_(extractor->staticFeatureSize()) {
+  if (!extractor->frameIndependent()) {
+    throw std::invalid_argument(
+        "StreamingFeatures: the extractor must be frame independent");
+  }
+  // as computed by Derivatives
+  featureSize_ = staticFeatureSize_;
+  context_ = 0;
+  if (featParams_.deltaWindow > 0) {
+    featureSize_ += staticFeatureSize_ * (featParams_.accWindow > 0 ? 2 : 1);
+    context_ =
+        featParams_.deltaWindow + std::max<int64_t>(featParams_.accWindow, 0);
+  }
+  reset();
+}
+
+std::vector<float> StreamingFeatures::applyChunk(
+    const float* input,
+    int64_t inputSz) {
+  if (inputSz < 0) {
+    throw std::invalid_argument("StreamingFeatures: negative input size");
+  }
+  int64_t nSkipped = std::min(nSkipped_, inputSz);
+  nSkipped_ -= nSkipped;
+  samples_.insert(samples_.end(), input + nSkipped, input + inputSz);
+
+  int64_t nNew = featParams_.numFrames(samples_.size());
+  if (nNew > 0) {
+    int64_t frameStride = featParams_.numFrameStrideSamples();
+    auto newFeatures = extractor_->staticFeatures(
+        samples_.data(),
+        (nNew - 1) * frameStride + featParams_.numFrameSizeSamples());
+    staticFeatures_.insert(
+        staticFeatures_.end(), newFeatures.begin(), newFeatures.end());
+    nStatic_ += nNew;
+    // keep the samples from the start of the next frame
+    int64_t nUsed = std::min<int64_t>(nNew * frameStride, samples_.size());
+    nSkipped_ = nNew * frameStride - nUsed;
+    samples_.erase(samples_.begin(), samples_.begin() + nUsed);
+  }
+  return emit(nStatic_ - context_);
+}
+
+std::vector<float> StreamingFeatures::finish() {
+  auto features = emit(nStatic_);
+  reset();
+  return features;
+}
+
+void StreamingFeatures::reset() {
+  samples_.clear();
+  nSkipped_ = 0;
+  staticFeatures_.clear();
+  staticStart_ = 0;
+  nStatic_ = 0;
+  nEmitted_ = 0;
+}
+
+std::vector<float> StreamingFeatures::emit(int64_t end) {
+  if (end <= nEmitted_) {
+    return {};
+  }
+  // Derivatives of the frames [nEmitted_, end) computed on a window of static
+  // features with all the frames they need: they are the same as on the whole
+  // signal, up to its boundaries (the start of the window is either the start
+  // of the signal or `context_` frames before nEmitted_, and its end either
+  // the end of the signal or `context_` frames after `end`).
+  int64_t windowStart = std::max<int64_t>(0, nEmitted_ - context_);
+  std::vector<float> window(
+      staticFeatures_.begin() +
+          (windowStart - staticStart_) * staticFeatureSize_,
+      staticFeatures_.end());
+  auto windowFeatures = derivatives_.apply(window, staticFeatureSize_);
+  std::vector<float> features(
+      windowFeatures.begin() + (nEmitted_ - windowStart) * featureSize_,
+      windowFeatures.begin() + (end - windowStart) * featureSize_);
+  nEmitted_ = end;
+
+  // drop the static features which are not needed any more
+  int64_t newStart = std::max<int64_t>(0, nEmitted_ - context_);
+  staticFeatures_.erase(
+      staticFeatures_.begin(),
+      staticFeatures_.begin() + (newStart - staticStart_) * staticFeatureSize_);
+  staticStart_ = newStart;
+  return features;
+}
+
+} // namespace w2l
@@ -0,0 +1,114 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <memory>
+#include <vector>
+
+#include "Derivatives.h"
+#include "FeatureParams.h"
+#include "Mfcc.h"
+#include "Mfsc.h"
+
+namespace w2l {
+
+/**
+ * StreamingFeatures computes the MFSC or MFCC features of a signal given
+ * chunk by chunk, of any sizes. After each chunk, it returns the features of
+ * the frames which became complete: their samples have all been received and
+ * so have the frames needed by their deltas and accelerations (deltaWindow +
+ * accWindow frames after them). The features of the last frames are returned
+ * by `finish()`. Concatenating the features of all the chunks and of
+ * `finish()` gives exactly (bit for bit) the features computed by `apply()`
+ * on the whole signal with a frame independent extractor (see Mfsc), which
+ * StreamingFeatures requires.
+ *
+ * Only the samples of the incomplete frame and the static features of the
+ * frames needed by the derivatives are kept from one chunk to the next.
+ *
+ * Sample usage:
+ *
+ *   StreamingMfcc streamingMfcc(params);
+ *   while (stream) {
+ *     auto features = streamingMfcc.applyChunk(chunk.data(), chunk.size());
+ *     // features of the next features.size() / featureSize() frames
+ *   }
+ *   auto features = streamingMfcc.finish(); // last frames
+ */
+class StreamingFeatures {
+ public:
+  explicit StreamingFeatures(std::shared_ptr<Mfsc> extractor);
+
+  virtual ~StreamingFeatures() {}
+
+  // input - next inputSz samples of the signal
+  // Returns - features of the frames completed (Col Major : FEAT X FRAMESZ)
+  std::vector<float> applyChunk(const float* input, int64_t inputSz);
+
+  std::vector<float> applyChunk(const std::vector<float>& input) {
+    return applyChunk(input.data(), input.size());
+  }
+
+  // End of the signal: returns the features of the remaining frames and
+  // starts a new signal
+  std::vector<float> finish();
+
+  // Start a new signal, dropping the samples received so far
+  void reset();
+
+  // Number of frames returned since the beginning of the signal
+  int64_t nFrames() const {
+    return nEmitted_;
+  }
+
+  // Number of features of each frame
+  int64_t featureSize() const {
+    return featureSize_;
+  }
+
+  FeatureParams getFeatureParams() const {
+    return featParams_;
+  }
+
+ private:
+  std::shared_ptr<Mfsc> extractor_;
+  FeatureParams featParams_;
+  Derivatives derivatives_;
+  int64_t staticFeatureSize_;
+  int64_t featureSize_;
+  // frames needed by the derivatives of a frame, on each side
+  int64_t context_;
+
+  // samples from the start of the next frame
+  std::vector<float> samples_;
+  // samples to skip before the next frame (frameStride > frameSize)
+  int64_t nSkipped_;
+  // static features of the frames from staticStart_ to nStatic_ - 1
+  std::vector<float> staticFeatures_;
+  int64_t staticStart_;
+  int64_t nStatic_;
+  int64_t nEmitted_;
+
+  // Features of the frames from nEmitted_ to `end` - 1
+  std::vector<float> emit(int64_t end);
+};
+
+class StreamingMfsc : public StreamingFeatures {
+ public:
+  explicit StreamingMfsc(const FeatureParams& params)
+      : StreamingFeatures(std::make_shared<Mfsc>(params, true)) {}
+};
+
+class StreamingMfcc : public StreamingFeatures {
+ public:
+  explicit StreamingMfcc(const FeatureParams& params)
+      : StreamingFeatures(std::make_shared<Mfcc>(params, true)) {}
+};
+
+} // namespace w2l
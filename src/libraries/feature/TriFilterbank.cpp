@@ -12,6 +12,7 @@
 #include <cmath>
 #include <cstddef>
 #include <stdexcept>
+#include <tuple>
 
 #include "SpeechUtils.h"
 
@@ -29,33 +30,41 @@ TriFilterbank::TriFilterbank(
       samplingFreq_(samplingfreq),
       lowFreq_(lowfreq),
       highFreq_((highfreq > 0) ? highfreq : (samplingfreq >> 1)),
-      freqScale_(freqscale),
-      H_(filterlen * numfilters) {
-  float minwarpfreq = hertzToWarpedScale(lowFreq_, freqScale_);
-  float maxwarpfreq = hertzToWarpedScale(highFreq_, freqScale_);
-  float dwarp = (maxwarpfreq - minwarpfreq) / (numfilters + 1);
+      freqScale_(freqscale) {
+  auto key = std::make_tuple(
+      numFilters_, filterLen_, samplingFreq_, lowFreq_, highFreq_, freqScale_);
+  H_ = sharedTable<TriFilterbank>(key, [this]() {
+    float minwarpfreq = hertzToWarpedScale(lowFreq_, freqScale_);
+    float maxwarpfreq = hertzToWarpedScale(highFreq_, freqScale_);
+    float dwarp = (maxwarpfreq - minwarpfreq) / (numFilters_ + 1);
 
-  std::vector<float> f(numFilters_ + 2);
-  for (int i = 0; i < (numFilters_ + 2); ++i) {
-    f[i] = warpedToHertzScale(i * dwarp + minwarpfreq, freqScale_) *
-        (filterLen_ - 1) * 2.0 / samplingFreq_;
-  }
+    std::vector<float> f(numFilters_ + 2);
+    for (int i = 0; i < (numFilters_ + 2); ++i) {
+      f[i] = warpedToHertzScale(i * dwarp + minwarpfreq, freqScale_) *
+          (filterLen_ - 1) * 2.0 / samplingFreq_;
+    }
 
-  float minH = 0.0;
+    float minH = 0.0;
 
-  for (size_t i = 0; i < filterLen_; ++i) {
-    for (size_t j = 0; j < numFilters_; ++j) {
-      float hislope = (i - f[j]) / (f[j + 1] - f[j]);
-      float loslope = (f[j + 2] - i) / (f[j + 2] - f[j + 1]);
-      H_[i * numFilters_ + j] = std::max(std::min(hislope, loslope), minH);
+    std::vector<float> H(filterLen_ * numFilters_);
+    for (size_t i = 0; i < filterLen_; ++i) {
+      for (size_t j = 0; j < numFilters_; ++j) {
+        float hislope = (i - f[j]) / (f[j + 1] - f[j]);
+        float loslope = (f[j + 2] - i) / (f[j + 2] - f[j + 1]);
+        H[i * numFilters_ + j] = std::max(std::min(hislope, loslope), minH);
+      }
     }
-  }
+    return H;
+  });
 }
 
 std::vector<float> TriFilterbank::apply(
     const std::vector<float>& input,
-    float melfloor /* = 0.0 */) const {
-  std::vector<float> output = cblasGemm(input, H_, numFilters_, filterLen_);
+    float melfloor /* = 0.0 */,
+    bool frameIndependent /* = false */) const {
+  std::vector<float> output = frameIndependent
+      ? rowGemm(input, *H_, numFilters_, filterLen_)
+      : cblasGemm(input, *H_, numFilters_, filterLen_);
   std::transform(
       output.begin(),
       output.end(),
@@ -65,7 +74,7 @@ std::vector<float> TriFilterbank::apply(
 }
 
 std::vector<float> TriFilterbank::filterbank() const {
-  return H_;
+  return *H_;
 }
 
 float TriFilterbank::hertzToWarpedScale(float hz, FrequencyScale freqscale)
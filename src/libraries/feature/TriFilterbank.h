@@ -9,6 +9,7 @@
 #pragma once
 
 #include <stdint.h>
+#include <memory>
 #include <vector>
 
 #include "FeatureParams.h"
@@ -25,9 +26,11 @@ class TriFilterbank {
       int highfreq = -1,
       FrequencyScale freqscale = FrequencyScale::MEL);
 
+  // frameIndependent - fixed order product (rowGemm), see Mfsc
   std::vector<float> apply(
       const std::vector<float>& input,
-      float melfloor = 0.0) const;
+      float melfloor = 0.0,
+      bool frameIndependent = false) const;
 
   // Returns triangular filterbank matrix
   std::vector<float> filterbank() const;
@@ -39,7 +42,7 @@ class TriFilterbank {
   int lowFreq_; // lower cutoff frequency (Hz)
   int highFreq_; // higher cutoff frequency (Hz)
   FrequencyScale freqScale_; // frequency warp type Ex. FrequencyScale::MEL
-  std::vector<float>
+  std::shared_ptr<const std::vector<float>>
       H_; // (numFilters_ x filterLen_) triangular filterbank matrix
 
   float hertzToWarpedScale(float hz, FrequencyScale freqscale) const;
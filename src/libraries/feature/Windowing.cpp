@@ -12,29 +12,36 @@
 #include <cstddef>
 #include <numeric>
 #include <stdexcept>
+#include <tuple>
+
+#include "SpeechUtils.h"
 
 namespace w2l {
 
 Windowing::Windowing(int N, WindowType windowtype)
-    : windowLength_(N), windowType_(windowtype), coefs_(N) {
+    : windowLength_(N), windowType_(windowtype) {
   if (windowLength_ <= 1) {
     throw std::invalid_argument("Windowing: windowLength must be > 1");
   }
-  std::iota(coefs_.begin(), coefs_.end(), 0.0);
-  switch (windowtype) {
-    case WindowType::HAMMING:
-      for (auto& c : coefs_) {
-        c = 0.54 - 0.46 * std::cos(2 * M_PI * c / (N - 1));
-      }
-      break;
-    case WindowType::HANNING:
-      for (auto& c : coefs_) {
-        c = 0.5 * (1.0 - std::cos(2 * M_PI * c / (N - 1)));
-      }
-      break;
-    default:
-      throw std::invalid_argument("Windowing: unsupported window type");
-  }
+  coefs_ = sharedTable<Windowing>(std::make_tuple(N, windowtype), [&]() {
+    std::vector<float> coefs(N);
+    std::iota(coefs.begin(), coefs.end(), 0.0);
+    switch (windowtype) {
+      case WindowType::HAMMING:
+        for (auto& c : coefs) {
+          c = 0.54 - 0.46 * std::cos(2 * M_PI * c / (N - 1));
+        }
+        break;
+      case WindowType::HANNING:
+        for (auto& c : coefs) {
+          c = 0.5 * (1.0 - std::cos(2 * M_PI * c / (N - 1)));
+        }
+        break;
+      default:
+        throw std::invalid_argument("Windowing: unsupported window type");
+    }
+    return coefs;
+  });
 }
 
 std::vector<float> Windowing::apply(const std::vector<float>& input) const {
@@ -48,9 +55,10 @@ void Windowing::applyInPlace(std::vector<float>& input) const {
     throw std::invalid_argument(
         "Windowing: input size is not divisible by windowLength");
   }
+  const auto& coefs = *coefs_;
   size_t n = 0;
   for (auto& in : input) {
-    in *= coefs_[n++];
+    in *= coefs[n++];
     if (n == windowLength_) {
       n = 0;
     }
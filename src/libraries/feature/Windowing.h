@@ -9,6 +9,7 @@
 #pragma once
 
 #include <stdint.h>
+#include <memory>
 #include <vector>
 
 #include "FeatureParams.h"
@@ -29,6 +30,6 @@ class Windowing {
  private:
   int windowLength_;
   WindowType windowType_;
-  std::vector<float> coefs_;
+  std::shared_ptr<const std::vector<float>> coefs_;
 };
 } // namespace w2l
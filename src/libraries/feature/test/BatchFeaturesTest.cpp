@@ -0,0 +1,143 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <gtest/gtest.h>
+#include <memory>
+#include <thread>
+#include <vector>
+
+#include "TestUtils.h"
+#include "libraries/feature/BatchFeatures.h"
+#include "libraries/feature/Mfcc.h"
+#include "libraries/feature/Mfsc.h"
+
+using namespace w2l;
+
+namespace {
+
+/* Signals of 0 to 2 s, some shorter than a frame */
+std::vector<std::vector<float>> randSignals(int nSignals) {
+  std::vector<std::vector<float>> signals;
+  for (int i = 0; i < nSignals; ++i) {
+    signals.push_back(randVec<float>((i * 7919) % 32000));
+  }
+  return signals;
+}
+
+template <class Extractor>
+void checkBatchFeatures(const FeatureParams& params) {
+  auto signals = randSignals(20);
+  std::vector<const float*> inputs;
+  std::vector<int64_t> inputSizes;
+  for (const auto& signal : signals) {
+    inputs.push_back(signal.data());
+    inputSizes.push_back(signal.size());
+  }
+
+  Extractor extractor(params);
+  BatchFeatures batchFeatures(
+      [&params]() { return std::make_shared<Extractor>(params); });
+  for (int nThreads : {1, 4}) {
+    std::vector<int64_t> frameOffsets;
+    auto features =
+        batchFeatures.apply(inputs, inputSizes, nThreads, frameOffsets);
+    ASSERT_EQ(frameOffsets.size(), signals.size() + 1);
+    ASSERT_EQ(frameOffsets[0], 0);
+    ASSERT_EQ(
+        features.size(), frameOffsets.back() * batchFeatures.featureSize());
+    for (int i = 0; i < signals.size(); ++i) {
+      auto expected = extractor.apply(signals[i]);
+      std::vector<float> output(
+          features.begin() + frameOffsets[i] * batchFeatures.featureSize(),
+          features.begin() + frameOffsets[i + 1] * batchFeatures.featureSize());
+      // same computation, bit-identical
+      ASSERT_EQ(output, expected);
+    }
+    ASSERT_EQ(batchFeatures.nExtractors(), nThreads);
+  }
+}
+
+} // namespace
+
+TEST(BatchFeaturesTest, Mfcc) {
+  FeatureParams params;
+  checkBatchFeatures<Mfcc>(params);
+  ASSERT_EQ(
+      BatchFeatures([&params]() {
+        return std::make_shared<Mfcc>(params);
+      }).featureSize(),
+      params.mfccFeatSz());
+}
+
+TEST(BatchFeaturesTest, Mfsc) {
+  FeatureParams params;
+  params.useEnergy = false;
+  checkBatchFeatures<Mfsc>(params);
+}
+
+TEST(BatchFeaturesTest, PowerSpectrum) {
+  FeatureParams params;
+  params.frameSizeMs = 30;
+  checkBatchFeatures<PowerSpectrum>(params);
+}
+
+TEST(BatchFeaturesTest, EmptyBatch) {
+  FeatureParams params;
+  BatchFeatures batchFeatures(
+      [&params]() { return std::make_shared<Mfcc>(params); });
+  std::vector<int64_t> frameOffsets;
+  auto features = batchFeatures.apply({}, {}, 4, frameOffsets);
+  ASSERT_TRUE(features.empty());
+  ASSERT_EQ(frameOffsets, std::vector<int64_t>({0}));
+  ASSERT_THROW(
+      batchFeatures.apply({nullptr}, {}, 4, frameOffsets),
+      std::invalid_argument);
+  ASSERT_THROW(
+      batchFeatures.apply({}, {}, 0, frameOffsets), std::invalid_argument);
+}
+
+TEST(BatchFeaturesTest, ConcurrentApply) {
+  FeatureParams params;
+  auto signals = randSignals(20);
+  std::vector<const float*> inputs;
+  std::vector<int64_t> inputSizes;
+  for (const auto& signal : signals) {
+    inputs.push_back(signal.data());
+    inputSizes.push_back(signal.size());
+  }
+  BatchFeatures batchFeatures(
+      [&params]() { return std::make_shared<Mfsc>(params); });
+  std::vector<int64_t> expectedOffsets;
+  auto expected = batchFeatures.apply(inputs, inputSizes, 1, expectedOffsets);
+
+  // Calls with more and more threads grow the pool during the other calls
+  std::vector<std::thread> threads;
+  std::vector<bool> ok(4, true);
+  for (int i = 0; i < ok.size(); i++) {
+    threads.emplace_back([&, i]() {
+      for (int nThreads = 1; nThreads <= 4; nThreads++) {
+        std::vector<int64_t> frameOffsets;
+        auto features =
+            batchFeatures.apply(inputs, inputSizes, nThreads + i, frameOffsets);
+        if (features != expected || frameOffsets != expectedOffsets) {
+          ok[i] = false;
+        }
+      }
+    });
+  }
+  for (auto& thread : threads) {
+    thread.join();
+  }
+  ASSERT_EQ(ok, std::vector<bool>(4, true));
+  ASSERT_EQ(batchFeatures.nExtractors(), 7);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,87 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <gtest/gtest.h>
+#include <cmath>
+#include <cstdio>
+#include <thread>
+#include <vector>
+
+#include "TestUtils.h"
+#include "libraries/feature/FftPlan.h"
+#include "libraries/feature/Mfcc.h"
+#include "libraries/feature/PowerSpectrum.h"
+
+using namespace w2l;
+
+TEST(FftPlanTest, SharedPlans) {
+  auto plan = FftPlan::get(512);
+  ASSERT_EQ(plan, FftPlan::get(512));
+  ASSERT_NE(plan, FftPlan::get(256));
+  ASSERT_EQ(plan->size(), 512);
+  ASSERT_EQ(FftPlan::get(256)->size(), 256);
+  ASSERT_THROW(FftPlan::get(0), std::invalid_argument);
+}
+
+TEST(FftPlanTest, Execute) {
+  int N = 64;
+  auto input = randVec<double>(N);
+  auto in = allocFftBuffer(N);
+  auto out = allocFftBuffer(2 * (N / 2 + 1));
+  std::copy(input.begin(), input.end(), in.get());
+  FftPlan::get(N)->execute(in.get(), out.get());
+  for (int k = 0; k <= N / 2; ++k) {
+    double re = 0, im = 0;
+    for (int n = 0; n < N; ++n) {
+      re += input[n] * std::cos(2 * M_PI * k * n / N);
+      im -= input[n] * std::sin(2 * M_PI * k * n / N);
+    }
+    ASSERT_NEAR(out[2 * k], re, 1E-9);
+    ASSERT_NEAR(out[2 * k + 1], im, 1E-9);
+  }
+}
+
+TEST(FftPlanTest, SharedByExtractors) {
+  FeatureParams params;
+  auto input = randVec<float>(16000);
+  auto expected = Mfcc(params).apply(input);
+  ASSERT_EQ(Mfcc(params).apply(input), expected);
+
+  // extractors sharing the same plan and tables, in several threads
+  std::vector<std::vector<float>> outputs(4);
+  std::vector<std::thread> threads;
+  for (int i = 0; i < outputs.size(); ++i) {
+    threads.emplace_back([&, i]() {
+      Mfcc mfcc(params);
+      for (int j = 0; j < 10; ++j) {
+        outputs[i] = mfcc.apply(input);
+      }
+    });
+  }
+  for (auto& thread : threads) {
+    thread.join();
+  }
+  for (const auto& output : outputs) {
+    ASSERT_EQ(output, expected);
+  }
+}
+
+TEST(FftPlanTest, Wisdom) {
+  std::string path = "/tmp/FftPlanTest.wisdom";
+  PowerSpectrum powSpec(FeatureParams{});
+  ASSERT_TRUE(exportFftWisdom(path));
+  ASSERT_TRUE(importFftWisdom(path));
+  std::remove(path.c_str());
+  ASSERT_FALSE(importFftWisdom(path));
+  ASSERT_FALSE(exportFftWisdom("/nonexistent/FftPlanTest.wisdom"));
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
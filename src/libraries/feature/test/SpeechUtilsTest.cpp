@@ -8,6 +8,7 @@
 
 #include <arrayfire.h>
 #include <gtest/gtest.h>
+#include <algorithm>
 
 #include "TestUtils.h"
 #include "libraries/feature/SpeechUtils.h"
@@ -51,6 +52,26 @@ TEST(SpeechUtilsTest, AfMatmulCompare) {
   }
 }
 
+TEST(SpeechUtilsTest, RowMatmul) {
+  std::vector<float> A = {2, 3, 4, 3, 4, 5, 4, 5, 6, 5, 6, 7};
+  std::vector<float> B = {2, 3, 3, 4, 4, 5};
+  auto op = rowGemm(A, B, 2, 3);
+  std::vector<float> expectedOp = {29, 38, 38, 50, 47, 62, 56, 74};
+  EXPECT_TRUE(compareVec(op, expectedOp, 1E-10));
+
+  // each row is the same whatever the other rows
+  int m = 100, n = 23, k = 257;
+  auto aVec = randVec<float>(m * k);
+  auto bVec = randVec<float>(k * n);
+  auto cVec = rowGemm(aVec, bVec, n, k);
+  ASSERT_TRUE(compareVec(cVec, cblasGemm(aVec, bVec, n, k), 1E-4));
+  for (int i = 0; i < m; i += 7) {
+    std::vector<float> row(aVec.begin() + i * k, aVec.begin() + (i + 1) * k);
+    auto rowC = rowGemm(row, bVec, n, k);
+    ASSERT_TRUE(std::equal(rowC.begin(), rowC.end(), cVec.begin() + i * n));
+  }
+}
+
 int main(int argc, char** argv) {
   ::testing::InitGoogleTest(&argc, argv);
   return RUN_ALL_TESTS();
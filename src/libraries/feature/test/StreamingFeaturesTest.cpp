@@ -0,0 +1,125 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <gtest/gtest.h>
+#include <random>
+#include <vector>
+
+#include "TestUtils.h"
+#include "libraries/feature/Mfcc.h"
+#include "libraries/feature/Mfsc.h"
+#include "libraries/feature/StreamingFeatures.h"
+
+using namespace w2l;
+
+namespace {
+
+/* Features of `signal` given in random chunks of 1 to maxChunkSz samples */
+std::vector<float> streamInChunks(
+    StreamingFeatures& streaming,
+    const std::vector<float>& signal,
+    int maxChunkSz,
+    unsigned seed) {
+  std::mt19937 rng(seed);
+  std::uniform_int_distribution<int> chunkSz(1, maxChunkSz);
+  std::vector<float> features;
+  int64_t start = 0;
+  while (start < signal.size()) {
+    int64_t size = std::min<int64_t>(chunkSz(rng), signal.size() - start);
+    auto chunk = streaming.applyChunk(signal.data() + start, size);
+    EXPECT_EQ(chunk.size() % streaming.featureSize(), 0);
+    features.insert(features.end(), chunk.begin(), chunk.end());
+    start += size;
+  }
+  auto last = streaming.finish();
+  features.insert(features.end(), last.begin(), last.end());
+  return features;
+}
+
+template <class Extractor, class Streaming>
+void checkStreaming(const FeatureParams& params) {
+  Extractor extractor(params, true);
+  Extractor defaultExtractor(params);
+  Streaming streaming(params);
+  for (int nSamples : {100, 400, 401, 1000, 16000}) {
+    auto signal = randVec<float>(nSamples);
+    auto expected = extractor.apply(signal);
+    // the default product only differs by rounding
+    auto defaultFeatures = defaultExtractor.apply(signal);
+    ASSERT_EQ(defaultFeatures.size(), expected.size());
+    for (int i = 0; i < expected.size(); ++i) {
+      ASSERT_NEAR(defaultFeatures[i], expected[i], 1E-3);
+    }
+    // from 1 sample to several frames per chunk
+    for (int maxChunkSz : {1, 37, 160, 1600, 20000}) {
+      auto features = streamInChunks(streaming, signal, maxChunkSz, nSamples);
+      ASSERT_EQ(features, expected);
+    }
+  }
+}
+
+FeatureParams testParams(int deltaWindow, int accWindow, bool useEnergy) {
+  FeatureParams params;
+  params.deltaWindow = deltaWindow;
+  params.accWindow = accWindow;
+  params.useEnergy = useEnergy;
+  return params;
+}
+
+} // namespace
+
+TEST(StreamingFeaturesTest, Mfcc) {
+  checkStreaming<Mfcc, StreamingMfcc>(testParams(2, 2, true));
+  checkStreaming<Mfcc, StreamingMfcc>(testParams(3, 1, false));
+  checkStreaming<Mfcc, StreamingMfcc>(testParams(2, 0, true));
+  checkStreaming<Mfcc, StreamingMfcc>(testParams(0, 0, true));
+}
+
+TEST(StreamingFeaturesTest, Mfsc) {
+  checkStreaming<Mfsc, StreamingMfsc>(testParams(2, 2, true));
+  checkStreaming<Mfsc, StreamingMfsc>(testParams(1, 3, false));
+  checkStreaming<Mfsc, StreamingMfsc>(testParams(0, 0, false));
+}
+
+TEST(StreamingFeaturesTest, FrameStrideLargerThanFrameSize) {
+  auto params = testParams(2, 2, true);
+  params.frameSizeMs = 10;
+  params.frameStrideMs = 25;
+  checkStreaming<Mfcc, StreamingMfcc>(params);
+}
+
+TEST(StreamingFeaturesTest, FrameIndependentExtractor) {
+  FeatureParams params;
+  ASSERT_THROW(
+      StreamingFeatures(std::make_shared<Mfcc>(params)), std::invalid_argument);
+  StreamingFeatures streaming(std::make_shared<Mfcc>(params, true));
+  ASSERT_EQ(streaming.featureSize(), params.mfccFeatSz());
+}
+
+TEST(StreamingFeaturesTest, Latency) {
+  // a frame is returned as soon as the frames of its derivatives are complete
+  FeatureParams params = testParams(2, 2, true);
+  StreamingMfcc streaming(params);
+  auto signal = randVec<float>(16000);
+  int64_t frameSize = params.numFrameSizeSamples();
+  int64_t frameStride = params.numFrameStrideSamples();
+  for (int64_t t = 0; t < signal.size(); ++t) {
+    streaming.applyChunk(signal.data() + t, 1);
+    int64_t nComplete = params.numFrames(t + 1);
+    ASSERT_EQ(streaming.nFrames(), std::max<int64_t>(0, nComplete - 4));
+  }
+  auto last = streaming.finish();
+  ASSERT_EQ(last.size(), 4 * params.mfccFeatSz());
+  ASSERT_EQ(streaming.nFrames(), 0);
+  ASSERT_GT(frameSize, frameStride);
+}
+
+int main(int argc, char** argv) {
+  ::testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
@@ -0,0 +1,82 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <stdexcept>
+#include <string>
+#include <unordered_set>
+
+#include "libraries/lm/BatchLM.h"
+
+namespace w2l {
+
+LMStatePtr BatchLM::start(bool startWithNothing) {
+  auto state = std::make_shared<BatchLMState>();
+  state->id = nextStateId_++;
+  state->hasScore = true;
+  startState(state->id, startWithNothing);
+  return state;
+}
+
+std::pair<LMStatePtr, float> BatchLM::score(
+    const LMStatePtr& state,
+    const int usrTokenIdx) {
+  auto outState = state->child<BatchLMState>(usrTokenIdx);
+  if (!outState->hasScore) {
+    prefetch({state}, {usrTokenIdx});
+  }
+  return {outState, outState->score};
+}
+
+std::pair<LMStatePtr, float> BatchLM::finish(const LMStatePtr& state) {
+  return score(state, -1);
+}
+
+void BatchLM::prefetch(
+    const std::vector<LMStatePtr>& states,
+    const std::vector<int>& usrTokenIndices) {
+  if (states.size() != usrTokenIndices.size()) {
+    throw std::invalid_argument(
+        "[BatchLM] states and tokens should have the same size");
+  }
+
+  // Pairs which were never scored, each of them once
+  std::vector<BatchLMState*> outStates;
+  std::vector<int64_t> stateIds, newStateIds;
+  std::vector<int> tokens;
+  std::unordered_set<BatchLMState*> pending;
+  for (size_t i = 0; i < states.size(); i++) {
+    auto outState = states[i]->child<BatchLMState>(usrTokenIndices[i]);
+    if (outState->hasScore || !pending.insert(outState.get()).second) {
+      continue;
+    }
+    if (outState->id < 0) {
+      outState->id = nextStateId_++;
+    }
+    outStates.push_back(outState.get());
+    stateIds.push_back(static_cast<BatchLMState*>(states[i].get())->id);
+    tokens.push_back(usrTokenIndices[i]);
+    newStateIds.push_back(outState->id);
+  }
+  if (outStates.empty()) {
+    return;
+  }
+
+  std::vector<float> scores(outStates.size());
+  scoreStates(stateIds, tokens, newStateIds, scores);
+  if (scores.size() != outStates.size()) {
+    throw std::runtime_error(
+        "[BatchLM] Expected " + std::to_string(outStates.size()) +
+        " scores, got " + std::to_string(scores.size()));
+  }
+  for (size_t i = 0; i < outStates.size(); i++) {
+    outStates[i]->score = scores[i];
+    outStates[i]->hasScore = true;
+  }
+}
+
+} // namespace w2l
@@ -0,0 +1,96 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <atomic>
+#include <cstdint>
+
+#include "libraries/lm/LM.h"
+
+namespace w2l {
+
+/**
+ * BatchLMState is the state of a BatchLM. Children are created once for each
+ * token, so a state is identified by its id and is the same object for the
+ * same history.
+ */
+struct BatchLMState : LMState {
+  // Unique id of the state in the LM, -1 until it is assigned
+  int64_t id;
+
+  // Score of the transition from the parent state to this one
+  float score;
+  bool hasScore;
+
+  BatchLMState() : id(-1), score(0), hasScore(false) {}
+};
+
+/**
+ * BatchLM is a base class for language models which score many (state, token)
+ * pairs at once, e.g. a neural LM or an LM implemented in Python. Subclasses
+ * only see integer state ids: `startState()` is called for each new sentence
+ * and `scoreStates()` with all the pairs the decoder is going to query in a
+ * frame, which are then served from the states without calling the model
+ * again. Pairs which were not prefetched are scored one at a time.
+ *
+ * Token index -1 stands for the end of sentence (`finish()`).
+ *
+ * Sample usage:
+ *
+ *   class MyLM : public BatchLM {
+ *    protected:
+ *     void startState(int64_t stateId, bool startWithNothing) override;
+ *     void scoreStates(
+ *         const std::vector<int64_t>& stateIds,
+ *         const std::vector<int>& usrTokenIndices,
+ *         const std::vector<int64_t>& newStateIds,
+ *         std::vector<float>& scores) override;
+ *   };
+ */
+class BatchLM : public LM {
+ public:
+  BatchLM() : nextStateId_(0) {}
+
+  LMStatePtr start(bool startWithNothing) override;
+
+  std::pair<LMStatePtr, float> score(
+      const LMStatePtr& state,
+      const int usrTokenIdx) override;
+
+  std::pair<LMStatePtr, float> finish(const LMStatePtr& state) override;
+
+  void prefetch(
+      const std::vector<LMStatePtr>& states,
+      const std::vector<int>& usrTokenIndices) override;
+
+  bool hasPrefetch() const override {
+    return true;
+  }
+
+ protected:
+  /* A new sentence starts with state `stateId` */
+  virtual void startState(int64_t stateId, bool startWithNothing) = 0;
+
+  /**
+   * Fill `scores[i]` with the score of token `usrTokenIndices[i]` following
+   * state `stateIds[i]`, the resulting state being `newStateIds[i]`.
+   */
+  virtual void scoreStates(
+      const std::vector<int64_t>& stateIds,
+      const std::vector<int>& usrTokenIndices,
+      const std::vector<int64_t>& newStateIds,
+      std::vector<float>& scores) = 0;
+
+ private:
+  std::atomic<int64_t> nextStateId_;
+};
+
+using BatchLMPtr = std::shared_ptr<BatchLM>;
+
+} // namespace w2l
@@ -0,0 +1,110 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#include <stdexcept>
+
+#include "libraries/lm/CachedLM.h"
+
+namespace w2l {
+
+namespace {
+
+// Cache key of finish(), user token indices are non-negative
+const int kFinishKey = -1;
+
+} // namespace
+
+CachedLM::CachedLM(const LMPtr& lm, int capacity)
+    : lm_(lm), capacity_(capacity), hits_(0), misses_(0) {
+  if (!lm_) {
+    throw std::invalid_argument("[CachedLM] lm is null");
+  }
+  if (capacity_ <= 0) {
+    throw std::invalid_argument("[CachedLM] capacity must be positive");
+  }
+  index_.reserve(capacity_);
+}
+
+LMStatePtr CachedLM::start(bool startWithNothing) {
+  // The entries of the previous sentences are evicted as the new ones come,
+  // the other decoders sharing the cache may still be using theirs
+  return lm_->start(startWithNothing);
+}
+
+std::pair<LMStatePtr, float> CachedLM::score(
+    const LMStatePtr& state,
+    const int usrTokenIdx) {
+  if (usrTokenIdx < 0) {
+    throw std::out_of_range(
+        "[CachedLM] Invalid user token index: " + std::to_string(usrTokenIdx));
+  }
+  return lookup(state, usrTokenIdx);
+}
+
+std::pair<LMStatePtr, float> CachedLM::finish(const LMStatePtr& state) {
+  return lookup(state, kFinishKey);
+}
+
+std::pair<LMStatePtr, float> CachedLM::lookup(
+    const LMStatePtr& state,
+    int key) {
+  std::unique_lock<std::mutex> lock(mutex_);
+  auto it = index_.find({state.get(), key});
+  if (it != index_.end()) {
+    hits_++;
+    entries_.splice(entries_.begin(), entries_, it->second);
+    return {it->second->outState, it->second->score};
+  }
+  misses_++;
+
+  // Not locked while querying the LM, which may wait for the GIL
+  lock.unlock();
+  auto result = key == kFinishKey ? lm_->finish(state) : lm_->score(state, key);
+  lock.lock();
+  if (index_.count({state.get(), key}) > 0) {
+    return result; // cached by another thread meanwhile
+  }
+  if (entries_.size() == capacity_) {
+    // Evict the least recently used entry, its state stays in the tree
+    const Entry& last = entries_.back();
+    index_.erase({last.state.get(), last.usrTokenIdx});
+    entries_.pop_back();
+  }
+  entries_.push_front({state, key, result.first, result.second});
+  index_[{state.get(), key}] = entries_.begin();
+  return result;
+}
+
+void CachedLM::clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  index_.clear();
+  entries_.clear();
+}
+
+int CachedLM::size() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return entries_.size();
+}
+
+int64_t CachedLM::hits() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return hits_;
+}
+
+int64_t CachedLM::misses() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return misses_;
+}
+
+void CachedLM::resetCounters() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  hits_ = 0;
+  misses_ = 0;
+}
+
+} // namespace w2l
@@ -0,0 +1,125 @@
+/**
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ * All rights reserved.
+ *
+ * This source code is licensed under the BSD-style license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <list>
+#include <mutex>
+#include <unordered_map>
+
+#include "libraries/lm/LM.h"
+
+namespace w2l {
+
+/**
+ * CachedLM wraps a language model with a bounded LRU cache of the results of
+ * `score()` and `finish()`, keyed by (state, token), so that the queries
+ * repeated across beams and frames only reach the wrapped LM once.
+ *
+ * Evicting an entry only drops the cached score: the child state stays linked
+ * to its parent in `LMState::children`, so scoring the same (state, token)
+ * again returns the same state object and the decoders keep merging the
+ * hypotheses with the same LM history. The entries hold their states, which
+ * are released with the entries: the states of a finished sentence are
+ * evicted as the next sentences fill the cache, and its state tree is freed
+ * once no entry or hypothesis holds it. start() doesn't touch the cache,
+ * clear() empties it.
+ *
+ * The cache is guarded by a mutex, so a CachedLM can be shared by the threads
+ * of BatchDecoder or Trie::fromLexicon if the wrapped LM supports concurrent
+ * calls (the mutex is not held while querying it).
+ *
+ * Sample usage:
+ *
+ *   auto lm = std::make_shared<CachedLM>(kenlm, 100000);
+ *   LexiconDecoder decoder(opt, trie, lm, ...);
+ *   decoder.decode(emissions, T, N);
+ *   double hitRate = lm->hits() / (double)(lm->hits() + lm->misses());
+ */
+class CachedLM : public LM {
+ public:
+  CachedLM(const LMPtr& lm, int capacity);
+
+  LMStatePtr start(bool startWithNothing) override;
+
+  std::pair<LMStatePtr, float> score(
+      const LMStatePtr& state,
+      const int usrTokenIdx) override;
+
+  std::pair<LMStatePtr, float> finish(const LMStatePtr& state) override;
+
+  void updateCache(std::vector<LMStatePtr> states) override {
+    lm_->updateCache(std::move(states));
+  }
+
+  void prefetch(
+      const std::vector<LMStatePtr>& states,
+      const std::vector<int>& usrTokenIndices) override {
+    lm_->prefetch(states, usrTokenIndices);
+  }
+
+  bool hasPrefetch() const override {
+    return lm_->hasPrefetch();
+  }
+
+  /* Remove all the entries, counters are kept */
+  void clear();
+
+  int capacity() const {
+    return capacity_;
+  }
+
+  int size() const;
+
+  int64_t hits() const;
+
+  int64_t misses() const;
+
+  void resetCounters();
+
+ private:
+  struct Entry {
+    // Holding the input state guarantees that its address is not reused
+    LMStatePtr state;
+    int usrTokenIdx;
+    LMStatePtr outState;
+    float score;
+  };
+
+  struct KeyHash {
+    size_t operator()(const std::pair<const LMState*, int>& key) const {
+      return std::hash<const LMState*>()(key.first) * 31 +
+          std::hash<int>()(key.second);
+    }
+  };
+
+  using EntryList = std::list<Entry>;
+
+  std::pair<LMStatePtr, float> lookup(const LMStatePtr& state, int key);
+
+  LMPtr lm_;
+  int capacity_;
+
+  // Most recently used first
+  EntryList entries_;
+  std::unordered_map<
+      std::pair<const LMState*, int>,
+      EntryList::iterator,
+      KeyHash>
+      index_;
+
+  int64_t hits_;
+  int64_t misses_;
+
+  mutable std::mutex mutex_;
+};
+
+using CachedLMPtr = std::shared_ptr<CachedLM>;
+
+} // namespace w2l
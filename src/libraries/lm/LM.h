@@ -75,6 +75,19 @@ class LM {
   /* Update LM caches (optional) given a bunch of new states generated */
   virtual void updateCache(std::vector<LMStatePtr> stateIdices) {}
 
+  /**
+   * Score in one batch (optional) the (state, token) pairs which are about to
+   * be queried with `score()`, a token index of -1 standing for `finish()`.
+   * Decoders only enumerate the pairs if `hasPrefetch()` is true.
+   */
+  virtual void prefetch(
+      const std::vector<LMStatePtr>& states,
+      const std::vector<int>& usrTokenIndices) {}
+
+  virtual bool hasPrefetch() const {
+    return false;
+  }
+
   virtual ~LM() = default;
 
  protected: